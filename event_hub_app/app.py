@@ -1,4 +1,13 @@
-from auth.views import app
+if __package__:
+    from .factory import create_app
+else:
+    # run as `python app.py` from this directory: import the package from its parent
+    import os
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from event_hub_app.factory import create_app
+
+app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=app.config['DEBUG'])
@@ -0,0 +1,12 @@
+"""
+ASGI entry point. The read-only JSON API runs as coroutines on the async database driver,
+every other request is served by the Flask app on a thread pool through a2wsgi. Needs a2wsgi
+and the async driver of the database (aiosqlite or asyncpg, with greenlet):
+
+    uvicorn event_hub_app.asgi:application --workers 4
+    python -m event_hub_app.serve --mode asgi
+"""
+from .factory import create_app
+from .auth.async_api import AsyncEventHub
+
+application = AsyncEventHub(create_app())
@@ -1,21 +1,9 @@
-import os
-from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
 
+# unbound extensions, create_app (event_hub_app/factory.py) binds them to the app
+db = SQLAlchemy()
+migrate = Migrate()
 login_manager = LoginManager()
-
-app = Flask(__name__)
-
-app.config['SECRET_KEY'] = "eventkey"
-basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'data.sqlite')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db = SQLAlchemy(app)
-Migrate(app, db)
-login_manager.init_app(app)
-login_manager.login_view = 'login'
-
-
+login_manager.login_view = 'auth.login'
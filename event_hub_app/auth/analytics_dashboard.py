@@ -1,71 +1,71 @@
+from sqlalchemy import case
+from . import db
 from .model import Event
+from io import BytesIO
 import pandas as pd
-import matplotlib.pyplot as plt
-import os
+from matplotlib.figure import Figure
 
+EVENT_DATA_COLUMNS = ['Events', 'Rating', 'Participation']
 
-def get_event_data():
+
+def event_aggregates_query():
     """
-    This function will get the all event name , rating and participants
+    This function will build the query returning name, average rating and participant count
+    for every event from the denormalized counters kept on the events table
     """
-    try:
-        events = Event.query.all()
-
-        event_names = []
-        event_ratings = []
-        event_participants = []
-
-        event_dataframe = None
-        for event in events:
-            event_names.append(event.name)
+    rating = case((Event.rating_count > 0, Event.rating_sum * 1.0 / Event.rating_count), else_=0).label('Rating')
+    participation = Event.participant_count.label('Participation')
 
-            ratings = [feedback.rating for feedback in event.feedback]
-            if ratings:
-                average_rating = sum(ratings) / len(ratings)
-            else:
-                average_rating = 0
-            event_ratings.append(average_rating)
+    query = db.session.query(Event.name.label('Events'), rating, participation)
+    return query, {'Rating': rating, 'Participation': participation}
 
-            participation_count = len(event.participants)
-            event_participants.append(participation_count)
 
-            # generate dataframe
-            event_dataframe = pd.DataFrame({
-                'Events': event_names,
-                'Rating': event_ratings,
-                'Participation': event_participants
-            })
-        return event_dataframe
+def get_event_data(order_by=None, limit=None):
+    """
+    This function will get the event name, rating and participants of all events
+    (or the top `limit` events ordered by `order_by`) as a single dataframe
+    """
+    try:
+        query, columns = event_aggregates_query()
+        if order_by is not None:
+            query = query.order_by(columns[order_by].desc(), Event.name)
+        if limit is not None:
+            query = query.limit(limit)
+        return pd.DataFrame.from_records(query.all(), columns=EVENT_DATA_COLUMNS)
     except Exception as e:
         print(f"Error occurred while getting the all event details from DB {e}")
 
 
+def get_top_events(by, limit=3):
+    """
+    This function will get the top events by 'Rating' or 'Participation', ranked in SQL
+    """
+    return get_event_data(order_by=by, limit=limit)
+
+
 def generate_graph():
     """
-    This function will generate the top 3 events graph and save as png
+    This function will generate the top 3 events graph and return it as png bytes.
+    It uses the object-oriented Figure API, so no global pyplot state is shared between threads
     """
-    try:
-        event_dataframe = get_event_data()
-        top_events_by_rating = event_dataframe.sort_values(by='Rating', ascending=False).head(3)
-        top_events_by_participation = event_dataframe.sort_values(by='Participation', ascending=False).head(3)
+    top_events_by_rating = get_top_events('Rating')
+    top_events_by_participation = get_top_events('Participation')
 
-        fig, axes = plt.subplots(nrows=2, ncols=1, figsize=(8, 10))
+    fig = Figure(figsize=(8, 10))
+    axes = fig.subplots(nrows=2, ncols=1)
 
-        # Top events by rating
-        axes[0].bar(top_events_by_rating['Events'], top_events_by_rating['Rating'], color='blue')
-        axes[0].set_title('Top 3 Events Based on Rating')
-        axes[0].set_ylabel('Rating')
+    # Top events by rating
+    axes[0].bar(top_events_by_rating['Events'], top_events_by_rating['Rating'], color='blue')
+    axes[0].set_title('Top 3 Events Based on Rating')
+    axes[0].set_ylabel('Rating')
 
-        # Top events by participation
-        axes[1].bar(top_events_by_participation['Events'], top_events_by_participation['Participation'], color='green')
-        axes[1].set_title('Top 3 Events Based on Participation')
-        axes[1].set_ylabel('Participation')
+    # Top events by participation
+    axes[1].bar(top_events_by_participation['Events'], top_events_by_participation['Participation'], color='green')
+    axes[1].set_title('Top 3 Events Based on Participation')
+    axes[1].set_ylabel('Participation')
 
-        plt.tight_layout()
+    fig.tight_layout()
 
-        current_directory = os.getcwd()
-        path = os.path.join(current_directory, 'auth', 'static')
-        file_name = os.path.join(path, 'Top_event_graph.png')
-        plt.savefig(file_name)
-    except Exception as e:
-        print(f"Error occured While generating the graphs{e}")
+    image = BytesIO()
+    fig.savefig(image, format='png')
+    return image.getvalue()
@@ -0,0 +1,208 @@
+from datetime import date, datetime, timedelta
+from flask import current_app, request
+from sqlalchemy import Date, cast, delete, desc, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from . import db
+from .model import Event, Feedback, event_participant, DailyRegistrations, DailyRatings, RatingTotals
+
+RATINGS = range(1, 6)
+
+
+def _dialect_name():
+    return db.session.connection().dialect.name
+
+
+def _add_to_counters(model, counter, rows):
+    """
+    This function will add each row's counter to the matching store row, creating the rows
+    that do not exist yet, with one executemany upsert
+    """
+    if not rows:
+        return
+    table = model.__table__
+    keys = [column.name for column in table.primary_key]
+    dialect = _dialect_name()
+    if dialect in ('sqlite', 'postgresql'):
+        statement = (sqlite if dialect == 'sqlite' else postgresql).insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=keys, set_={counter: table.c[counter] + statement.excluded[counter]})
+        db.session.execute(statement, rows)
+        return
+    for row in rows:
+        condition = [table.c[key] == row[key] for key in keys]
+        result = db.session.execute(update(table).where(*condition)
+                                    .values({counter: table.c[counter] + row[counter]}))
+        if result.rowcount == 0:
+            db.session.execute(insert(table).values(row))
+
+
+def record_registrations(counts, moment=None):
+    """
+    This function will add new registrations ({event_id: count}) to today's trend rows.
+    Runs in the caller's transaction, next to the event_participant insert
+    """
+    day = (moment or datetime.now()).date()
+    _add_to_counters(DailyRegistrations, 'registrations',
+                     [{'event_id': event_id, 'day': day, 'registrations': count} for event_id, count in counts.items()])
+
+
+def record_ratings(counts, moment=None):
+    """
+    This function will add new ratings ({(event_id, rating): count}) to today's histogram rows
+    and the all-time totals. Runs in the caller's transaction, next to the feedback insert
+    """
+    day = (moment or datetime.now()).date()
+    _add_to_counters(DailyRatings, 'count',
+                     [{'event_id': event_id, 'day': day, 'rating': rating, 'count': count}
+                      for (event_id, rating), count in counts.items()])
+    totals = {}
+    for (_, rating), count in counts.items():
+        totals[rating] = totals.get(rating, 0) + count
+    _add_to_counters(RatingTotals, 'count', [{'rating': rating, 'count': count} for rating, count in totals.items()])
+
+
+def _day_of(column):
+    # sqlite has no DATE type, date() gives the same 'YYYY-MM-DD' text the Date type stores
+    return func.date(column) if _dialect_name() == 'sqlite' else cast(column, Date)
+
+
+def rebuild_store():
+    """
+    This function will recompute the store tables from event_participant and feedbacks.
+    Rows written before registered_at/created_at existed are counted on the event's day.
+    The caller commits
+    """
+    db.session.execute(delete(DailyRegistrations))
+    db.session.execute(delete(DailyRatings))
+    db.session.execute(delete(RatingTotals))
+
+    registration_day = _day_of(func.coalesce(event_participant.c.registered_at, Event.date_time))
+    db.session.execute(insert(DailyRegistrations).from_select(
+        ['event_id', 'day', 'registrations'],
+        select(event_participant.c.event_id, registration_day, func.count())
+        .join(Event, Event.id == event_participant.c.event_id)
+        .group_by(event_participant.c.event_id, registration_day)))
+
+    feedback_day = _day_of(func.coalesce(Feedback.created_at, Event.date_time))
+    db.session.execute(insert(DailyRatings).from_select(
+        ['event_id', 'day', 'rating', 'count'],
+        select(Feedback.event_id, feedback_day, Feedback.rating, func.count())
+        .join(Event, Event.id == Feedback.event_id)
+        .where(Feedback.rating.in_(RATINGS))
+        .group_by(Feedback.event_id, feedback_day, Feedback.rating)))
+    db.session.execute(insert(RatingTotals).from_select(
+        ['rating', 'count'],
+        select(DailyRatings.rating, func.sum(DailyRatings.count)).group_by(DailyRatings.rating)))
+
+
+def delete_event_analytics(event_id):
+    """
+    This function will delete the store rows of an event and take its ratings out of the totals
+    """
+    removed = db.session.execute(select(DailyRatings.rating, func.sum(DailyRatings.count))
+                                 .where(DailyRatings.event_id == event_id).group_by(DailyRatings.rating)).all()
+    _add_to_counters(RatingTotals, 'count', [{'rating': rating, 'count': -count} for rating, count in removed])
+    db.session.execute(delete(DailyRegistrations).where(DailyRegistrations.event_id == event_id))
+    db.session.execute(delete(DailyRatings).where(DailyRatings.event_id == event_id))
+
+
+def analytics_window():
+    """
+    This function will get the window in days from ?days=, one of ANALYTICS_WINDOWS or 0 for all time
+    """
+    days = request.args.get('days', current_app.config['ANALYTICS_DEFAULT_WINDOW'], type=int)
+    return days if days in current_app.config['ANALYTICS_WINDOWS'] else 0
+
+
+def window_start(days):
+    """
+    This function will get the first day of a window of `days` days ending today, None for all time
+    """
+    return date.today() - timedelta(days=days - 1) if days else None
+
+
+def _scoped(query, model, days, event_id=None, organizer_id=None, joined=False):
+    start = window_start(days)
+    if start is not None:
+        query = query.where(model.day >= start)
+    if event_id is not None:
+        query = query.where(model.event_id == event_id)
+    if organizer_id is not None:
+        if not joined:
+            query = query.join(Event, Event.id == model.event_id)
+        query = query.where(Event.organizer_id == organizer_id)
+    return query
+
+
+def registration_trend(days, event_id=None, organizer_id=None):
+    """
+    This function will get [(day, registrations)] for every day of the window, zeros included.
+    The window runs past today when backfilled registrations were counted on later days, so
+    the trend adds up to the same totals as top_events
+    """
+    query = _scoped(select(DailyRegistrations.day, func.sum(DailyRegistrations.registrations)),
+                    DailyRegistrations, days, event_id, organizer_id).group_by(DailyRegistrations.day)
+    per_day = dict(db.session.execute(query).all())
+    start = window_start(days) or min(per_day, default=date.today())
+    end = max(per_day, default=date.today())
+    return [(start + timedelta(days=offset), per_day.get(start + timedelta(days=offset), 0))
+            for offset in range((max(end, date.today()) - start).days + 1)]
+
+
+def rating_distribution(days=None, event_id=None, organizer_id=None):
+    """
+    This function will get {rating: count} for ratings 1-5 in the window, from the all-time
+    totals when the window covers all time and every event
+    """
+    if not days and event_id is None and organizer_id is None:
+        query = select(RatingTotals.rating, RatingTotals.count).where(RatingTotals.rating.in_(RATINGS))
+    else:
+        query = _scoped(select(DailyRatings.rating, func.sum(DailyRatings.count)),
+                        DailyRatings, days, event_id, organizer_id).group_by(DailyRatings.rating)
+    counts = dict(db.session.execute(query).all())
+    return {rating: counts.get(rating, 0) for rating in RATINGS}
+
+
+def top_events(by, days=None, limit=5, organizer_id=None):
+    """
+    This function will get the top events of the window as (id, name, value) rows, by
+    'participation' (registrations in the window) or 'rating' (average of the window's ratings)
+    """
+    if by == 'participation':
+        model = DailyRegistrations
+        value = func.sum(DailyRegistrations.registrations)
+        order = [desc(value)]
+    elif by == 'rating':
+        model = DailyRatings
+        votes = func.sum(DailyRatings.count)
+        value = func.sum(DailyRatings.rating * DailyRatings.count) * 1.0 / votes
+        order = [desc(value), desc(votes)]
+    else:
+        raise ValueError(f"unknown ranking {by!r}")
+
+    query = select(Event.id, Event.name, value.label('value')).join(Event, Event.id == model.event_id)
+    query = _scoped(query, model, days, organizer_id=organizer_id, joined=True) \
+        .group_by(Event.id, Event.name).order_by(*order).limit(limit)
+    return db.session.execute(query).all()
+
+
+def organizer_summary(organizer_id, days=None, limit=5):
+    """
+    This function will get the totals of an organizer's events from the event counters and the
+    windowed views from the store tables
+    """
+    totals = db.session.execute(
+        select(func.count(), func.coalesce(func.sum(Event.participant_count), 0),
+               func.coalesce(func.sum(Event.rating_sum), 0), func.coalesce(func.sum(Event.rating_count), 0))
+        .where(Event.organizer_id == organizer_id)).one()
+    events, registrations, rating_sum, rating_count = totals
+    return {
+        'events': events,
+        'registrations': registrations,
+        'average_rating': rating_sum / rating_count if rating_count else 0,
+        'ratings': rating_count,
+        'trend': registration_trend(days, organizer_id=organizer_id),
+        'distribution': rating_distribution(days, organizer_id=organizer_id),
+        'top_by_participation': top_events('participation', days, limit, organizer_id),
+        'top_by_rating': top_events('rating', days, limit, organizer_id),
+    }
@@ -0,0 +1,267 @@
+import hashlib
+import json
+from datetime import date, datetime, timezone
+from flask import Blueprint, Response, abort, current_app, request
+from flask_login import current_user, login_required
+from sqlalchemy import case, select, true
+from werkzeug.exceptions import HTTPException
+from . import db, login_manager
+from .model import Event
+from .data_version import get_data_version
+from .participation import register_participant, registration_closed, cancel_registration, \
+    participant_events_query, REGISTERED, WAITLISTED, ALREADY_WAITLISTED
+from .analytics_store import top_events, rating_distribution
+from .pagination import get_page_size, paginate_events
+from .feedback import FEEDBACK_SORTS, feedback_page
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+# answer 401 instead of redirecting API clients to the login page
+login_manager.blueprint_login_views['api'] = None
+
+EVENT_FIELDS = {
+    'id': Event.id,
+    'name': Event.name,
+    'description': Event.description,
+    'date_time': Event.date_time,
+    'duration': Event.duration,
+    'end_time': Event.end_time,
+    'location': Event.location,
+    'organizer_id': Event.organizer_id,
+    'participant_count': Event.participant_count,
+    'capacity': Event.capacity,
+    'average_rating': case((Event.rating_count > 0, Event.rating_sum * 1.0 / Event.rating_count),
+                           else_=None).label('average_rating'),
+    'rating_count': Event.rating_count,
+    'updated_at': Event.updated_at,
+}
+EVENT_LIST_FIELDS = ('id', 'name', 'date_time', 'location')
+FEEDBACK_FIELDS = ('id', 'user_id', 'username', 'rating', 'comment', 'created_at')
+EVENT_FILTERS = {
+    'all': lambda now: true(),
+    'upcoming': Event.upcoming,
+    'archived': Event.archived,
+}
+
+
+def _encode(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def json_response(payload, status=200):
+    """
+    This function will serialize the payload compactly, without whitespace, dates as ISO 8601
+    """
+    return Response(json.dumps(payload, separators=(',', ':'), default=_encode), status=status,
+                    mimetype='application/json')
+
+
+@api.errorhandler(HTTPException)
+@api.errorhandler(404)  # the app's own 404 page would take precedence over the class handler
+def api_error(e):
+    return json_response({'error': e.name, 'message': e.description}, e.code)
+
+
+def selected_fields(available, default):
+    """
+    This function will get the fields asked for with ?fields=a,b, 400 for unknown fields
+    """
+    fields = request.args.get('fields')
+    if not fields:
+        return tuple(default)
+    fields = tuple(dict.fromkeys(field.strip() for field in fields.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        abort(400, f"unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+
+
+def _http_date(last_modified):
+    return last_modified.replace(microsecond=0, tzinfo=timezone.utc) if last_modified else None
+
+
+def not_modified(etag, last_modified):
+    """
+    This function will tell whether the client's copy matches the ETag (or, without
+    If-None-Match, is not older than Last-Modified)
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    last_modified = _http_date(last_modified)
+    return bool(last_modified and request.if_modified_since and last_modified <= request.if_modified_since)
+
+
+def with_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = _http_date(last_modified)
+    response.cache_control.no_cache = True
+    response.cache_control.private = True
+    return response
+
+
+def conditional(etag, last_modified, render):
+    """
+    This function will answer 304 when the client's copy is current; only otherwise `render`
+    builds the body
+    """
+    response = Response(status=304) if not_modified(etag, last_modified) else render()
+    return with_validators(response, etag, last_modified)
+
+
+def serialize_rows(rows, fields):
+    return [{field: getattr(row, field) for field in fields} for row in rows]
+
+
+def event_columns(fields):
+    # id and date_time are the pagination keyset, updated_at feeds the validators
+    names = dict.fromkeys(('id', 'date_time', 'updated_at') + fields)
+    return [EVENT_FIELDS[name] for name in names]
+
+
+def event_page(query, fields):
+    """
+    This function will answer one page of events: the page rows are fetched, but when their
+    ids and updated_at match the client's ETag nothing is serialized
+    """
+    rows, next_cursor = paginate_events(query, request.args.get('cursor'))
+    return event_page_response(rows, next_cursor, fields)
+
+
+def event_page_response(rows, next_cursor, fields):
+    etag = make_etag(fields, next_cursor, [(row.id, row.updated_at) for row in rows])
+    last_modified = max((row.updated_at for row in rows if row.updated_at), default=None)
+    return conditional(etag, last_modified,
+                       lambda: json_response({'data': serialize_rows(rows, fields), 'next_cursor': next_cursor}))
+
+
+@api.route('/events')
+@login_required
+def events():
+    """
+    This function will list events (?when=upcoming|archived|all), keyset paginated on (date_time, id)
+    """
+    fields = selected_fields(EVENT_FIELDS, EVENT_LIST_FIELDS)
+    query = db.session.query(*event_columns(fields)).filter(events_filter())
+    return event_page(query, fields)
+
+
+def events_filter():
+    when = request.args.get('when', 'all')
+    if when not in EVENT_FILTERS:
+        abort(400, f"when must be one of {', '.join(EVENT_FILTERS)}")
+    return EVENT_FILTERS[when](datetime.now())
+
+
+@api.route('/events/<event_id>')
+@login_required
+def event_detail(event_id):
+    """
+    This function will get one event; a revalidation only reads its updated_at
+    """
+    fields = selected_fields(EVENT_FIELDS, EVENT_FIELDS)
+    updated_at = _event_updated_at(event_id)
+
+    def render():
+        row = db.session.query(*event_columns(fields)).filter(Event.id == event_id).one()
+        return json_response({'data': serialize_rows([row], fields)[0]})
+    return conditional(make_etag(event_id, fields, updated_at), updated_at, render)
+
+
+def _event_updated_at(event_id):
+    row = db.session.execute(select(Event.updated_at).where(Event.id == event_id)).first()
+    if row is None:
+        abort(404, "event not found")
+    return row.updated_at
+
+
+@api.route('/events/<event_id>/feedback')
+@login_required
+def event_feedback(event_id):
+    """
+    This function will list the feedback of an event (?sort=recent|rating), keyset paginated. Every
+    new rating updates the event's counters and updated_at, so the event row validates the whole list
+    """
+    fields = selected_fields(FEEDBACK_FIELDS, FEEDBACK_FIELDS)
+    sort = request.args.get('sort', 'recent')
+    if sort not in FEEDBACK_SORTS:
+        abort(400, f"sort must be one of {', '.join(FEEDBACK_SORTS)}")
+    updated_at = _event_updated_at(event_id)
+    cursor = request.args.get('cursor')
+    page_size = get_page_size()
+
+    def render():
+        rows, next_cursor = feedback_page(event_id, sort, cursor, page_size)
+        return json_response({'data': serialize_rows(rows, fields), 'next_cursor': next_cursor})
+    return conditional(make_etag(event_id, fields, sort, cursor, page_size, updated_at), updated_at, render)
+
+
+@api.route('/me/registrations')
+@login_required
+def my_registrations():
+    """
+    This function will list the events the current user registered for
+    """
+    fields = selected_fields(EVENT_FIELDS, EVENT_LIST_FIELDS)
+    query = participant_events_query(current_user.id).with_entities(*event_columns(fields))
+    return event_page(query, fields)
+
+
+@api.route('/events/<event_id>/registrations', methods=['POST'])
+@login_required
+def register(event_id):
+    """
+    This function will register the current user for an upcoming event, 201 when registered,
+    202 when put on the waitlist of a full event and 200 when nothing changed
+    """
+    event = db.session.get(Event, event_id)
+    if event is None:
+        abort(404, "event not found")
+    if registration_closed(event.organizer_id, event.date_time, current_user.id):
+        abort(409, "registration is closed for this event")
+    outcome = register_participant(current_user.id, event_id)
+    db.session.commit()
+    waitlisted = outcome in (WAITLISTED, ALREADY_WAITLISTED)
+    status = {REGISTERED: 201, WAITLISTED: 202}.get(outcome, 200)
+    return json_response({'data': {'event_id': event_id, 'registered': not waitlisted, 'waitlisted': waitlisted}},
+                         status)
+
+
+@api.route('/events/<event_id>/registrations', methods=['DELETE'])
+@login_required
+def cancel(event_id):
+    """
+    This function will cancel the current user's registration or waitlist place, 204 when done
+    """
+    if cancel_registration(current_user.id, event_id) is None:
+        abort(404, "not registered for this event")
+    db.session.commit()
+    return Response(status=204)
+
+
+@api.route('/stats')
+@login_required
+def stats():
+    """
+    This function will get the top events and rating distribution of a window (?days=, 0 is all
+    time); validated by the data version, so unchanged stats are never recomputed
+    """
+    days = request.args.get('days', 0, type=int)
+    if days not in current_app.config['ANALYTICS_WINDOWS']:
+        abort(400, f"days must be one of {', '.join(map(str, current_app.config['ANALYTICS_WINDOWS']))}")
+    limit = current_app.config['ANALYTICS_TOP_K']
+    etag = make_etag('stats', get_data_version(), days, limit, date.today())
+
+    def render():
+        return json_response({'data': {
+            'days': days,
+            'top_by_participation': serialize_rows(top_events('participation', days, limit), ('id', 'name', 'value')),
+            'top_by_rating': serialize_rows(top_events('rating', days, limit), ('id', 'name', 'value')),
+            'rating_distribution': rating_distribution(days),
+        }})
+    return conditional(etag, None, render)
@@ -0,0 +1,186 @@
+import io
+import sys
+from a2wsgi import WSGIMiddleware
+from flask import Response, abort, request
+from sqlalchemy import select
+from werkzeug.exceptions import HTTPException
+from .model import Event, User, event_participant
+from .api import EVENT_FIELDS, EVENT_LIST_FIELDS, event_columns, event_page_response, events_filter, \
+    json_response, make_etag, not_modified, selected_fields, serialize_rows, with_validators
+from .async_db import create_async_engine
+from .pagination import get_page_size, keyset_page, split_page
+
+
+async def events(connection, user_id):
+    """
+    This function will list events like GET /api/v1/events, awaiting the page query
+    """
+    fields = selected_fields(EVENT_FIELDS, EVENT_LIST_FIELDS)
+    return await event_page(connection, select(*event_columns(fields)).where(events_filter()), fields)
+
+
+async def event_detail(connection, user_id, event_id):
+    """
+    This function will get one event like GET /api/v1/events/<id>; a revalidation only reads its updated_at
+    """
+    fields = selected_fields(EVENT_FIELDS, EVENT_FIELDS)
+    result = await connection.execute(select(Event.updated_at).where(Event.id == event_id))
+    row = result.first()
+    if row is None:
+        abort(404, "event not found")
+    etag = make_etag(event_id, fields, row.updated_at)
+    if not_modified(etag, row.updated_at):
+        return with_validators(Response(status=304), etag, row.updated_at)
+    result = await connection.execute(select(*event_columns(fields)).where(Event.id == event_id))
+    response = json_response({'data': serialize_rows([result.one()], fields)[0]})
+    return with_validators(response, etag, row.updated_at)
+
+
+async def my_registrations(connection, user_id):
+    """
+    This function will list the user's registrations like GET /api/v1/me/registrations
+    """
+    fields = selected_fields(EVENT_FIELDS, EVENT_LIST_FIELDS)
+    query = select(*event_columns(fields)).join(event_participant, event_participant.c.event_id == Event.id) \
+        .where(event_participant.c.participant_id == user_id)
+    return await event_page(connection, query, fields)
+
+
+async def event_page(connection, query, fields):
+    page_size = get_page_size()
+    result = await connection.execute(keyset_page(query, request.args.get('cursor'), page_size))
+    rows, next_cursor = split_page(result.all(), page_size)
+    return event_page_response(rows, next_cursor, fields)
+
+
+# read-only endpoints answered on the event loop, every other request goes to the Flask app
+ASYNC_VIEWS = {
+    'api.events': events,
+    'api.event_detail': event_detail,
+    'api.my_registrations': my_registrations,
+}
+
+
+def wsgi_environ(scope):
+    """
+    This function will build the WSGI environ of a bodiless ASGI http request, to route it and
+    run the async views in a request context
+    """
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else 'HTTP_' + name
+        value = value.decode('latin-1')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class AsyncEventHub:
+    """
+    ASGI application: the read-only JSON endpoints of ASYNC_VIEWS run as coroutines on an async
+    database driver, so a worker serves many of them concurrently while they wait on the
+    database. Everything else (pages, writes, anonymous or remember-me requests) is run by the
+    Flask app through a2wsgi on a pool of SERVER_THREADS threads, request bodies and responses
+    streamed in chunks.
+    """
+
+    def __init__(self, app, threads=None):
+        self.app = app
+        self.engine = None
+        self.wsgi = WSGIMiddleware(app, workers=threads or app.config['SERVER_THREADS'])
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+        if scope['method'] == 'GET':
+            response = await self.dispatch(wsgi_environ(scope))
+            if response is not None:
+                return await self.send(send, response.status_code, response.headers.to_wsgi_list(),
+                                       response.get_data())
+        await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.dispose()
+                self.wsgi.executor.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def dispose(self):
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.engine = None
+
+    async def dispatch(self, environ):
+        """
+        This function will answer the request when it targets an async view and carries a
+        logged-in session, None to hand it to the Flask app
+        """
+        try:
+            endpoint, view_args = self.app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return None
+        view = ASYNC_VIEWS.get(endpoint)
+        if view is None:
+            return None
+
+        # anonymous sessions and sessions of deleted users are handed to the Flask app before any
+        # request hook ran here, so its hooks and teardown run once
+        session = self.app.session_interface.open_session(self.app, self.app.request_class(environ))
+        user_id = session.get('_user_id') if session is not None else None
+        if user_id is None:
+            return None
+        if self.engine is None:
+            self.engine = create_async_engine(self.app.config)
+        async with self.engine.connect() as connection:
+            user = await connection.execute(select(User.id).where(User.id == user_id))
+            if user.first() is None:
+                return None
+
+            # pushed and popped like Flask.wsgi_app does, so teardown_request handlers run once and
+            # see the error a view raised
+            context = self.app.request_context(environ)
+            context.push()
+            error = None
+            try:
+                try:
+                    response = self.app.preprocess_request()
+                    if response is None:
+                        response = await view(connection, user_id, **view_args)
+                except HTTPException as e:
+                    response = self.app.handle_user_exception(e)
+                except Exception as e:
+                    error = e
+                    response = self.app.handle_exception(e)
+                return self.app.process_response(self.app.make_response(response))
+            finally:
+                context.pop(error)
+
+    @staticmethod
+    async def send(send, status, headers, content):
+        headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': content})
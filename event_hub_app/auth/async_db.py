@@ -0,0 +1,51 @@
+import importlib.util
+from sqlalchemy.engine import make_url
+from .database import engine_options, register_sqlite_pragmas
+from .instrumentation import instrument_engine
+
+# async driver of each database backend, and the packages it needs besides SQLAlchemy
+ASYNC_DRIVERS = {
+    'sqlite': ('sqlite+aiosqlite', ('aiosqlite', 'greenlet')),
+    'postgresql': ('postgresql+asyncpg', ('asyncpg', 'greenlet')),
+}
+# the WSGI adapter running the Flask app for the requests the async views do not answer
+ASGI_PACKAGES = ('a2wsgi',)
+
+
+def async_database_url(url):
+    """
+    This function will get the URL of the same database through its async driver
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"no async driver is configured for {backend} databases")
+    return url.set(drivername=ASYNC_DRIVERS[backend][0])
+
+
+def require_async_packages(url):
+    """
+    This function will fail early, naming what to install, when the ASGI mode cannot run
+    on the configured database
+    """
+    backend = make_url(url).get_backend_name()
+    packages = ASYNC_DRIVERS.get(backend, ('', ()))[1] + ASGI_PACKAGES
+    missing = [package for package in packages if importlib.util.find_spec(package) is None]
+    if missing:
+        raise RuntimeError(f"the ASGI mode needs {', '.join(missing)} (pip install {' '.join(missing)})")
+
+
+def create_async_engine(config):
+    """
+    This function will create the async engine of the configured database, with the same pool
+    options, sqlite pragmas and instrumentation as the app's engine
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine as create_engine
+
+    url = config['SQLALCHEMY_DATABASE_URI']
+    require_async_packages(url)
+    engine = create_engine(async_database_url(url), **engine_options(config))
+    register_sqlite_pragmas(engine.sync_engine, config)
+    if config['INSTRUMENTATION_ENABLED']:
+        instrument_engine(engine.sync_engine)
+    return engine
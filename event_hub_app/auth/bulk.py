@@ -0,0 +1,356 @@
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+from sqlalchemy import bindparam, delete, insert, select, tuple_
+from . import db
+from .model import User, Event, Feedback, WaitlistEntry, event_participant
+from .data_version import bump_data_version
+from .analytics_store import record_registrations, record_ratings
+from .event_counters import claim_seats
+from .page_cache import mark_event_changed
+from . import notifications
+
+FORMATS = ('csv', 'json', 'ndjson')
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportSummary:
+    def __init__(self):
+        self.inserted = 0
+        self.duplicates = 0
+        self.waitlisted = 0
+        self.errors = []
+        # set when the file stopped being readable; the batches before it are committed
+        self.read_error = None
+
+    def error(self, line, message):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'record': line, 'error': message})
+
+    def to_dict(self):
+        return {'inserted': self.inserted, 'duplicates': self.duplicates, 'waitlisted': self.waitlisted,
+                'errors': self.errors, 'read_error': self.read_error}
+
+
+def format_from_filename(file_name):
+    extension = file_name.rsplit('.', 1)[-1].lower()
+    return 'ndjson' if extension == 'jsonl' else extension
+
+
+def _iter_json_array(stream, chunk_size=64 * 1024):
+    """
+    This function will yield the objects of a top-level JSON array while reading it in chunks
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    for chunk in iter(lambda: stream.read(chunk_size), ''):
+        buffer += chunk
+        while True:
+            buffer = buffer.lstrip()
+            if not started:
+                if not buffer:
+                    break
+                if buffer[0] != '[':
+                    raise ValueError("expected a JSON array of records")
+                buffer = buffer[1:]
+                started = True
+            elif buffer.startswith(','):
+                buffer = buffer[1:]
+            elif buffer.startswith(']'):
+                return
+            else:
+                try:
+                    record, end = decoder.raw_decode(buffer)
+                except ValueError:
+                    # the record continues in the next chunk
+                    break
+                yield record
+                buffer = buffer[end:]
+    raise ValueError("unexpected end of the JSON array")
+
+
+def iter_records(stream, file_format):
+    """
+    This function will stream records (dicts) from a text stream in csv, json (array) or ndjson
+    """
+    if file_format == 'csv':
+        yield from csv.DictReader(stream)
+    elif file_format == 'ndjson':
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    elif file_format == 'json':
+        yield from _iter_json_array(stream)
+    else:
+        raise ValueError(f"unsupported format {file_format!r}, expected one of {', '.join(FORMATS)}")
+
+
+def read_records(records, summary):
+    """
+    This function will pass the records through and, when the file turns out unreadable
+    partway (bad JSON, bad encoding, broken CSV), stop there and note the record number in the
+    summary instead of raising, so the caller learns which batches were already committed
+    """
+    number = 0
+    try:
+        for record in records:
+            number += 1
+            yield record
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        summary.read_error = {'record': number + 1, 'error': str(e)}
+
+
+def batched(records, batch_size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _user_ids_by_email(emails):
+    if not emails:
+        return {}
+    rows = db.session.execute(select(User.email, User.id).where(User.email.in_(emails)))
+    return {email: user_id for email, user_id in rows}
+
+
+def _resolve_user_ids(records):
+    """
+    This function will fill user_id from user_email for a whole batch with one query
+    """
+    emails = {record['user_email'] for record in records if not record.get('user_id') and record.get('user_email')}
+    ids = _user_ids_by_email(emails)
+    for record in records:
+        if not record.get('user_id') and record.get('user_email'):
+            record['user_id'] = ids.get(record['user_email'])
+
+
+def _allowed_event_ids(event_ids, organizer_id):
+    query = select(Event.id).where(Event.id.in_(event_ids))
+    if organizer_id is not None:
+        query = query.where(Event.organizer_id == organizer_id)
+    return set(db.session.execute(query).scalars())
+
+
+def _existing_user_ids(user_ids):
+    return set(db.session.execute(select(User.id).where(User.id.in_(user_ids))).scalars())
+
+
+def import_events(records, batch_size=1000, organizer_id=None):
+    """
+    This function will insert events in batched transactions. Names already in the database or
+    earlier in the file are skipped. Rows need name, description, date_time, duration and,
+    unless `organizer_id` is given, organizer_id or organizer_email
+    """
+    summary = ImportSummary()
+    seen_names = set()
+    for batch_number, batch in enumerate(batched(read_records(records, summary), batch_size)):
+        emails = {record.get('organizer_email') for record in batch if not record.get('organizer_id')}
+        organizer_ids = _user_ids_by_email(emails - {None}) if organizer_id is None else {}
+        names = {record.get('name') for record in batch}
+        existing_names = set(db.session.execute(select(Event.name).where(Event.name.in_(names))).scalars())
+
+        rows = []
+        for offset, record in enumerate(batch):
+            line = batch_number * batch_size + offset + 1
+            name = record.get('name')
+            if name in existing_names or name in seen_names:
+                summary.duplicates += 1
+                continue
+            try:
+                date_time = datetime.fromisoformat(record['date_time'])
+                duration = int(record['duration'])
+                row_organizer = organizer_id or record.get('organizer_id') \
+                    or organizer_ids.get(record.get('organizer_email'))
+                if not name or not record.get('description') or not row_organizer or duration < 1:
+                    raise ValueError("name, description, organizer and a positive duration are required")
+            except (KeyError, TypeError, ValueError) as e:
+                summary.error(line, str(e))
+                continue
+            seen_names.add(name)
+            rows.append({'id': str(uuid.uuid4()), 'name': name, 'description': record['description'],
+                         'date_time': date_time, 'duration': duration,
+                         'end_time': Event.end_time_for(date_time, duration), 'location': record.get('location'),
+                         'organizer_id': row_organizer})
+
+        if rows:
+            db.session.execute(insert(Event), rows)
+            mark_event_changed(listings=True)
+            bump_data_version(db.session.connection())
+        db.session.commit()
+        summary.inserted += len(rows)
+    return summary
+
+
+def import_registrations(records, batch_size=1000, organizer_id=None):
+    """
+    This function will register users in batched transactions. Seats are claimed per event
+    with the same conditional UPDATE as a registration from the site, so an import never
+    overbooks: the rows past the capacity go to the waitlist, and seated users leave it.
+    Rows need event_id and user_id or user_email
+    """
+    summary = ImportSummary()
+    for batch_number, batch in enumerate(batched(read_records(records, summary), batch_size)):
+        _resolve_user_ids(batch)
+        pairs = {(record.get('event_id'), record.get('user_id')) for record in batch}
+        event_ids = _allowed_event_ids({event_id for event_id, _ in pairs}, organizer_id)
+        user_ids = _existing_user_ids({user_id for _, user_id in pairs})
+        existing = set(db.session.execute(
+            select(event_participant.c.event_id, event_participant.c.participant_id)
+            .where(tuple_(event_participant.c.event_id, event_participant.c.participant_id).in_(list(pairs)))
+        ).all())
+        waiting = set(db.session.execute(
+            select(WaitlistEntry.event_id, WaitlistEntry.user_id)
+            .where(tuple_(WaitlistEntry.event_id, WaitlistEntry.user_id).in_(list(pairs)))
+        ).all())
+
+        # users of each event in file order, the first ones get the seats left
+        requested = {}
+        for offset, record in enumerate(batch):
+            pair = (record.get('event_id'), record.get('user_id'))
+            if pair[0] not in event_ids or pair[1] not in user_ids:
+                summary.error(batch_number * batch_size + offset + 1, "unknown event or user")
+                continue
+            if pair in existing:
+                summary.duplicates += 1
+                continue
+            existing.add(pair)
+            requested.setdefault(pair[0], []).append(pair[1])
+
+        seated, waitlisted = {}, {}
+        for event_id, event_user_ids in requested.items():
+            taken = claim_seats(event_id, len(event_user_ids))
+            if taken:
+                seated[event_id] = event_user_ids[:taken]
+            for user_id in event_user_ids[taken:]:
+                if (event_id, user_id) in waiting:
+                    summary.duplicates += 1
+                else:
+                    waitlisted.setdefault(event_id, []).append(user_id)
+
+        if seated:
+            db.session.execute(insert(event_participant),
+                               [{'event_id': event_id, 'participant_id': user_id}
+                                for event_id, event_user_ids in seated.items() for user_id in event_user_ids])
+            promoted = [(event_id, user_id) for event_id, event_user_ids in seated.items()
+                        for user_id in event_user_ids if (event_id, user_id) in waiting]
+            if promoted:
+                db.session.execute(delete(WaitlistEntry)
+                                   .where(tuple_(WaitlistEntry.event_id, WaitlistEntry.user_id).in_(promoted)))
+            for event_id, event_user_ids in seated.items():
+                # users who were waiting hear they got a seat, like a promotion from the site
+                notifications.enqueue(notifications.REGISTERED, event_id,
+                                      [user_id for user_id in event_user_ids if (event_id, user_id) not in waiting])
+                notifications.enqueue(notifications.PROMOTED, event_id,
+                                      [user_id for user_id in event_user_ids if (event_id, user_id) in waiting])
+                notifications.schedule_reminders(event_id, event_user_ids)
+            record_registrations({event_id: len(event_user_ids) for event_id, event_user_ids in seated.items()})
+            bump_data_version(db.session.connection())
+        if waitlisted:
+            db.session.execute(insert(WaitlistEntry),
+                               [{'event_id': event_id, 'user_id': user_id}
+                                for event_id, event_user_ids in waitlisted.items() for user_id in event_user_ids])
+            for event_id, event_user_ids in waitlisted.items():
+                notifications.enqueue(notifications.WAITLISTED, event_id, event_user_ids)
+        # the jobs commit with the registrations they report
+        db.session.commit()
+        summary.inserted += sum(map(len, seated.values()))
+        summary.waitlisted += sum(map(len, waitlisted.values()))
+    return summary
+
+
+def import_feedback(records, batch_size=1000, organizer_id=None):
+    """
+    This function will insert feedback rows in batched transactions, one per user and event,
+    and add them to the rating counters. Rows need event_id, user_id or user_email, rating
+    """
+    events = Event.__table__
+    summary = ImportSummary()
+    for batch_number, batch in enumerate(batched(read_records(records, summary), batch_size)):
+        _resolve_user_ids(batch)
+        pairs = {(record.get('event_id'), record.get('user_id')) for record in batch}
+        event_ids = _allowed_event_ids({event_id for event_id, _ in pairs}, organizer_id)
+        user_ids = _existing_user_ids({user_id for _, user_id in pairs})
+        existing = set(db.session.execute(
+            select(Feedback.event_id, Feedback.user_id)
+            .where(tuple_(Feedback.event_id, Feedback.user_id).in_(list(pairs)))
+        ).all())
+
+        rows = []
+        ratings = {}
+        histogram = {}
+        for offset, record in enumerate(batch):
+            line = batch_number * batch_size + offset + 1
+            pair = (record.get('event_id'), record.get('user_id'))
+            if pair[0] not in event_ids or pair[1] not in user_ids:
+                summary.error(line, "unknown event or user")
+                continue
+            if pair in existing:
+                summary.duplicates += 1
+                continue
+            try:
+                rating = int(record.get('rating'))
+                if not 1 <= rating <= 5:
+                    raise ValueError("Rating must be between 1 and 5")
+            except (TypeError, ValueError) as e:
+                summary.error(line, str(e))
+                continue
+            existing.add(pair)
+            rows.append({'event_id': pair[0], 'user_id': pair[1], 'rating': rating,
+                         'comment': record.get('comment')})
+            rating_sum, rating_count = ratings.get(pair[0], (0, 0))
+            ratings[pair[0]] = (rating_sum + rating, rating_count + 1)
+            histogram[(pair[0], rating)] = histogram.get((pair[0], rating), 0) + 1
+
+        if rows:
+            db.session.execute(insert(Feedback), rows)
+            db.session.execute(events.update().where(events.c.id == bindparam('rated_event_id'))
+                               .values(rating_sum=events.c.rating_sum + bindparam('added_sum'),
+                                       rating_count=events.c.rating_count + bindparam('added_count')),
+                               [{'rated_event_id': event_id, 'added_sum': rating_sum, 'added_count': rating_count}
+                                for event_id, (rating_sum, rating_count) in ratings.items()])
+            record_ratings(histogram)
+            mark_event_changed(*ratings)
+            bump_data_version(db.session.connection())
+        db.session.commit()
+        summary.inserted += len(rows)
+    return summary
+
+
+IMPORTERS = {
+    'events': import_events,
+    'registrations': import_registrations,
+    'feedback': import_feedback,
+}
+
+
+def export_attendees(event_id, chunk_size=1000):
+    """
+    This function will yield the attendee list of an event as CSV lines, fetching rows in
+    chunks from a server-side cursor so the full list is never held in memory
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writerow(['user_id', 'username', 'email', 'phone_number'])
+    yield flush()
+    query = select(User.id, User.username, User.email, User.phone_number) \
+        .join(event_participant, event_participant.c.participant_id == User.id) \
+        .where(event_participant.c.event_id == event_id) \
+        .execution_options(yield_per=chunk_size)
+    for partition in db.session.execute(query).partitions():
+        writer.writerows(partition)
+        yield flush()
@@ -0,0 +1,269 @@
+import glob
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+MISSING = object()
+TAG_PREFIX = 'tag:'
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+
+def _count(namespace, field):
+    with _stats_lock:
+        stats = _stats.setdefault(namespace, CacheStats())
+        setattr(stats, field, getattr(stats, field) + 1)
+
+
+def get_cache_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+class NullCache:
+    """Stores nothing, every lookup is a miss."""
+
+    def get_many(self, keys):
+        return [MISSING] * len(keys)
+
+    def set(self, key, value, ttl):
+        pass
+
+    def clear(self):
+        pass
+
+
+class MemoryCache:
+    """Per-process LRU with a TTL per entry."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None or (entry[0] is not None and entry[0] < now):
+                    self._entries.pop(key, None)
+                    values.append(MISSING)
+                else:
+                    self._entries.move_to_end(key)
+                    values.append(entry[1])
+        return values
+
+    def set(self, key, value, ttl):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FileSystemCache:
+    """One pickle file per entry, shared by every process on the host."""
+
+    def __init__(self, directory, max_entries):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + '.cache')
+
+    def get_many(self, keys):
+        values = []
+        for key in keys:
+            try:
+                with open(self._path(key), 'rb') as entry:
+                    expires_at, value = pickle.load(entry)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                values.append(MISSING)
+                continue
+            values.append(MISSING if expires_at and expires_at < time.time() else value)
+        return values
+
+    def set(self, key, value, ttl):
+        data = pickle.dumps((time.time() + ttl if ttl else None, value), pickle.HIGHEST_PROTOCOL)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            os.unlink(temp_path)
+            raise
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._prune()
+
+    def _prune(self):
+        entries = sorted(glob.glob(os.path.join(self.directory, '*.cache')), key=os.path.getmtime, reverse=True)
+        for path in entries[self.max_entries:]:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        for path in glob.glob(os.path.join(self.directory, '*.cache')):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+class RedisCache:
+    """Any Redis-compatible server, shared by every process; needs the redis package."""
+
+    def __init__(self, url, prefix='eventhub:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis needs the redis package (pip install redis)")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get_many(self, keys):
+        values = self.client.mget([self.prefix + key for key in keys])
+        return [MISSING if value is None else pickle.loads(value) for value in values]
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ex=ttl or None)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+
+def create_backend(config):
+    backend = config['CACHE_BACKEND']
+    if backend == 'memory':
+        return MemoryCache(config['CACHE_MAX_ENTRIES'])
+    if backend == 'filesystem':
+        return FileSystemCache(config['CACHE_DIR'], config['CACHE_MAX_ENTRIES'])
+    if backend == 'redis':
+        return RedisCache(config['CACHE_REDIS_URL'])
+    if backend == 'null':
+        return NullCache()
+    raise ValueError(f"unknown CACHE_BACKEND {backend!r}")
+
+
+def get_backend():
+    return current_app.extensions['event_hub_cache']
+
+
+def _generations(backend, tags):
+    """
+    This function will get the current generation of each tag. A tag without one (never used,
+    evicted or expired) gets a new generation, which can only cause misses, never stale hits
+    """
+    keys = [TAG_PREFIX + tag for tag in tags]
+    generations = backend.get_many(keys)
+    for index, generation in enumerate(generations):
+        if generation is MISSING:
+            generations[index] = uuid.uuid4().hex[:12]
+            backend.set(keys[index], generations[index], None)
+    return generations
+
+
+def cached(key, produce, tags=(), ttl=None):
+    """
+    This function will get the value cached under `key` or store what `produce()` returns.
+    The generations of `tags` are part of the stored key, so invalidating a tag orphans every
+    value cached with it. The key's first ':'-separated part names it in the statistics
+    """
+    backend = get_backend()
+    namespace = key.split(':', 1)[0]
+    full_key = '|'.join([key, *_generations(backend, tags)])
+    value = backend.get_many([full_key])[0]
+    if value is not MISSING:
+        _count(namespace, 'hits')
+        return value
+    _count(namespace, 'misses')
+    value = produce()
+    backend.set(full_key, value, ttl or current_app.config['CACHE_DEFAULT_TTL'])
+    return value
+
+
+def cached_many(keys, produce_missing, ttl=None):
+    """
+    This function will get the values cached under `keys` with one backend lookup and store
+    the ones `produce_missing(missing_keys)` returns (a {key: value} dict) for the others.
+    For values whose keys change with their content, so they need no tags
+    """
+    if not keys:
+        return []
+    backend = get_backend()
+    values = backend.get_many(keys)
+    missing = [key for key, value in zip(keys, values) if value is MISSING]
+    missing_keys = set(missing)
+    for key in keys:
+        _count(key.split(':', 1)[0], 'misses' if key in missing_keys else 'hits')
+    if missing:
+        produced = produce_missing(missing)
+        ttl = ttl or current_app.config['CACHE_DEFAULT_TTL']
+        for key, value in produced.items():
+            backend.set(key, value, ttl)
+        values = [produced[key] if value is MISSING else value for key, value in zip(keys, values)]
+    return values
+
+
+def invalidate(*tags):
+    backend = get_backend()
+    for tag in tags:
+        backend.set(TAG_PREFIX + tag, uuid.uuid4().hex[:12], None)
+        _count(tag.split(':', 1)[0], 'invalidations')
+
+
+def mark_changed(session, *tags):
+    """
+    This function will queue tags to invalidate once the session's transaction commits
+    """
+    session.info.setdefault('cache_tags', set()).update(tags)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    tags = session.info.pop('cache_tags', None)
+    if tags and has_app_context():
+        invalidate(*tags)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_on_rollback(session):
+    session.info.pop('cache_tags', None)
+
+
+def init_cache(app):
+    app.extensions['event_hub_cache'] = create_backend(app.config)
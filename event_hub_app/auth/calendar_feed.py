@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta
+from flask import Response, current_app, url_for
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import func, select
+from . import db
+from .cache import cached_many
+from .model import Event, event_participant
+from .api import conditional, make_etag
+
+RANGE_COLUMNS = (Event.id, Event.name, Event.date_time, Event.end_time, Event.duration, Event.location)
+VEVENT_COLUMNS = RANGE_COLUMNS + (Event.description, Event.updated_at)
+# what a feed's validators are computed from, the VEVENTs are only loaded for the cache misses
+FEED_COLUMNS = (Event.id, Event.updated_at)
+ICS_DATE_TIME = '%Y%m%dT%H%M%S'
+
+
+def max_duration():
+    """
+    This function will get the longest event duration in minutes, one seek on ix_events_duration
+    """
+    return db.session.execute(select(func.max(Event.duration))).scalar() or 0
+
+
+def overlapping(start, end):
+    """
+    This function will build the conditions of events overlapping [start, end). No event runs
+    longer than the longest duration, so only events starting that long before the window can
+    reach into it: the date_time index is scanned over the window plus that bound, not from the
+    beginning of time as `end_time > start` alone would need
+    """
+    earliest_start = start - timedelta(minutes=max_duration())
+    return (Event.date_time >= earliest_start, Event.date_time < end, Event.end_time > start)
+
+
+def events_in_range(start, end, columns=RANGE_COLUMNS):
+    query = select(*columns).where(*overlapping(start, end)).order_by(Event.date_time, Event.id)
+    return db.session.execute(query).all()
+
+
+def registered_events(user_id, columns=RANGE_COLUMNS, start=None, end=None):
+    """
+    This function will get the user's registered events, those overlapping [start, end) when
+    given, driven by the participant_id index
+    """
+    query = select(*columns).join(event_participant, event_participant.c.event_id == Event.id) \
+        .where(event_participant.c.participant_id == user_id)
+    if start is not None:
+        query = query.where(Event.end_time > start)
+    if end is not None:
+        query = query.where(Event.date_time < end)
+    return db.session.execute(query.order_by(Event.date_time, Event.id)).all()
+
+
+def find_overlaps(events):
+    """
+    This function will get the (earlier id, later id) pairs of events whose times overlap, from
+    events sorted by date_time, sweeping once with the events still running
+    """
+    overlaps = []
+    running = []
+    for event in events:
+        running = [other for other in running if other.end_time > event.date_time]
+        overlaps.extend((other.id, event.id) for other in running)
+        running.append(event)
+    return overlaps
+
+
+def calendar_token(user_id):
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='calendar-feed').dumps(user_id)
+
+
+def user_for_calendar_token(token):
+    """
+    This function will get the user id a feed token was signed for, None when it is forged
+    """
+    try:
+        return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='calendar-feed').loads(token)
+    except BadSignature:
+        return None
+
+
+def escape_text(value):
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,') \
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def fold(line):
+    """
+    This function will fold a content line into 75-octet pieces, continuations start with a space
+    """
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    pieces = []
+    while encoded:
+        size = min(len(encoded), 75 if not pieces else 74)
+        # never split a multi-byte character
+        while size < len(encoded) and (encoded[size] & 0xC0) == 0x80:
+            size -= 1
+        pieces.append(encoded[:size].decode('utf-8'))
+        encoded = encoded[size:]
+    return '\r\n '.join(pieces)
+
+
+def render_vevent(event):
+    """
+    This function will render one event as a VEVENT. Event times are local wall-clock times,
+    so they are written as floating times; DTSTAMP is the UTC time of the last change
+    """
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{event.id}@eventhub',
+        f'DTSTAMP:{event.updated_at.strftime(ICS_DATE_TIME)}Z' if event.updated_at else None,
+        f'DTSTART:{event.date_time.strftime(ICS_DATE_TIME)}',
+        f'DTEND:{event.end_time.strftime(ICS_DATE_TIME)}',
+        f'SUMMARY:{escape_text(event.name)}',
+        f'DESCRIPTION:{escape_text(event.description)}',
+        f'LOCATION:{escape_text(event.location)}',
+        f"URL:{url_for('events.event_details', event_id=event.id, _external=True)}",
+        'END:VEVENT',
+    ]
+    return ''.join(fold(line) + '\r\n' for line in lines if line)
+
+
+def parse_local_date_time(value):
+    """
+    This function will parse an ISO 8601 date time as the naive local time events are stored in,
+    converting it when it carries an offset
+    """
+    date_time = datetime.fromisoformat(value)
+    if date_time.tzinfo is not None:
+        date_time = date_time.astimezone().replace(tzinfo=None)
+    return date_time
+
+
+def feed_window(now):
+    config = current_app.config
+    return now - timedelta(days=config['CALENDAR_FEED_PAST_DAYS']), \
+        now + timedelta(days=config['CALENDAR_FEED_FUTURE_DAYS'])
+
+
+def render_calendar(name, rows):
+    """
+    This function will render the feed of the events in rows (id, updated_at). Each VEVENT is
+    cached under the event's updated_at, so only the events changed since the last render are
+    loaded in full and rendered again
+    """
+    # the VEVENT links to the event with the host it was requested on
+    host = url_for('auth.home', _external=True)
+
+    def vevent_key(row):
+        return f"vevent:{row.id}:{row.updated_at.isoformat() if row.updated_at else ''}:{host}"
+
+    keys = {vevent_key(row): row.id for row in rows}
+
+    def produce(missing):
+        ids = [keys[key] for key in missing]
+        events = db.session.execute(select(*VEVENT_COLUMNS).where(Event.id.in_(ids))).all()
+        return {vevent_key(event): render_vevent(event) for event in events}
+
+    vevents = cached_many(list(keys), produce)
+    header = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Event Hub//Calendar//EN', 'CALSCALE:GREGORIAN',
+              f'X-WR-CALNAME:{escape_text(name)}']
+    return ''.join(fold(line) + '\r\n' for line in header) + ''.join(vevents) + 'END:VCALENDAR\r\n'
+
+
+def feed_response(name, rows):
+    """
+    This function will answer the feed of the events in rows (id, updated_at): 304 when the
+    client's copy has the same events at the same updated_at, otherwise the calendar. There is
+    no Last-Modified, the latest updated_at does not move when an event leaves the feed
+    """
+    etag = make_etag('ics', name, [(row.id, row.updated_at) for row in rows])
+    return conditional(etag, None, lambda: Response(render_calendar(name, rows), mimetype='text/calendar'))
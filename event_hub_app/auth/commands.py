@@ -0,0 +1,153 @@
+import json
+import click
+from flask import Blueprint, current_app
+from sqlalchemy import select, update
+from . import db
+from .model import Event
+from .event_counters import reconcile_counters
+from .analytics_store import rebuild_store
+from .search import rebuild_search_index
+from .notifications import create_sink, run_worker
+from .bulk import FORMATS, IMPORTERS, format_from_filename, iter_records, export_attendees
+
+# top-level `flask` commands (no group)
+commands = Blueprint('commands', __name__, cli_group=None)
+# reports.SNAPSHOT_FORMATS, spelled out so loading the CLI does not import pandas
+REPORT_FORMATS = ('parquet', 'feather', 'pickle')
+
+
+@commands.cli.command('backfill-end-time')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows updated per transaction.')
+@click.option('--all', 'recompute_all', is_flag=True, help='Recompute end_time for every event, not only missing ones.')
+def backfill_end_time(batch_size, recompute_all):
+    """Compute events.end_time from date_time + duration for existing rows."""
+    last_id = ''
+    updated = 0
+    while True:
+        query = select(Event.id, Event.date_time, Event.duration).where(Event.id > last_id)
+        if not recompute_all:
+            query = query.where(Event.end_time.is_(None))
+        rows = db.session.execute(query.order_by(Event.id).limit(batch_size)).all()
+        if not rows:
+            break
+
+        db.session.execute(update(Event), [
+            {'id': row.id, 'end_time': Event.end_time_for(row.date_time, row.duration)} for row in rows
+        ])
+        db.session.commit()
+        updated += len(rows)
+        last_id = rows[-1].id
+    click.echo(f"Backfilled end_time for {updated} events")
+
+
+@commands.cli.command('reconcile-counters')
+def reconcile_event_counters():
+    """Recompute participant and rating counters of every event from the source tables."""
+    updated = reconcile_counters()
+    db.session.commit()
+    click.echo(f"Reconciled counters for {updated} events")
+
+
+@commands.cli.command('rebuild-analytics')
+def rebuild_analytics():
+    """Recompute the daily registration and rating tables from the source tables."""
+    rebuild_store()
+    db.session.commit()
+    click.echo("Rebuilt the analytics tables")
+
+
+@commands.cli.command('rebuild-search-index')
+def rebuild_event_search_index():
+    """Reindex every event for full-text search (needed after VACUUM or restoring a backup)."""
+    rebuild_search_index()
+    db.session.commit()
+    click.echo("Rebuilt the event search index")
+
+
+@commands.cli.command('event-report')
+@click.option('--by', type=click.Choice(['event', 'organizer']), default='event', show_default=True)
+@click.option('--refresh', is_flag=True, help='Reload from the database instead of the last snapshot.')
+@click.option('--format', 'file_format', type=click.Choice(REPORT_FORMATS),
+              help='Snapshot format, parquet when pyarrow is installed, pickle otherwise.')
+@click.option('--output', type=click.Path(dir_okay=False), help='Write the report as CSV instead of printing it.')
+def event_report(by, refresh, file_format, output):
+    """Rating, participation and no-show statistics over the full history."""
+    from .reports import get_frames, event_statistics, organizer_statistics, participation_percentiles
+    try:
+        frames = get_frames(refresh, file_format)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    stats = event_statistics(frames)
+    if by == 'organizer':
+        report = organizer_statistics(stats)
+    else:
+        report = stats.drop(columns=['organizer_id', 'date_time', 'end_time'])
+    if output:
+        report.to_csv(output)
+    else:
+        click.echo(report.sort_values('bayesian_rating', ascending=False).to_string())
+        click.echo("\nParticipation percentiles:\n" + participation_percentiles(stats).to_string())
+
+
+def _run_import(kind, file, file_format, batch_size):
+    file_format = file_format or format_from_filename(file.name)
+    summary = IMPORTERS[kind](iter_records(file, file_format), batch_size=batch_size)
+    click.echo(json.dumps(summary.to_dict(), indent=2))
+    if summary.read_error:
+        raise click.ClickException(f"stopped at record {summary.read_error['record']}: {summary.read_error['error']}")
+
+
+def _import_command(kind, help_text):
+    @click.argument('file', type=click.File('r', encoding='utf-8-sig'))
+    @click.option('--format', 'file_format', type=click.Choice(FORMATS), help='Defaults to the file extension.')
+    @click.option('--batch-size', default=1000, show_default=True, help='Rows inserted per transaction.')
+    def command(file, file_format, batch_size):
+        _run_import(kind, file, file_format, batch_size)
+    command.__doc__ = help_text
+    return commands.cli.command(f'import-{kind}')(command)
+
+
+_import_command('events', "Import events (name, description, date_time, duration, location, organizer_email).")
+_import_command('registrations', "Import registrations (event_id, user_id or user_email).")
+_import_command('feedback', "Import feedback (event_id, user_id or user_email, rating, comment).")
+
+
+@commands.cli.command('export-attendees')
+@click.argument('event_id')
+@click.option('--output', type=click.File('w', encoding='utf-8'), default='-', help='Defaults to stdout.')
+def export_event_attendees(event_id, output):
+    """Write the attendees of an event as CSV."""
+    for chunk in export_attendees(event_id):
+        output.write(chunk)
+
+
+@commands.cli.command('notifications-worker')
+@click.option('--batch-size', type=int, help='Jobs claimed at a time, defaults to NOTIFICATION_BATCH_SIZE.')
+@click.option('--once', is_flag=True, help='Exit once no job is due instead of polling.')
+def notifications_worker(batch_size, once):
+    """Deliver queued registration, update, cancellation and reminder notifications."""
+    sink = create_sink(current_app.config)
+    try:
+        delivered, undelivered = run_worker(sink, batch_size or current_app.config['NOTIFICATION_BATCH_SIZE'],
+                                            current_app.config['NOTIFICATION_POLL_SECONDS'], once)
+    except KeyboardInterrupt:
+        return
+    click.echo(f"Delivered {delivered} notifications, {undelivered} to retry or failed")
+
+
+@commands.cli.command('rebuild-recommendations')
+@click.option('--every', type=float, metavar='MINUTES', help='Keep running, rebuilding every MINUTES.')
+def rebuild_event_recommendations(every):
+    """Recompute the "events you may like" of every user from co-attendance and ratings."""
+    import time
+    from .recommendations import rebuild_recommendations
+    while True:
+        summary = rebuild_recommendations()
+        click.echo(f"Stored {summary['recommendations']} recommendations for {summary['users']} users from "
+                   f"{summary['interactions']} registrations and ratings in {summary['total_seconds']}s")
+        if not every:
+            return
+        try:
+            time.sleep(every * 60)
+        except KeyboardInterrupt:
+            return
@@ -0,0 +1,105 @@
+import glob
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from flask import current_app
+
+MANIFEST_FILE = 'manifest.json'
+IMAGE_PATTERN = 'top_events_{digest}.png'
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dashboard')
+_pending = {}
+_lock = threading.Lock()
+
+
+def image_directory():
+    directory = current_app.config['DASHBOARD_IMAGE_DIR']
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def _write_atomically(path, data):
+    """
+    This function will write the data to a temp file next to `path` and rename it in place,
+    so concurrent readers never see a partially written file
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            temp_file.write(data)
+        os.replace(temp_path, path)
+    except Exception:
+        os.unlink(temp_path)
+        raise
+
+
+def read_manifest():
+    """
+    This function will get the {version, filename} of the last rendered graph, if any
+    """
+    try:
+        with open(os.path.join(image_directory(), MANIFEST_FILE)) as manifest:
+            return json.load(manifest)
+    except (OSError, ValueError):
+        return None
+
+
+def _prune_old_images(keep):
+    images = sorted(glob.glob(os.path.join(image_directory(), IMAGE_PATTERN.format(digest='*'))),
+                    key=os.path.getmtime, reverse=True)
+    for path in images[keep:]:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def regenerate(app, version):
+    """
+    This function will render the graph for `version` and store it under a content-hashed name.
+    The graph code (pandas, matplotlib) is only imported by the first render
+    """
+    try:
+        with app.app_context():
+            from .analytics_dashboard import generate_graph
+            image = generate_graph()
+            file_name = IMAGE_PATTERN.format(digest=sha256(image).hexdigest()[:16])
+            path = os.path.join(image_directory(), file_name)
+            if not os.path.exists(path):
+                _write_atomically(path, image)
+            os.utime(path)
+            manifest = json.dumps({'version': version, 'filename': file_name}).encode()
+            _write_atomically(os.path.join(image_directory(), MANIFEST_FILE), manifest)
+            _prune_old_images(current_app.config['DASHBOARD_IMAGES_KEPT'])
+            return file_name
+    finally:
+        with _lock:
+            _pending.pop(version, None)
+
+
+def schedule_regeneration(version):
+    """
+    This function will queue a background render for `version`, at most once per version
+    """
+    with _lock:
+        future = _pending.get(version)
+        if future is None:
+            future = _executor.submit(regenerate, current_app._get_current_object(), version)
+            _pending[version] = future
+        return future
+
+
+def get_dashboard_image(version):
+    """
+    This function will get the graph filename for `version`. A stale graph is served while the
+    new one renders in the background; only the very first render is waited for
+    """
+    manifest = read_manifest()
+    if manifest and os.path.exists(os.path.join(image_directory(), manifest['filename'])):
+        if manifest['version'] < version:
+            schedule_regeneration(version)
+        return manifest['filename']
+    return schedule_regeneration(version).result(timeout=current_app.config['DASHBOARD_RENDER_TIMEOUT'])
@@ -0,0 +1,46 @@
+from sqlalchemy import event, inspect, insert, select, update
+from sqlalchemy.orm import Session
+from . import db
+from .model import User, Event, Feedback, DataVersion
+
+DASHBOARD = 'dashboard'
+
+
+def bump_data_version(connection, name=DASHBOARD):
+    """
+    This function will increment the stored data version, creating the row on first use.
+    Call it in the same transaction as any write that bypasses the ORM (core inserts/updates)
+    """
+    result = connection.execute(update(DataVersion).where(DataVersion.name == name)
+                                .values(version=DataVersion.version + 1))
+    if result.rowcount == 0:
+        connection.execute(insert(DataVersion).values(name=name, version=1))
+
+
+def get_data_version(name=DASHBOARD):
+    """
+    This function will get the current data version, 0 when nothing was written yet
+    """
+    version = db.session.execute(select(DataVersion.version).where(DataVersion.name == name)).scalar()
+    return version or 0
+
+
+def _touches_dashboard_data(session):
+    """
+    This function will check whether a flush changed events, feedbacks or event_participant rows
+    """
+    for instance in session.new | session.deleted:
+        if isinstance(instance, (Event, Feedback)):
+            return True
+    for instance in session.dirty:
+        if isinstance(instance, (Event, Feedback)) and session.is_modified(instance):
+            return True
+        if isinstance(instance, User) and inspect(instance).attrs.attended_events.history.has_changes():
+            return True
+    return False
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_on_flush(session, flush_context):
+    if _touches_dashboard_data(session):
+        bump_data_version(session.connection())
@@ -0,0 +1,73 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def normalize_database_url(url):
+    """
+    This function will accept the postgres:// scheme some hosting providers hand out
+    """
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(config):
+    """
+    This function will build SQLALCHEMY_ENGINE_OPTIONS for the configured database
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite':
+        # waiting on locks is done by the busy_timeout pragma
+        return {'connect_args': {'timeout': config['SQLITE_BUSY_TIMEOUT_MS'] / 1000}}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': True,
+    }
+
+
+def sqlite_pragmas(config):
+    return [
+        ('journal_mode', config['SQLITE_JOURNAL_MODE']),
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT_MS']),
+        ('mmap_size', config['SQLITE_MMAP_SIZE']),
+        ('cache_size', config['SQLITE_CACHE_SIZE']),
+    ]
+
+
+def register_sqlite_pragmas(engine, config):
+    """
+    This function will apply the configured pragmas to every new connection of a sqlite engine
+    (or the sync_engine of an async one); engines of other databases are left untouched
+    """
+    if engine.url.get_backend_name() != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(config)
+
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    event.listen(engine, 'connect', set_sqlite_pragmas)
+
+
+def configure_database(app):
+    """
+    This function will prepare the database settings, before db.init_app creates the engine
+    """
+    app.config['SQLALCHEMY_DATABASE_URI'] = normalize_database_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
+
+def init_database(app, db):
+    """
+    This function will hook the pragmas on the app's own engine, once per app
+    """
+    with app.app_context():
+        engine = db.engine
+    register_sqlite_pragmas(engine, app.config)
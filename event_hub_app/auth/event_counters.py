@@ -0,0 +1,76 @@
+from sqlalchemy import func, or_, select, update
+from . import db
+from .model import Event, Feedback, event_participant
+from .page_cache import mark_event_changed
+
+
+def increment_participants(event_id, delta=1):
+    """
+    This function will adjust the denormalized participant count in the current transaction
+    """
+    db.session.execute(update(Event).where(Event.id == event_id)
+                       .values(participant_count=Event.participant_count + delta))
+    mark_event_changed(event_id)
+
+
+def _take_seats(event_id, count, condition):
+    result = db.session.execute(update(Event).where(Event.id == event_id, condition)
+                                .values(participant_count=Event.participant_count + count)
+                                .execution_options(synchronize_session=False))
+    if result.rowcount == 0:
+        return False
+    mark_event_changed(event_id)
+    return True
+
+
+def claim_seat(event_id):
+    """
+    This function will take one seat of the event if it has one left, as a single conditional
+    UPDATE: the capacity check and the increment happen under the row's write lock, so concurrent
+    registrations cannot both take the last seat. Returns whether a seat was taken
+    """
+    return _take_seats(event_id, 1, or_(Event.capacity.is_(None), Event.participant_count < Event.capacity))
+
+
+def claim_seats(event_id, count):
+    """
+    This function will take up to `count` seats of the event with the same conditional UPDATE
+    as claim_seat, and when they do not all fit, the seats left. Returns the number taken
+    """
+    if _take_seats(event_id, count, or_(Event.capacity.is_(None),
+                                        Event.participant_count + count <= Event.capacity)):
+        return count
+    # on sqlite the failed claim already holds the write lock, elsewhere the row lock keeps this read valid
+    left = db.session.execute(select(Event.capacity - Event.participant_count)
+                              .where(Event.id == event_id).with_for_update()).scalar()
+    taken = min(count, max(left or 0, 0))
+    if taken and _take_seats(event_id, taken, Event.participant_count + taken <= Event.capacity):
+        return taken
+    return 0
+
+
+def add_rating(event_id, rating):
+    """
+    This function will add one rating to the denormalized rating sum/count in the current transaction
+    """
+    db.session.execute(update(Event).where(Event.id == event_id)
+                       .values(rating_sum=Event.rating_sum + rating, rating_count=Event.rating_count + 1))
+    mark_event_changed(event_id)
+
+
+def reconcile_counters():
+    """
+    This function will recompute every event's counters from event_participant and feedbacks
+    and return the number of events updated. The caller commits
+    """
+    participant_count = select(func.count()).select_from(event_participant) \
+        .where(event_participant.c.event_id == Event.id).scalar_subquery()
+    rating_sum = select(func.coalesce(func.sum(Feedback.rating), 0)) \
+        .where(Feedback.event_id == Event.id).scalar_subquery()
+    rating_count = select(func.count(Feedback.rating)) \
+        .where(Feedback.event_id == Event.id).scalar_subquery()
+
+    result = db.session.execute(update(Event).values(participant_count=participant_count, rating_sum=rating_sum,
+                                                     rating_count=rating_count)
+                                .execution_options(synchronize_session=False))
+    return result.rowcount
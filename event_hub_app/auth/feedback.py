@@ -0,0 +1,64 @@
+from sqlalchemy import select, tuple_
+from . import db
+from .model import Feedback, User
+from .analytics_store import rating_distribution
+
+FEEDBACK_SORTS = ('recent', 'rating')
+
+
+def encode_feedback_cursor(sort, row):
+    return str(row.id) if sort == 'recent' else f'{row.rating}:{row.id}'
+
+
+def decode_feedback_cursor(sort, cursor):
+    """
+    This function will decode a cursor to the keyset of its sort order, None when missing or invalid
+    """
+    if not cursor:
+        return None
+    try:
+        if sort == 'recent':
+            return int(cursor)
+        rating, feedback_id = cursor.split(':', 1)
+        return int(rating), int(feedback_id)
+    except ValueError:
+        return None
+
+
+def feedback_page(event_id, sort='recent', cursor=None, page_size=20):
+    """
+    This function will get one page of an event's feedback with the reviewers' usernames, newest
+    first or best rated first. Both orders walk an (event_id, ...) index from the cursor, so a page
+    costs the same however many reviews the event has. Returns the rows and the next cursor
+    """
+    query = select(Feedback.id, Feedback.user_id, User.username, Feedback.rating, Feedback.comment,
+                   Feedback.created_at) \
+        .join(User, User.id == Feedback.user_id).where(Feedback.event_id == event_id)
+    keyset = decode_feedback_cursor(sort, cursor)
+    if sort == 'recent':
+        if keyset is not None:
+            query = query.where(Feedback.id < keyset)
+        query = query.order_by(Feedback.id.desc())
+    else:
+        if keyset is not None:
+            query = query.where(tuple_(Feedback.rating, Feedback.id) < tuple_(*keyset))
+        query = query.order_by(Feedback.rating.desc(), Feedback.id.desc())
+    rows = db.session.execute(query.limit(page_size + 1)).all()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_feedback_cursor(sort, rows[-1])
+    return rows, next_cursor
+
+
+def rating_summary(rating_sum, rating_count, event_id):
+    """
+    This function will get the average from the event counters and the histogram from the
+    analytics store, neither reads the feedbacks table
+    """
+    return {
+        'average': rating_sum / rating_count if rating_count else 0,
+        'count': rating_count,
+        'histogram': rating_distribution(event_id=event_id),
+    }
@@ -1,5 +1,5 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, IntegerField, PasswordField, SubmitField, TextAreaField, DateTimeField
+from wtforms import StringField, IntegerField, PasswordField, SubmitField, TextAreaField
 from wtforms.validators import DataRequired, Email, EqualTo, NumberRange
 
 
@@ -19,30 +19,6 @@ class RegistrationForm(FlaskForm):
     submit = SubmitField('Register!')
 
 
-class EventOrganizerForm(FlaskForm):
-    try:
-        name = StringField('Event Name', validators=[DataRequired()])
-        description = TextAreaField('Description', validators=[DataRequired()])
-        date_time = DateTimeField('Date and Time', format='%Y-%m-%d %H:%M', validators=[DataRequired()],
-                                  description='Format: YYYY-MM-DD HH:MM')
-        duration = StringField('Duration in Minutes')
-        location = StringField('Location')
-        submit = SubmitField('Organize Event')
-    except Exception as e:
-        print(f"An error occurred when creating event organizer form {e}")
-
-
-class UpdateEventForm(FlaskForm):
-    try:
-        name = StringField('Name', validators=[DataRequired()])
-        description = TextAreaField('Description', validators=[DataRequired()])
-        date_time = DateTimeField('Date and Time', validators=[DataRequired()])
-        duration = StringField('Name', validators=[DataRequired()])
-        location = StringField('Location')
-    except Exception as e:
-        print(f"An error occurred when creating event organizer form {e}")
-
-
 class EventFeedbackForm(FlaskForm):
     try:
         rating = IntegerField('Rating', validators=[DataRequired(),
@@ -0,0 +1,174 @@
+import threading
+import time
+from flask import g, has_request_context, request, Response, before_render_template, template_rendered
+from sqlalchemy import event
+from .cache import get_cache_stats
+
+METRIC_PREFIX = 'eventhub'
+
+_lock = threading.Lock()
+_endpoint_stats = {}
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.statements = 0
+        self.slow_statements = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+        self.request_seconds = 0.0
+        self.slowest = []
+
+    def record(self, statements, slow_statements, db_seconds, render_seconds, request_seconds, slowest, keep):
+        self.requests += 1
+        self.statements += statements
+        self.slow_statements += slow_statements
+        self.db_seconds += db_seconds
+        self.render_seconds += render_seconds
+        self.request_seconds += request_seconds
+        merged = {statement: seconds for seconds, statement in self.slowest}
+        for seconds, statement in slowest:
+            merged[statement] = max(seconds, merged.get(statement, 0))
+        self.slowest = sorted(((seconds, statement) for statement, seconds in merged.items()), reverse=True)[:keep]
+
+
+def get_endpoint_stats():
+    with _lock:
+        return dict(_endpoint_stats)
+
+
+def reset_endpoint_stats():
+    with _lock:
+        _endpoint_stats.clear()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        context.query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context() or not hasattr(context, 'query_started'):
+        return
+    seconds = time.perf_counter() - context.query_started
+    g.sql_statements = g.get('sql_statements', 0) + 1
+    g.sql_seconds = g.get('sql_seconds', 0.0) + seconds
+    g.setdefault('sql_timings', []).append((seconds, statement))
+
+
+def _before_render(sender, template, context, **extra):
+    if has_request_context():
+        g.render_started = time.perf_counter()
+
+
+def _after_render(sender, template, context, **extra):
+    if has_request_context() and 'render_started' in g:
+        g.render_seconds = g.get('render_seconds', 0.0) + time.perf_counter() - g.pop('render_started')
+
+
+def _start_request():
+    g.request_started = time.perf_counter()
+
+
+def _finish_request(app, response):
+    # unset when an earlier before_request handler answered the request itself
+    request_started = g.get('request_started')
+    if request_started is None:
+        return response
+    request_seconds = time.perf_counter() - request_started
+    db_seconds = g.get('sql_seconds', 0.0)
+    render_seconds = g.get('render_seconds', 0.0)
+    statements = g.get('sql_statements', 0)
+    timings = g.get('sql_timings', [])
+
+    slow_threshold = app.config['SLOW_QUERY_MS'] / 1000
+    slow = [(seconds, statement) for seconds, statement in timings if seconds >= slow_threshold]
+    for seconds, statement in slow:
+        app.logger.warning("slow query on %s (%.1f ms): %s", request.endpoint, seconds * 1000, statement)
+
+    keep = app.config['INSTRUMENTATION_SLOWEST_KEPT']
+    slowest = sorted(timings, reverse=True)[:keep]
+    with _lock:
+        stats = _endpoint_stats.setdefault(request.endpoint or 'unknown', EndpointStats())
+        stats.record(statements, len(slow), db_seconds, render_seconds, request_seconds, slowest, keep)
+
+    response.headers['Server-Timing'] = ', '.join([
+        f'db;dur={db_seconds * 1000:.2f};desc="{statements} queries"',
+        f'render;dur={render_seconds * 1000:.2f}',
+        f'total;dur={request_seconds * 1000:.2f}',
+    ])
+    return response
+
+
+def _label(value):
+    value = ' '.join(value.split())[:200]
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def prometheus_metrics():
+    """
+    This function will render the per-endpoint stats of this process in Prometheus text format
+    """
+    counters = [
+        ('requests_total', 'Requests handled', lambda stats: stats.requests),
+        ('sql_statements_total', 'SQL statements executed', lambda stats: stats.statements),
+        ('sql_slow_statements_total', 'SQL statements slower than SLOW_QUERY_MS',
+         lambda stats: stats.slow_statements),
+        ('db_seconds_total', 'Time spent executing SQL', lambda stats: stats.db_seconds),
+        ('render_seconds_total', 'Time spent rendering templates', lambda stats: stats.render_seconds),
+        ('request_seconds_total', 'Time spent handling requests', lambda stats: stats.request_seconds),
+    ]
+    endpoint_stats = get_endpoint_stats()
+    lines = []
+    for name, description, value in counters:
+        lines.append(f"# HELP {METRIC_PREFIX}_{name} {description}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name} counter")
+        for endpoint, stats in sorted(endpoint_stats.items()):
+            lines.append(f'{METRIC_PREFIX}_{name}{{endpoint="{_label(endpoint)}"}} {value(stats)}')
+
+    lines.append(f"# HELP {METRIC_PREFIX}_slowest_statement_seconds Slowest statements seen per endpoint")
+    lines.append(f"# TYPE {METRIC_PREFIX}_slowest_statement_seconds gauge")
+    for endpoint, stats in sorted(endpoint_stats.items()):
+        for seconds, statement in stats.slowest:
+            lines.append(f'{METRIC_PREFIX}_slowest_statement_seconds{{endpoint="{_label(endpoint)}",'
+                         f'statement="{_label(statement)}"}} {seconds:.6f}')
+
+    cache_stats = get_cache_stats()
+    for name, description in (('hits', 'Cache lookups answered from the cache'),
+                              ('misses', 'Cache lookups that had to compute the value'),
+                              ('invalidations', 'Cache tags invalidated by writes')):
+        lines.append(f"# HELP {METRIC_PREFIX}_cache_{name}_total {description}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_cache_{name}_total counter")
+        for namespace, stats in sorted(cache_stats.items()):
+            lines.append(f'{METRIC_PREFIX}_cache_{name}_total{{namespace="{_label(namespace)}"}} {getattr(stats, name)}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics():
+    return Response(prometheus_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+def instrument_engine(engine):
+    """
+    This function will count and time the statements the engine runs for a request; an async
+    engine is hooked through its sync_engine
+    """
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def init_instrumentation(app, db):
+    """
+    This function will hook the engine, template signals and request lifecycle when
+    INSTRUMENTATION_ENABLED is set; when it is off nothing is registered at all
+    """
+    if not app.config['INSTRUMENTATION_ENABLED']:
+        return
+    with app.app_context():
+        instrument_engine(db.engine)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+    app.before_request(_start_request)
+    app.after_request(lambda response: _finish_request(app, response))
+    app.add_url_rule('/metrics', 'metrics', metrics)
@@ -1,14 +1,26 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask_login import UserMixin
+from sqlalchemy import event
 from . import db, login_manager
-from werkzeug.security import generate_password_hash, check_password_hash
+from .security import hash_password, verify_password
+from .user_cache import get_cached_user, cache_user, invalidate_user
 import uuid
 
 
 @login_manager.user_loader
 def load_user(user_id):
     try:
-        return User.query.get(user_id)
+        # warm sessions are served from the cache, merged back without a query
+        cached_user = get_cached_user(user_id)
+        if cached_user is not None:
+            return db.session.merge(cached_user, load=False)
+
+        user = User.query.get(user_id)
+        if user is None:
+            return None
+        db.session.expunge(user)
+        cache_user(user)
+        return db.session.merge(user, load=False)
     except Exception as e:
         print(f"An error occurred while loading the user: {e}")
         return None
@@ -21,55 +33,111 @@ class User(db.Model, UserMixin):
     username = db.Column(db.String(64), unique=True, nullable=False)
     email = db.Column(db.String(256), unique=True, nullable=False)
     phone_number = db.Column(db.String(10), nullable=False)
-    hashed_password = db.Column(db.String(128), nullable=False)
+    hashed_password = db.Column(db.String(256), nullable=False)
 
     organized_events = db.relationship('Event', backref='organizer', lazy=True)
 
     def __init__(self, username, password, email, phone_number):
         self.username = username
-        self.hashed_password = generate_password_hash(password)
+        self.hashed_password = hash_password(password)
         self.email = email
         self.phone_number = phone_number
 
+    def set_password(self, password):
+        self.hashed_password = hash_password(password)
+
     def check_password(self, password):
-        return check_password_hash(self.hashed_password, password)
+        return verify_password(self.hashed_password, password)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def drop_cached_user(mapper, connection, target):
+    invalidate_user(target.id)
 
 
 class Event(db.Model):
     __tablename__ = 'events'
+    __table_args__ = (
+        db.Index('ix_events_date_time_id', 'date_time', 'id'),
+        db.Index('ix_events_organizer_id_date_time', 'organizer_id', 'date_time', 'id'),
+        # max(duration) bounds how long before a window an overlapping event can start
+        db.Index('ix_events_duration', 'duration'),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
     description = db.Column(db.Text, nullable=False)
     date_time = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
-    duration = db.Column(db.String(20), nullable=False)
+    duration = db.Column(db.Integer, nullable=False)
+    end_time = db.Column(db.DateTime, index=True)
     location = db.Column(db.String(100))
     organizer_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    participant_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # seats, None is unlimited; participant_count is only raised while it is below it
+    capacity = db.Column(db.Integer)
+    # UTC, bumped by every ORM or Core update of the row (details, counters), drives API ETags
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     feedback = db.relationship('Feedback', backref='event', lazy=True)
     participants = db.relationship('User', secondary='event_participant', backref='attended_events')
 
-    def __init__(self, name, description, date_time, event_duration, location, organizer_id):
+    def __init__(self, name, description, date_time, event_duration, location, organizer_id, capacity=None):
         self.name = name
         self.description = description
         self.date_time = date_time
         self.duration = event_duration
         self.location = location
         self.organizer_id = organizer_id
+        self.capacity = capacity
 
     def check_event_name(self, event_name):
         return self.name != event_name
 
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else 0
+
+    @staticmethod
+    def end_time_for(date_time, duration):
+        return date_time + timedelta(minutes=int(duration))
+
+    @classmethod
+    def upcoming(cls, now):
+        return cls.date_time > now
+
+    @classmethod
+    def in_progress(cls, now):
+        return (cls.date_time <= now) & (cls.end_time > now)
+
+    @classmethod
+    def archived(cls, now):
+        return cls.end_time <= now
+
+
+@event.listens_for(Event, 'before_insert')
+@event.listens_for(Event, 'before_update')
+def set_event_end_time(mapper, connection, target):
+    target.end_time = Event.end_time_for(target.date_time, target.duration)
+
 
 class Feedback(db.Model):
     __tablename__ = 'feedbacks'
+    __table_args__ = (
+        db.UniqueConstraint('event_id', 'user_id', name='uq_feedbacks_event_user'),
+        db.Index('ix_feedbacks_event_id_id', 'event_id', 'id'),
+        db.Index('ix_feedbacks_event_id_rating', 'event_id', 'rating', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     event_id = db.Column(db.String(36), db.ForeignKey('events.id'), nullable=False)
     user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
     comment = db.Column(db.Text)
     rating = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.now)
 
     def __init__(self, event_id, user_id, rating, comment):
         self.event_id = event_id
@@ -81,5 +149,99 @@ class Feedback(db.Model):
 event_participant = db.Table(
     'event_participant',
     db.Column('event_id', db.String(36), db.ForeignKey('events.id'), primary_key=True),
-    db.Column('participant_id', db.String(36), db.ForeignKey('users.id'), primary_key=True)
+    db.Column('participant_id', db.String(36), db.ForeignKey('users.id'), primary_key=True),
+    db.Column('registered_at', db.DateTime, default=datetime.now),
+    db.Index('ix_event_participant_participant_id', 'participant_id', 'event_id')
 )
+
+
+class WaitlistEntry(db.Model):
+    """Users waiting for a seat of a full event, promoted in id order when a seat frees up."""
+    __tablename__ = 'event_waitlist'
+    __table_args__ = (
+        db.UniqueConstraint('event_id', 'user_id', name='uq_event_waitlist_event_user'),
+        db.Index('ix_event_waitlist_event_id_id', 'event_id', 'id'),
+        db.Index('ix_event_waitlist_user_id', 'user_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.String(36), db.ForeignKey('events.id'), nullable=False)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+
+
+class NotificationJob(db.Model):
+    """A notification for one user, enqueued in the transaction of the write it reports and
+    delivered by the notification worker once run_at has passed."""
+    __tablename__ = 'notification_jobs'
+    __table_args__ = (
+        db.Index('ix_notification_jobs_status_run_at', 'status', 'run_at', 'id'),
+        db.Index('ix_notification_jobs_event_id_status', 'event_id', 'status', 'kind', 'user_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(32), nullable=False)
+    # no foreign key, the notice of a deleted event outlives it (its details are in payload)
+    event_id = db.Column(db.String(36), nullable=False)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    payload = db.Column(db.Text)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    status = db.Column(db.String(16), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    claim_token = db.Column(db.String(32))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+
+
+class DataVersion(db.Model):
+    __tablename__ = 'data_versions'
+
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DailyRegistrations(db.Model):
+    """Registrations per event and day, maintained incrementally by analytics_store."""
+    __tablename__ = 'analytics_daily_registrations'
+    __table_args__ = (
+        db.Index('ix_analytics_daily_registrations_day', 'day', 'event_id'),
+    )
+
+    event_id = db.Column(db.String(36), db.ForeignKey('events.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    registrations = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DailyRatings(db.Model):
+    """Rating histogram per event and day, maintained incrementally by analytics_store."""
+    __tablename__ = 'analytics_daily_ratings'
+    __table_args__ = (
+        db.Index('ix_analytics_daily_ratings_day', 'day', 'event_id'),
+    )
+
+    event_id = db.Column(db.String(36), db.ForeignKey('events.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    rating = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class RatingTotals(db.Model):
+    """All-time count of each rating, maintained incrementally by analytics_store."""
+    __tablename__ = 'analytics_rating_totals'
+
+    rating = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class EventRecommendation(db.Model):
+    """Top upcoming events per user, recomputed by the recommendations batch job."""
+    __tablename__ = 'event_recommendations'
+    __table_args__ = (
+        db.Index('ix_event_recommendations_event_id', 'event_id'),
+    )
+
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.String(36), db.ForeignKey('events.id'), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False)
@@ -0,0 +1,273 @@
+import json
+import os
+import smtplib
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from flask import current_app
+from sqlalchemy import delete, inspect, insert, literal, select, update
+from . import db
+from .model import Event, NotificationJob, User, WaitlistEntry, event_participant
+
+REGISTERED = 'registered'
+WAITLISTED = 'waitlisted'
+PROMOTED = 'promoted'
+EVENT_UPDATED = 'event_updated'
+EVENT_DELETED = 'event_deleted'
+REMINDER = 'reminder'
+
+PENDING = 'pending'
+FAILED = 'failed'
+
+MESSAGES = {
+    REGISTERED: ("Registered for {name}", "You are registered for {name} on {date_time} at {location}."),
+    WAITLISTED: ("On the waitlist for {name}",
+                 "{name} is full, you will be registered automatically when a seat frees up."),
+    PROMOTED: ("A seat freed up for {name}",
+               "You were moved off the waitlist and are now registered for {name} on {date_time} at {location}."),
+    EVENT_UPDATED: ("{name} was updated",
+                    "{name} now takes place on {date_time} at {location} and lasts {duration} minutes."),
+    EVENT_DELETED: ("{name} was cancelled", "{name}, planned on {date_time}, was cancelled by its organizer."),
+    REMINDER: ("Reminder: {name} starts soon", "{name} starts on {date_time} at {location}."),
+}
+# the event details an update notice reports
+NOTIFIED_ATTRIBUTES = ('name', 'date_time', 'duration', 'location')
+
+
+def enqueue(kind, event_id, user_ids, run_at=None, payload=None):
+    """
+    This function will add one job per user to the queue in the current transaction, so the
+    notification is sent if and only if the write it reports commits
+    """
+    if not user_ids:
+        return
+    run_at = run_at or datetime.now()
+    payload = json.dumps(payload) if payload is not None else None
+    db.session.execute(insert(NotificationJob), [
+        {'kind': kind, 'event_id': event_id, 'user_id': user_id, 'run_at': run_at, 'status': PENDING,
+         'attempts': 0, 'payload': payload} for user_id in user_ids
+    ])
+
+
+def _enqueue_from(kind, event_id, user_id_column, source, payload=None):
+    now = datetime.now()
+    columns = ['kind', 'event_id', 'user_id', 'run_at', 'status', 'attempts', 'payload', 'created_at']
+    query = select(literal(kind), literal(event_id), user_id_column, literal(now), literal(PENDING), literal(0),
+                   literal(json.dumps(payload) if payload is not None else None), literal(now)) \
+        .where(source.c.event_id == event_id)
+    db.session.execute(insert(NotificationJob).from_select(columns, query))
+
+
+def enqueue_for_participants(kind, event_id, payload=None):
+    """
+    This function will queue a job for every participant of the event with one INSERT ... SELECT
+    """
+    _enqueue_from(kind, event_id, event_participant.c.participant_id, event_participant, payload)
+
+
+def schedule_reminders(event_id, user_ids):
+    """
+    This function will queue the start reminder of the users, NOTIFICATION_REMINDER_LEAD_MINUTES
+    before the event (right away when it starts sooner than that)
+    """
+    date_time = db.session.execute(select(Event.date_time).where(Event.id == event_id)).scalar()
+    now = datetime.now()
+    if date_time is None or date_time <= now:
+        return
+    lead = timedelta(minutes=current_app.config['NOTIFICATION_REMINDER_LEAD_MINUTES'])
+    enqueue(REMINDER, event_id, user_ids, max(date_time - lead, now))
+
+
+def cancel_reminders(event_id, user_id):
+    db.session.execute(delete(NotificationJob).where(NotificationJob.event_id == event_id,
+                                                     NotificationJob.kind == REMINDER,
+                                                     NotificationJob.user_id == user_id,
+                                                     NotificationJob.status == PENDING))
+
+
+def notify_event_updated(event):
+    """
+    This function will queue an update notice to the participants when the event's details
+    changed in this transaction, and move their reminders along with its start time. Call it
+    before the changes are flushed
+    """
+    state = inspect(event)
+    changed = [name for name in NOTIFIED_ATTRIBUTES if state.attrs[name].history.has_changes()]
+    if not changed:
+        return
+    enqueue_for_participants(EVENT_UPDATED, event.id)
+    if 'date_time' in changed:
+        lead = timedelta(minutes=current_app.config['NOTIFICATION_REMINDER_LEAD_MINUTES'])
+        db.session.execute(update(NotificationJob)
+                           .where(NotificationJob.event_id == event.id, NotificationJob.kind == REMINDER,
+                                  NotificationJob.status == PENDING)
+                           .values(run_at=max(event.date_time - lead, datetime.now())))
+
+
+def notify_event_deleted(event):
+    """
+    This function will drop the event's pending jobs and, for an upcoming event, queue a
+    cancellation notice with its details to its participants and waitlist. Call it before
+    they are deleted
+    """
+    db.session.execute(delete(NotificationJob).where(NotificationJob.event_id == event.id,
+                                                     NotificationJob.status == PENDING))
+    if event.date_time <= datetime.now():
+        return
+    payload = {'name': event.name, 'date_time': event.date_time.isoformat(sep=' '), 'location': event.location,
+               'duration': event.duration}
+    enqueue_for_participants(EVENT_DELETED, event.id, payload)
+    _enqueue_from(EVENT_DELETED, event.id, WaitlistEntry.user_id, WaitlistEntry.__table__, payload)
+
+
+class FileSink:
+    """Appends every message as a JSON line to outbox.jsonl, for development and tests."""
+
+    _lock = threading.Lock()
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, 'outbox.jsonl')
+        os.makedirs(directory, exist_ok=True)
+
+    def send(self, messages):
+        lines = ''.join(json.dumps(message) + '\n' for message in messages)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as outbox:
+            outbox.write(lines)
+
+
+class SMTPSink:
+    """Any SMTP server (e.g. `python -m aiosmtpd -n` locally), one connection per batch."""
+
+    def __init__(self, host, port, sender):
+        self.host = host
+        self.port = port
+        self.sender = sender
+
+    def send(self, messages):
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            for message in messages:
+                email = EmailMessage()
+                email['From'] = self.sender
+                email['To'] = message['to']
+                email['Subject'] = message['subject']
+                email.set_content(message['body'])
+                smtp.send_message(email)
+
+
+def create_sink(config):
+    sink = config['NOTIFICATION_SINK']
+    if sink == 'file':
+        return FileSink(config['NOTIFICATION_OUTBOX_DIR'])
+    if sink == 'smtp':
+        return SMTPSink(config['NOTIFICATION_SMTP_HOST'], config['NOTIFICATION_SMTP_PORT'],
+                        config['NOTIFICATION_SENDER'])
+    raise ValueError(f"unknown NOTIFICATION_SINK {sink!r}")
+
+
+def claim_jobs(limit, now=None):
+    """
+    This function will lease up to `limit` due jobs to this worker by pushing their run_at past
+    the lease, so a crashed worker's jobs come back once it expires, and commit the claim.
+    The run_at/status guard lets only one of several concurrent workers claim a job
+    """
+    now = now or datetime.now()
+    lease_until = now + timedelta(seconds=current_app.config['NOTIFICATION_LEASE_SECONDS'])
+    due = NotificationJob.__table__
+    ids = db.session.execute(select(due.c.id).where(due.c.status == PENDING, due.c.run_at <= now)
+                             .order_by(due.c.run_at, due.c.id).limit(limit)).scalars().all()
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    db.session.execute(update(due).where(due.c.id.in_(ids), due.c.status == PENDING, due.c.run_at <= now)
+                       .values(run_at=lease_until, attempts=due.c.attempts + 1, claim_token=token))
+    db.session.commit()
+    return db.session.execute(select(due).where(due.c.id.in_(ids), due.c.claim_token == token)
+                              .order_by(due.c.id)).all()
+
+
+def compose_messages(kind, jobs, event, recipients, now):
+    """
+    This function will build one message per user from a group of jobs of one event and kind.
+    Users notified several times of the same thing before delivery get one message. Reminders
+    of events that started or no longer exist are dropped
+    """
+    details = dict(event) if event is not None else json.loads(jobs[0].payload or 'null')
+    if details is None or (kind == REMINDER and (event is None or event['date_time'] <= now)):
+        return []
+    subject, body = MESSAGES[kind]
+    messages = {}
+    for job in jobs:
+        email = recipients.get(job.user_id)
+        if email is not None and job.user_id not in messages:
+            messages[job.user_id] = {'to': email, 'kind': kind, 'event_id': job.event_id,
+                                     'subject': subject.format(**details), 'body': body.format(**details)}
+    return list(messages.values())
+
+
+def _retry_or_fail(jobs, error, now):
+    config = current_app.config
+    for job in jobs:
+        if job.attempts >= config['NOTIFICATION_MAX_ATTEMPTS']:
+            values = {'status': FAILED}
+        else:
+            delay = min(config['NOTIFICATION_RETRY_BASE_SECONDS'] * 2 ** (job.attempts - 1),
+                        config['NOTIFICATION_RETRY_MAX_SECONDS'])
+            values = {'run_at': now + timedelta(seconds=delay)}
+        db.session.execute(update(NotificationJob).where(NotificationJob.id == job.id)
+                           .values(last_error=error[:1000], claim_token=None, **values))
+
+
+def process_due_jobs(sink, batch_size, now=None):
+    """
+    This function will deliver the due jobs, one sink call per event and kind, delete the jobs
+    delivered and reschedule the others with exponential backoff until NOTIFICATION_MAX_ATTEMPTS,
+    after which they stay in the table as failed. Returns (delivered, retried or failed) job counts
+    """
+    now = now or datetime.now()
+    jobs = claim_jobs(batch_size, now)
+    if not jobs:
+        return 0, 0
+    event_ids = {job.event_id for job in jobs}
+    events = {row.id: row._mapping for row in db.session.execute(
+        select(Event.id, Event.name, Event.date_time, Event.location, Event.duration)
+        .where(Event.id.in_(event_ids)))}
+    recipients = dict(db.session.execute(select(User.id, User.email)
+                                         .where(User.id.in_({job.user_id for job in jobs}))).all())
+
+    groups = {}
+    for job in jobs:
+        groups.setdefault((job.event_id, job.kind), []).append(job)
+    delivered, undelivered = [], []
+    for (event_id, kind), group in groups.items():
+        try:
+            messages = compose_messages(kind, group, events.get(event_id), recipients, now)
+            if messages:
+                sink.send(messages)
+            delivered.extend(job.id for job in group)
+        except Exception as e:
+            current_app.logger.warning("Delivering %s notifications of event %s failed: %s", kind, event_id, e)
+            _retry_or_fail(group, f"{type(e).__name__}: {e}", now)
+            undelivered.extend(group)
+    if delivered:
+        db.session.execute(delete(NotificationJob).where(NotificationJob.id.in_(delivered)))
+    db.session.commit()
+    return len(delivered), len(undelivered)
+
+
+def run_worker(sink, batch_size, poll_seconds, once=False):
+    """
+    This function will deliver due jobs until interrupted, sleeping poll_seconds whenever the
+    queue has nothing due. With once, it stops as soon as nothing is due
+    """
+    totals = [0, 0]
+    while True:
+        delivered, undelivered = process_due_jobs(sink, batch_size)
+        totals[0] += delivered
+        totals[1] += undelivered
+        if delivered or undelivered:
+            continue
+        if once:
+            return tuple(totals)
+        time.sleep(poll_seconds)
@@ -0,0 +1,92 @@
+from flask import render_template
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from flask_login import current_user
+from . import db
+from .cache import cached, mark_changed
+from .model import Event, Feedback, User
+from .pagination import paginate_events
+
+# tags: 'events' for listings (name/date of any event), 'event:<id>' for one event's details and feedback,
+# 'usernames' for the organizer and reviewer names those show (renames are rare, they drop every event page)
+LISTING_ATTRIBUTES = ('name', 'date_time')
+USERNAMES_TAG = 'usernames'
+
+
+def event_tag(event_id):
+    return f'event:{event_id}'
+
+
+def mark_event_changed(*event_ids, listings=False):
+    """
+    This function will queue the invalidation of the events (and the listings) for the commit
+    of the current transaction, for writes done with Core statements
+    """
+    tags = [event_tag(event_id) for event_id in event_ids]
+    mark_changed(db.session, *tags, *(['events'] if listings else []))
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_events(session, flush_context):
+    tags = set()
+    for instance in session.new | session.deleted:
+        if isinstance(instance, Event):
+            tags.update(('events', event_tag(instance.id)))
+        elif isinstance(instance, Feedback):
+            tags.add(event_tag(instance.event_id))
+    if any(isinstance(instance, User) for instance in session.deleted):
+        tags.add(USERNAMES_TAG)
+    for instance in session.dirty:
+        if isinstance(instance, Event) and session.is_modified(instance):
+            tags.add(event_tag(instance.id))
+            state = inspect(instance)
+            if any(state.attrs[name].history.has_changes() for name in LISTING_ATTRIBUTES):
+                tags.add('events')
+        elif isinstance(instance, User) and inspect(instance).attrs.username.history.has_changes():
+            tags.add(USERNAMES_TAG)
+    if tags:
+        mark_changed(session, *tags)
+
+
+def cached_page(name, template, **context):
+    """
+    This function will cache a page that only depends on who is logged in
+    """
+    key = f'page:{name}:{current_user.get_id() or "anonymous"}'
+    return cached(key, lambda: render_template(template, **context))
+
+
+def cached_event_page(query_name, query, cursor, page_size):
+    """
+    This function will cache one page of an event listing as plain dicts with its next cursor
+    """
+    def produce():
+        rows, next_cursor = paginate_events(query, cursor, page_size)
+        return [dict(row._mapping) for row in rows], next_cursor
+    return cached(f'listing:{query_name}:{cursor}:{page_size}', produce, tags=('events',))
+
+
+def cached_event(event_id):
+    """
+    This function will cache what event_details shows of an event, None when it does not exist
+    """
+    def produce():
+        row = db.session.query(Event.id, Event.name, Event.description, Event.date_time, Event.duration,
+                               Event.location, Event.organizer_id, Event.participant_count, Event.capacity, Event.rating_sum,
+                               Event.rating_count,
+                               User.username.label('organizer_username')) \
+            .join(User, User.id == Event.organizer_id).filter(Event.id == event_id).first()
+        if row is None:
+            return None
+        details = dict(row._mapping)
+        details['organizer'] = {'id': details['organizer_id'], 'username': details.pop('organizer_username')}
+        return details
+    return cached(f'event:{event_id}', produce, tags=(event_tag(event_id), USERNAMES_TAG))
+
+
+def cached_event_fragment(name, event_id, render):
+    """
+    This function will cache a page rendered from one event's data, per logged in/out navigation
+    """
+    key = f'fragment:{name}:{event_id}:{current_user.is_authenticated}'
+    return cached(key, render, tags=(event_tag(event_id), USERNAMES_TAG))
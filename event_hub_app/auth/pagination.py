@@ -0,0 +1,68 @@
+import base64
+from datetime import datetime
+from flask import request, current_app
+from sqlalchemy import tuple_
+from .model import Event
+
+# columns rendered by all_events.html and organized_events.html
+EVENT_LISTING_COLUMNS = (Event.id, Event.name, Event.date_time)
+ORGANIZED_EVENT_COLUMNS = EVENT_LISTING_COLUMNS + (Event.description, Event.duration, Event.location)
+
+
+def encode_cursor(date_time, event_id):
+    """
+    This function will encode the (date_time, id) keyset of the last row of a page
+    """
+    raw = f"{date_time.isoformat()}|{event_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """
+    This function will decode a cursor back to (date_time, id), None when it is missing or invalid
+    """
+    if not cursor:
+        return None
+    try:
+        date_time, event_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|', 1)
+        return datetime.fromisoformat(date_time), event_id
+    except ValueError:
+        return None
+
+
+def get_page_size():
+    """
+    This function will get the page size from the request, bounded by the configured maximum
+    """
+    page_size = request.args.get('page_size', current_app.config['EVENTS_PAGE_SIZE'], type=int)
+    return max(1, min(page_size, current_app.config['EVENTS_MAX_PAGE_SIZE']))
+
+
+def keyset_page(query, cursor, page_size):
+    """
+    This function will restrict `query` (an ORM query or a select) to the page after `cursor`
+    ordered by (date_time, id), with one extra row telling whether another page follows
+    """
+    keyset = decode_cursor(cursor)
+    if keyset:
+        query = query.filter(tuple_(Event.date_time, Event.id) > tuple_(*keyset))
+    return query.order_by(Event.date_time, Event.id).limit(page_size + 1)
+
+
+def split_page(rows, page_size):
+    """
+    This function will get the rows of the page and the cursor of the next page (None on the last page)
+    """
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_cursor(rows[-1].date_time, rows[-1].id)
+
+
+def paginate_events(query, cursor=None, page_size=None):
+    """
+    This function will get one page of `query` ordered by (date_time, id), starting after `cursor`.
+    Returns the rows and the cursor of the next page (None on the last page)
+    """
+    page_size = page_size or get_page_size()
+    return split_page(keyset_page(query, cursor, page_size).all(), page_size)
@@ -0,0 +1,158 @@
+from datetime import datetime
+from sqlalchemy import delete, exists, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from . import db
+from .model import Event, WaitlistEntry, event_participant
+from .data_version import bump_data_version
+from .event_counters import claim_seat, increment_participants
+from .analytics_store import record_registrations
+from . import notifications
+
+# outcomes of register_participant and cancel_registration
+REGISTERED = 'registered'
+WAITLISTED = 'waitlisted'
+ALREADY_REGISTERED = 'already_registered'
+ALREADY_WAITLISTED = 'already_waitlisted'
+CANCELLED = 'cancelled'
+LEFT_WAITLIST = 'left_waitlist'
+
+
+def is_registered(user_id, event_id):
+    """
+    This function will check if the user is registered for the event with one primary key lookup
+    """
+    query = select(exists().where(event_participant.c.event_id == event_id,
+                                  event_participant.c.participant_id == user_id))
+    return db.session.execute(query).scalar()
+
+
+def is_waitlisted(user_id, event_id):
+    """
+    This function will check if the user is waiting for a seat of the event
+    """
+    query = select(exists().where(WaitlistEntry.event_id == event_id, WaitlistEntry.user_id == user_id))
+    return db.session.execute(query).scalar()
+
+
+def _insert_ignore(table, values):
+    """
+    This function will insert the row unless it violates a unique key, and return whether it did
+    """
+    dialect = db.session.connection().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        statement = (sqlite if dialect == 'sqlite' else postgresql).insert(table).values(values)
+        return db.session.execute(statement.on_conflict_do_nothing()).rowcount == 1
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(table).values(values))
+        return True
+    except IntegrityError:
+        return False
+
+
+def registration_closed(organizer_id, date_time, user_id):
+    """
+    This function will tell whether the user cannot register for the event: organizers do not
+    register for their own events, and registration closes once the event has started
+    """
+    return organizer_id == user_id or date_time <= datetime.now()
+
+
+def _seat_participant(user_id, event_id):
+    """
+    This function will insert the registration row for a seat already claimed, giving the seat
+    back when a concurrent request registered the user first. Returns whether the user was seated
+    """
+    if _insert_ignore(event_participant, {'event_id': event_id, 'participant_id': user_id}):
+        return True
+    increment_participants(event_id, -1)
+    return False
+
+
+def register_participant(user_id, event_id):
+    """
+    This function will register the user if the event has a seat left and put them on its
+    waitlist otherwise. The seat is claimed by a conditional UPDATE before anything is inserted,
+    so concurrent registrations never overbook and duplicates are absorbed by the primary keys
+    instead of failing. Returns one of REGISTERED, WAITLISTED, ALREADY_REGISTERED or
+    ALREADY_WAITLISTED. The caller commits
+    """
+    if is_registered(user_id, event_id):
+        return ALREADY_REGISTERED
+    if claim_seat(event_id):
+        if not _seat_participant(user_id, event_id):
+            return ALREADY_REGISTERED
+        db.session.execute(delete(WaitlistEntry).where(WaitlistEntry.event_id == event_id,
+                                                       WaitlistEntry.user_id == user_id))
+        record_registrations({event_id: 1})
+        bump_data_version(db.session.connection())
+        notifications.enqueue(notifications.REGISTERED, event_id, [user_id])
+        notifications.schedule_reminders(event_id, [user_id])
+        return REGISTERED
+    # a concurrent request may have seated the user since the first check; on sqlite the failed
+    # claim already holds the write lock, so this second look is final
+    if is_registered(user_id, event_id):
+        return ALREADY_REGISTERED
+    if _insert_ignore(WaitlistEntry.__table__, {'event_id': event_id, 'user_id': user_id}):
+        notifications.enqueue(notifications.WAITLISTED, event_id, [user_id])
+        return WAITLISTED
+    return ALREADY_WAITLISTED
+
+
+def promote_waitlist(event_id):
+    """
+    This function will move waitlisted users, first come first served, into the seats the
+    event has left and return their ids. The caller commits
+    """
+    promoted = []
+    head_query = select(WaitlistEntry.id, WaitlistEntry.user_id).where(WaitlistEntry.event_id == event_id) \
+        .order_by(WaitlistEntry.id).limit(1).with_for_update(skip_locked=True)
+    while True:
+        head = db.session.execute(head_query).first()
+        if head is None or not claim_seat(event_id):
+            break
+        db.session.execute(delete(WaitlistEntry).where(WaitlistEntry.id == head.id))
+        if _seat_participant(head.user_id, event_id):
+            promoted.append(head.user_id)
+    if promoted:
+        record_registrations({event_id: len(promoted)})
+        bump_data_version(db.session.connection())
+        notifications.enqueue(notifications.PROMOTED, event_id, promoted)
+        notifications.schedule_reminders(event_id, promoted)
+    return promoted
+
+
+def cancel_registration(user_id, event_id):
+    """
+    This function will cancel the user's registration, handing the seat to the head of the
+    waitlist, or take the user off the waitlist. Returns CANCELLED, LEFT_WAITLIST or None when
+    the user had neither. The caller commits
+    """
+    registration_day = select(func.coalesce(event_participant.c.registered_at, Event.date_time)) \
+        .select_from(event_participant).join(Event, Event.id == event_participant.c.event_id) \
+        .where(event_participant.c.event_id == event_id, event_participant.c.participant_id == user_id)
+    registered_at = db.session.execute(registration_day).scalar()
+    if registered_at is not None:
+        result = db.session.execute(delete(event_participant).where(event_participant.c.event_id == event_id,
+                                                                    event_participant.c.participant_id == user_id))
+        if result.rowcount:
+            increment_participants(event_id, -1)
+            # the registration no longer counts on the day it was made
+            record_registrations({event_id: -1}, registered_at)
+            bump_data_version(db.session.connection())
+            notifications.cancel_reminders(event_id, user_id)
+            promote_waitlist(event_id)
+            return CANCELLED
+    result = db.session.execute(delete(WaitlistEntry).where(WaitlistEntry.event_id == event_id,
+                                                           WaitlistEntry.user_id == user_id))
+    return LEFT_WAITLIST if result.rowcount else None
+
+
+def participant_events_query(user_id):
+    """
+    This function will build the query of events a user registered for, driven by the
+    participant_id index instead of an EXISTS probe per event
+    """
+    return Event.query.join(event_participant, event_participant.c.event_id == Event.id) \
+        .filter(event_participant.c.participant_id == user_id)
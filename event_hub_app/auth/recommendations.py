@@ -0,0 +1,303 @@
+import time
+from datetime import datetime
+from operator import itemgetter
+from flask import current_app
+from sqlalchemy import delete, exists, insert, select
+from . import db
+from .model import Event, EventRecommendation, Feedback, event_participant
+
+# rows fetched at a time while loading the interactions, and replaced per write transaction when
+# storing, which keeps each hold of the sqlite write lock well under a second
+LOAD_BATCH = 50000
+INSERT_BATCH = 20000
+# pairs expanded at a time, bounds the memory of the co-attendance and scoring steps
+PAIRS_PER_CHUNK = 4000000
+
+
+def _sparse():
+    try:
+        from scipy import sparse
+    except ImportError:
+        return None
+    return sparse
+
+
+def _load_pairs(query, users, events):
+    """
+    This function will stream (user id, event id, value) rows and get them as integer code and
+    value arrays; users are coded as they come, rows of unknown events are dropped
+    """
+    import numpy as np
+
+    user_codes, event_codes, values = [], [], []
+    for rows in db.session.execute(query.execution_options(yield_per=LOAD_BATCH)).partitions():
+        for user_id, event_id, value in rows:
+            event_code = events.get(event_id)
+            if event_code is not None:
+                user_codes.append(users.setdefault(user_id, len(users)))
+                event_codes.append(event_code)
+                values.append(value)
+    return np.array(user_codes, dtype=np.int64), np.array(event_codes, dtype=np.int64), \
+        np.array(values, dtype=np.float64)
+
+
+def load_interactions(now, max_user_events):
+    """
+    This function will load the user-event matrix as sorted (user, event, weight) entries.
+    Events are coded in date order. A registration weighs 1, a rating replaces it with
+    rating / 3, so a 3 counts like a plain registration; every user keeps its latest
+    max_user_events events, so heavy users do not dominate the similarities
+    """
+    import numpy as np
+
+    event_rows = db.session.execute(select(Event.id, Event.date_time, Event.organizer_id)
+                                    .order_by(Event.date_time, Event.id)).all()
+    event_ids = [row.id for row in event_rows]
+    events = {event_id: code for code, event_id in enumerate(event_ids)}
+    users = {}
+    organizers = np.array([users.setdefault(row.organizer_id, len(users)) for row in event_rows], dtype=np.int64)
+    upcoming = np.array([row.date_time > now for row in event_rows], dtype=bool)
+
+    registrations = _load_pairs(select(event_participant.c.participant_id, event_participant.c.event_id,
+                                       1.0), users, events)
+    ratings = _load_pairs(select(Feedback.user_id, Feedback.event_id, Feedback.rating)
+                          .where(Feedback.rating.isnot(None)), users, events)
+    n_events = len(event_ids)
+    keys = np.concatenate([registrations[0] * n_events + registrations[1], ratings[0] * n_events + ratings[1]])
+    weights = np.concatenate([registrations[2], ratings[2] / 3])
+
+    # one entry per (user, event): the stable sort keeps a rating after the registration it replaces
+    order = np.argsort(keys, kind='stable')
+    keys, weights = keys[order], weights[order]
+    last = np.append(keys[1:] != keys[:-1], True) if len(keys) else np.zeros(0, dtype=bool)
+    keys, weights = keys[last], weights[last]
+    user_codes, event_codes = keys // max(n_events, 1), keys % max(n_events, 1)
+
+    counts = np.bincount(user_codes, minlength=len(users))
+    starts = np.cumsum(counts) - counts
+    position = np.arange(len(keys)) - starts[user_codes]
+    latest = position >= counts[user_codes] - max_user_events
+    return {
+        'users': user_codes[latest], 'events': event_codes[latest], 'weights': weights[latest],
+        'user_ids': list(users), 'event_ids': event_ids, 'organizers': organizers, 'upcoming': upcoming,
+    }
+
+
+def _expand_blocks(starts, lengths):
+    """
+    This function will list every element of the blocks [start, start + length) as
+    (block number, position), vectorized
+    """
+    import numpy as np
+
+    block = np.repeat(np.arange(len(starts)), lengths)
+    offsets = np.arange(len(block)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return block, np.repeat(starts, lengths) + offsets
+
+
+def _chunks(users, entry_costs):
+    """
+    This function will split user-sorted entries into [start, end) ranges of whole users whose
+    costs add up to about PAIRS_PER_CHUNK
+    """
+    import numpy as np
+
+    limit = PAIRS_PER_CHUNK
+    if not len(users):
+        return
+    boundaries = np.flatnonzero(np.append(True, users[1:] != users[:-1]))
+    user_costs = np.add.reduceat(entry_costs, boundaries)
+    cumulative = np.cumsum(user_costs)
+    start = 0
+    while start < len(boundaries):
+        end = max(int(np.searchsorted(cumulative, cumulative[start] - user_costs[start] + limit, 'right')), start + 1)
+        yield int(boundaries[start]), int(boundaries[end]) if end < len(boundaries) else len(users)
+        start = end
+
+
+def _sum_by_key(keys, values):
+    import numpy as np
+
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return unique, np.bincount(inverse, weights=values)
+
+
+def co_attendance(users, events, weights, n_users, n_events, candidates):
+    """
+    This function will compute the event-event co-attendance XᵀX of the weighted user-event
+    matrix X as (row, column, value) arrays, keeping only the columns of candidate events and
+    no diagonal, with scipy.sparse when installed and otherwise by expanding every user's event
+    pairs, a chunk of users at a time
+    """
+    import numpy as np
+
+    sparse = _sparse()
+    if sparse is not None:
+        matrix = sparse.csr_matrix((weights, (users, events)), shape=(n_users, n_events))
+        columns = np.flatnonzero(candidates)
+        product = (matrix.T.tocsr() @ matrix[:, columns]).tocoo()
+        rows, columns = product.row.astype(np.int64), columns[product.col]
+        keep = rows != columns
+        return rows[keep], columns[keep], product.data[keep]
+
+    counts = np.bincount(users, minlength=n_users)
+    starts = np.cumsum(counts) - counts
+    partial_keys, partial_sums = [], []
+    for start, end in _chunks(users, counts[users]):
+        chunk_users = users[start:end]
+        entry, other = _expand_blocks(starts[chunk_users], counts[chunk_users])
+        entry += start
+        keep = candidates[events[other]] & (entry != other)
+        entry, other = entry[keep], other[keep]
+        keys, sums = _sum_by_key(events[entry] * n_events + events[other], weights[entry] * weights[other])
+        partial_keys.append(keys)
+        partial_sums.append(sums)
+    if not partial_keys:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+    keys, values = _sum_by_key(np.concatenate(partial_keys), np.concatenate(partial_sums))
+    return keys // n_events, keys % n_events, values
+
+
+def top_per_group(groups, scores, count):
+    """
+    This function will get the positions of the `count` best scores of every group, sorted by
+    group then descending score
+    """
+    import numpy as np
+
+    order = np.lexsort((-scores, groups))
+    sorted_groups = groups[order]
+    first = np.flatnonzero(np.append(True, sorted_groups[1:] != sorted_groups[:-1]))
+    lengths = np.diff(np.append(first, len(order)))
+    rank = np.arange(len(order)) - np.repeat(first, lengths)
+    return order[rank < count], rank[rank < count]
+
+
+def event_neighbors(interactions, neighbors):
+    """
+    This function will get, for every event, its most cosine-similar upcoming events as a CSR
+    structure (indptr, neighbor events, similarities)
+    """
+    import numpy as np
+
+    users, events, weights = interactions['users'], interactions['events'], interactions['weights']
+    n_events = len(interactions['event_ids'])
+    rows, columns, values = co_attendance(users, events, weights, len(interactions['user_ids']), n_events,
+                                          interactions['upcoming'])
+    norms = np.sqrt(np.bincount(events, weights=weights ** 2, minlength=n_events))
+    similarities = values / (norms[rows] * norms[columns])
+
+    best, _ = top_per_group(rows, similarities, neighbors)
+    rows, columns, similarities = rows[best], columns[best], similarities[best]
+    indptr = np.append(0, np.cumsum(np.bincount(rows, minlength=n_events)))
+    return indptr, columns, similarities
+
+
+def score_users(interactions, indptr, columns, similarities, per_user):
+    """
+    This function will score, a chunk of users at a time, every upcoming event similar to the
+    events of each user by the weighted sum of the similarities, and yield the user, event,
+    rank and score arrays of the best `per_user` events each user has not attended nor organized
+    """
+    import numpy as np
+
+    users, events, weights = interactions['users'], interactions['events'], interactions['weights']
+    n_events = len(interactions['event_ids'])
+    neighbor_counts = np.diff(indptr)
+    for start, end in _chunks(users, neighbor_counts[events]):
+        chunk_events = events[start:end]
+        entry, position = _expand_blocks(indptr[chunk_events], neighbor_counts[chunk_events])
+        entry += start
+        candidates = columns[position]
+        keys, scores = _sum_by_key(users[entry] * n_events + candidates, weights[entry] * similarities[position])
+        candidate_users, candidate_events = keys // n_events, keys % n_events
+        known = np.isin(keys, users[start:end] * n_events + events[start:end], assume_unique=True)
+        keep = ~known & (interactions['organizers'][candidate_events] != candidate_users)
+        candidate_users, candidate_events, scores = candidate_users[keep], candidate_events[keep], scores[keep]
+        best, rank = top_per_group(candidate_users, scores, per_user)
+        yield candidate_users[best], candidate_events[best], rank, scores[best]
+
+
+def _user_batches(rows):
+    """
+    This function will split user-sorted rows into runs of about INSERT_BATCH rows that never
+    split the rows of a user
+    """
+    start = 0
+    while start < len(rows):
+        end = min(start + INSERT_BATCH, len(rows))
+        while end < len(rows) and rows[end]['user_id'] == rows[end - 1]['user_id']:
+            end += 1
+        yield rows[start:end]
+        start = end
+
+
+def rebuild_recommendations(now=None):
+    """
+    This function will recompute every user's top RECOMMENDATIONS_PER_USER upcoming events and
+    replace the stored ones. Everything is computed before the first write, then the rows are
+    replaced a batch of whole users per transaction, so the write lock is only held for one
+    batch at a time and every user sees either the previous list or the new one. Returns the
+    sizes and timings of the run
+    """
+    config = current_app.config
+    now = now or datetime.now()
+    started = time.perf_counter()
+    interactions = load_interactions(now, config['RECOMMENDATIONS_MAX_USER_EVENTS'])
+    loaded = time.perf_counter()
+    indptr, columns, similarities = event_neighbors(interactions, config['RECOMMENDATIONS_NEIGHBORS'])
+    compared = time.perf_counter()
+
+    user_ids, event_ids = interactions['user_ids'], interactions['event_ids']
+    rows = []
+    for users, events, ranks, scores in score_users(interactions, indptr, columns, similarities,
+                                                    config['RECOMMENDATIONS_PER_USER']):
+        rows += [{'user_id': user_ids[user], 'event_id': event_ids[event], 'rank': rank + 1, 'score': score,
+                  'computed_at': now}
+                 for user, event, rank, score in zip(users.tolist(), events.tolist(), ranks.tolist(), scores.tolist())]
+    # in key order, a batch rewrites neighbouring pages instead of pages all over the table
+    rows.sort(key=itemgetter('user_id', 'rank'))
+    scored = time.perf_counter()
+
+    # end the read transaction of the loading queries (nothing was written): on sqlite a write
+    # started from an older snapshot fails once another connection committed since
+    db.session.commit()
+    for batch in _user_batches(rows):
+        db.session.execute(delete(EventRecommendation)
+                           .where(EventRecommendation.user_id.in_({row['user_id'] for row in batch})))
+        db.session.execute(insert(EventRecommendation.__table__), batch)
+        db.session.commit()
+    # users without any recommendation this run
+    db.session.execute(delete(EventRecommendation).where(EventRecommendation.computed_at != now))
+    db.session.commit()
+    return {
+        'interactions': int(len(interactions['users'])),
+        'users': len(user_ids),
+        'events': len(event_ids),
+        'recommendations': len(rows),
+        'load_seconds': round(loaded - started, 2),
+        'similarity_seconds': round(compared - loaded, 2),
+        'scoring_seconds': round(scored - compared, 2),
+        'write_seconds': round(time.perf_counter() - scored, 2),
+        'total_seconds': round(time.perf_counter() - started, 2),
+    }
+
+
+def recommended_events(user_id, limit=None, exclude_event_id=None):
+    """
+    This function will get the user's stored recommendations that are still upcoming and not
+    registered for since the last run, one range of the (user_id, rank) key
+    """
+    limit = limit or current_app.config['RECOMMENDATIONS_SHOWN']
+    registered = exists().where(event_participant.c.event_id == Event.id,
+                                event_participant.c.participant_id == user_id)
+    query = select(Event.id, Event.name, Event.date_time, Event.location) \
+        .join(EventRecommendation, EventRecommendation.event_id == Event.id) \
+        .where(EventRecommendation.user_id == user_id, Event.upcoming(datetime.now()), ~registered)
+    if exclude_event_id is not None:
+        query = query.where(Event.id != exclude_event_id)
+    return db.session.execute(query.order_by(EventRecommendation.rank).limit(limit)).all()
+
+
+def delete_event_recommendations(event_id):
+    db.session.execute(delete(EventRecommendation).where(EventRecommendation.event_id == event_id))
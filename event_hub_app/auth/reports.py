@@ -0,0 +1,156 @@
+import os
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from flask import current_app
+from sqlalchemy import select
+from . import db
+from .model import Event, Feedback, event_participant
+
+try:
+    import pyarrow  # noqa: F401  parquet and feather snapshots need it
+except ImportError:
+    pyarrow = None
+
+SNAPSHOT_FORMATS = {
+    'parquet': ('parquet', pd.read_parquet, 'to_parquet'),
+    'feather': ('feather', pd.read_feather, 'to_feather'),
+    'pickle': ('pkl', pd.read_pickle, 'to_pickle'),
+}
+FRAMES = ('events', 'feedbacks', 'participants')
+
+
+def default_snapshot_format():
+    return 'parquet' if pyarrow is not None else 'pickle'
+
+
+def load_frames(connection):
+    """
+    This function will bulk load events, feedbacks and event_participant with one query each.
+    Ids are categoricals sharing the event categories, so grouping by event is done on integer codes
+    """
+    events = pd.read_sql(
+        select(Event.id.label('event_id'), Event.organizer_id, Event.name, Event.date_time, Event.end_time,
+               Event.duration), connection,
+        dtype={'event_id': 'string', 'organizer_id': 'category', 'name': 'string', 'duration': 'int32'},
+        parse_dates=['date_time', 'end_time'])
+    event_ids = pd.CategoricalDtype(events['event_id'])
+    events['event_id'] = events['event_id'].astype(event_ids)
+
+    feedbacks = pd.read_sql(
+        select(Feedback.event_id, Feedback.user_id, Feedback.rating).where(Feedback.rating.isnot(None)),
+        connection, dtype={'event_id': event_ids, 'user_id': 'category', 'rating': 'int8'})
+    participants = pd.read_sql(
+        select(event_participant.c.event_id, event_participant.c.participant_id.label('user_id')),
+        connection, dtype={'event_id': event_ids, 'user_id': 'category'})
+    return {'events': events, 'feedbacks': feedbacks, 'participants': participants}
+
+
+def snapshot_paths(directory, file_format):
+    extension = SNAPSHOT_FORMATS[file_format][0]
+    return {name: os.path.join(directory, f'{name}.{extension}') for name in FRAMES}
+
+
+def save_snapshot(frames, directory, file_format):
+    """
+    This function will write the loaded frames to a snapshot, parquet/feather need pyarrow
+    """
+    if file_format in ('parquet', 'feather') and pyarrow is None:
+        raise RuntimeError(f"{file_format} snapshots need pyarrow, install it or use the pickle format")
+    os.makedirs(directory, exist_ok=True)
+    writer = SNAPSHOT_FORMATS[file_format][2]
+    for name, path in snapshot_paths(directory, file_format).items():
+        getattr(frames[name], writer)(path)
+
+
+def load_snapshot(directory, file_format):
+    """
+    This function will read the frames back from a snapshot, None if it was never written
+    """
+    paths = snapshot_paths(directory, file_format)
+    if not all(os.path.exists(path) for path in paths.values()):
+        return None
+    reader = SNAPSHOT_FORMATS[file_format][1]
+    return {name: reader(path) for name, path in paths.items()}
+
+
+def get_frames(refresh=False, file_format=None):
+    """
+    This function will get the frames from the snapshot in REPORTS_SNAPSHOT_DIR, loading them from
+    the database (and writing a new snapshot) when there is none or `refresh` is set
+    """
+    directory = current_app.config['REPORTS_SNAPSHOT_DIR']
+    file_format = file_format or default_snapshot_format()
+    frames = None if refresh else load_snapshot(directory, file_format)
+    if frames is None:
+        with db.engine.connect() as connection:
+            frames = load_frames(connection)
+        save_snapshot(frames, directory, file_format)
+    return frames
+
+
+def bayesian_rating(rating_sum, rating_count, prior_mean, prior_weight):
+    """
+    This function will shrink each average toward the overall mean, by `prior_weight` virtual votes
+    """
+    return (prior_weight * prior_mean + rating_sum) / (prior_weight + rating_count)
+
+
+def event_statistics(frames, prior_weight=None, now=None):
+    """
+    This function will compute per-event rating and participation statistics.
+    Feedback from registered users is the only attendance signal, so for finished events
+    `estimated_no_shows` (registered without feedback) is an upper bound
+    """
+    events, feedbacks, participants = frames['events'], frames['feedbacks'], frames['participants']
+    prior_weight = current_app.config['REPORTS_RATING_PRIOR_WEIGHT'] if prior_weight is None else prior_weight
+    now = now or datetime.now()
+
+    ratings = feedbacks.groupby('event_id', observed=False)['rating']
+    stats = pd.DataFrame({
+        'rating_count': ratings.count(),
+        'rating_sum': ratings.sum().astype('int64'),
+        'rating_mean': ratings.mean(),
+        'rating_median': ratings.median(),
+        'participants': participants['event_id'].value_counts(sort=False),
+    })
+    responders = feedbacks.merge(participants, on=['event_id', 'user_id'])
+    stats['responders'] = responders['event_id'].value_counts(sort=False)
+
+    prior_mean = feedbacks['rating'].mean() if len(feedbacks) else 0.0
+    stats['bayesian_rating'] = bayesian_rating(stats['rating_sum'], stats['rating_count'], prior_mean, prior_weight)
+    stats['participation_percentile'] = stats['participants'].rank(pct=True, method='max')
+
+    stats = events.set_index('event_id').join(stats)
+    finished = (stats['end_time'] <= now).to_numpy()
+    stats['estimated_no_shows'] = np.where(finished, stats['participants'] - stats['responders'], 0)
+    stats['no_show_rate'] = np.where(finished & (stats['participants'] > 0),
+                                     stats['estimated_no_shows'] / stats['participants'].clip(lower=1), np.nan)
+    stats['finished'] = finished
+    return stats
+
+
+def organizer_statistics(event_stats, prior_weight=None):
+    """
+    This function will roll the per-event statistics up per organizer
+    """
+    prior_weight = current_app.config['REPORTS_RATING_PRIOR_WEIGHT'] if prior_weight is None else prior_weight
+    finished = event_stats[event_stats['finished']]
+    grouped = event_stats.groupby('organizer_id', observed=True)
+    stats = grouped.agg(events=('name', 'size'), participants=('participants', 'sum'),
+                        participants_median=('participants', 'median'),
+                        participants_p90=('participants', lambda column: column.quantile(0.9)),
+                        rating_count=('rating_count', 'sum'), rating_sum=('rating_sum', 'sum'))
+    finished_totals = finished.groupby('organizer_id', observed=True)[['participants', 'estimated_no_shows']].sum()
+
+    total_count = stats['rating_count'].sum()
+    prior_mean = stats['rating_sum'].sum() / total_count if total_count else 0.0
+    stats['rating_mean'] = stats['rating_sum'] / stats['rating_count'].where(stats['rating_count'] > 0)
+    stats['bayesian_rating'] = bayesian_rating(stats['rating_sum'], stats['rating_count'], prior_mean, prior_weight)
+    stats['no_show_rate'] = finished_totals['estimated_no_shows'] / \
+        finished_totals['participants'].where(finished_totals['participants'] > 0)
+    return stats
+
+
+def participation_percentiles(event_stats, percentiles=(0.5, 0.75, 0.9, 0.99)):
+    return event_stats['participants'].quantile(list(percentiles))
@@ -0,0 +1,130 @@
+import base64
+import re
+from datetime import timedelta
+from sqlalchemy import DDL, and_, column, event, literal_column, or_, select, table
+from . import db
+from .model import Event
+from .pagination import EVENT_LISTING_COLUMNS, get_page_size, paginate_events
+
+# external-content FTS5 index over events: the text lives only in events, the index is keyed by
+# events.rowid. Anything that renumbers rowids (VACUUM, a table rebuild) needs `flask rebuild-search-index`
+FTS_TABLE = 'events_fts'
+FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5("
+    "name, description, location, content='events', content_rowid='rowid', "
+    "prefix='2 3', tokenize='unicode61 remove_diacritics 2')",
+    # name matches weigh most, then location, then description
+    "INSERT INTO events_fts(events_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 3.0)')",
+    "CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN "
+    "INSERT INTO events_fts(rowid, name, description, location) "
+    "VALUES (new.rowid, new.name, new.description, new.location); END",
+    "CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN "
+    "INSERT INTO events_fts(events_fts, rowid, name, description, location) "
+    "VALUES ('delete', old.rowid, old.name, old.description, old.location); END",
+    # counter updates (participants, ratings) do not touch the index
+    "CREATE TRIGGER IF NOT EXISTS events_fts_update AFTER UPDATE OF name, description, location ON events BEGIN "
+    "INSERT INTO events_fts(events_fts, rowid, name, description, location) "
+    "VALUES ('delete', old.rowid, old.name, old.description, old.location); "
+    "INSERT INTO events_fts(rowid, name, description, location) "
+    "VALUES (new.rowid, new.name, new.description, new.location); END",
+]
+
+for statement in FTS_DDL:
+    event.listen(Event.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(Event.__table__, 'before_drop', DDL("DROP TABLE IF EXISTS events_fts").execute_if(dialect='sqlite'))
+
+events_fts = table(FTS_TABLE, column('rowid'), column('rank'), column(FTS_TABLE))
+
+
+def uses_fts():
+    return db.session.connection().dialect.name == 'sqlite'
+
+
+def search_terms(text):
+    return re.findall(r'\w+', text or '')
+
+
+def match_expression(terms, location=None):
+    """
+    This function will build an FTS5 query matching every word as a prefix, the location words
+    only in the location column. Only word characters are kept, so user input cannot break the syntax
+    """
+    parts = [f'"{word}"*' for word in search_terms(terms)]
+    location_words = search_terms(location)
+    if location_words:
+        parts.append('location : (' + ' '.join(f'"{word}"*' for word in location_words) + ')')
+    return ' AND '.join(parts)
+
+
+def encode_rank_cursor(rank, event_id):
+    return base64.urlsafe_b64encode(f"{rank!r}|{event_id}".encode()).decode()
+
+
+def decode_rank_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        rank, event_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|', 1)
+        return float(rank), event_id
+    except ValueError:
+        return None
+
+
+def _date_filters(date_from, date_to):
+    filters = []
+    if date_from:
+        filters.append(Event.date_time >= date_from)
+    if date_to:
+        filters.append(Event.date_time < date_to + timedelta(days=1))
+    return filters
+
+
+def search_events(terms, location=None, date_from=None, date_to=None, cursor=None, page_size=None):
+    """
+    This function will get one page of events matching `terms` (and `location`) between the dates,
+    best matches first. Returns the rows and the cursor of the next page (None on the last page)
+    """
+    page_size = page_size or get_page_size()
+    if not search_terms(terms) and not search_terms(location):
+        return [], None
+    if not uses_fts():
+        return _search_with_like(terms, location, date_from, date_to, cursor, page_size)
+
+    rank = events_fts.c.rank
+    query = select(*EVENT_LISTING_COLUMNS, Event.location, rank.label('rank')) \
+        .select_from(events_fts.join(Event, literal_column('events.rowid') == events_fts.c.rowid)) \
+        .where(events_fts.c[FTS_TABLE].op('MATCH')(match_expression(terms, location)),
+               *_date_filters(date_from, date_to))
+    keyset = decode_rank_cursor(cursor)
+    if keyset:
+        query = query.where(or_(rank > keyset[0], and_(rank == keyset[0], Event.id > keyset[1])))
+    rows = db.session.execute(query.order_by(rank, Event.id).limit(page_size + 1)).all()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_rank_cursor(rows[-1].rank, rows[-1].id)
+    return rows, next_cursor
+
+
+def _search_with_like(terms, location, date_from, date_to, cursor, page_size):
+    """
+    This function will search with LIKE on databases without FTS5, ordered by date instead of rank
+    """
+    query = db.session.query(*EVENT_LISTING_COLUMNS, Event.location)
+    for word in search_terms(terms):
+        pattern = f'%{word}%'
+        query = query.filter(or_(Event.name.ilike(pattern), Event.description.ilike(pattern),
+                                 Event.location.ilike(pattern)))
+    for word in search_terms(location):
+        query = query.filter(Event.location.ilike(f'%{word}%'))
+    query = query.filter(*_date_filters(date_from, date_to))
+    return paginate_events(query, cursor, page_size)
+
+
+def rebuild_search_index():
+    """
+    This function will reindex every event from the events table. The caller commits
+    """
+    if uses_fts():
+        db.session.execute(events_fts.insert().values({FTS_TABLE: 'rebuild'}))
@@ -0,0 +1,78 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when more hashes are waiting than PASSWORD_HASH_QUEUE allows."""
+
+
+_executor = None
+_slots = None
+_pool_lock = threading.Lock()
+
+
+def _hashing_pool():
+    """
+    This function will create the bounded hashing pool on first use, sized from the config
+    """
+    global _executor, _slots
+    with _pool_lock:
+        if _executor is None:
+            workers = current_app.config['PASSWORD_HASH_WORKERS']
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+            _slots = threading.BoundedSemaphore(workers + current_app.config['PASSWORD_HASH_QUEUE'])
+        return _executor, _slots
+
+
+def _run_bounded(function, *args):
+    """
+    This function will run a hash computation on the pool, so at most PASSWORD_HASH_WORKERS hashes
+    use the CPU at once, and fail right away, without blocking the request thread, when
+    PASSWORD_HASH_QUEUE hashes are already waiting
+    """
+    executor, slots = _hashing_pool()
+    if not slots.acquire(blocking=False):
+        raise PasswordHashingBusy()
+    try:
+        future = executor.submit(function, *args)
+        return future.result()
+    finally:
+        slots.release()
+
+
+def hash_password(password):
+    config = current_app.config
+    return _run_bounded(generate_password_hash, password, config['PASSWORD_HASH_METHOD'],
+                        config['PASSWORD_SALT_LENGTH'])
+
+
+def verify_password(hashed_password, password):
+    return _run_bounded(check_password_hash, hashed_password, password)
+
+
+_stored_methods = {}
+
+
+def stored_method(method):
+    """
+    This function will get the method string werkzeug stores for a configured one, which it
+    expands (scrypt is stored as scrypt:32768:8:1), by hashing once per method
+    """
+    if method not in _stored_methods:
+        _stored_methods[method] = generate_password_hash('', method, 1).split('$', 1)[0]
+    return _stored_methods[method]
+
+
+def needs_rehash(hashed_password):
+    """
+    This function will check if a stored hash was made with other method/cost parameters or salt
+    length than the ones configured now
+    """
+    parts = hashed_password.split('$', 2)
+    if len(parts) != 3:
+        return True
+    method, salt, _ = parts
+    config = current_app.config
+    return method != stored_method(config['PASSWORD_HASH_METHOD']) or len(salt) != config['PASSWORD_SALT_LENGTH']
@@ -0,0 +1,46 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+_users = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_cached_user(user_id):
+    """
+    This function will get the detached user cached for a warm session, None when missing or expired
+    """
+    with _lock:
+        entry = _users.get(user_id)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if expires_at < time.monotonic():
+            del _users[user_id]
+            return None
+        _users.move_to_end(user_id)
+        return user
+
+
+def cache_user(user):
+    """
+    This function will keep a detached user for USER_CACHE_TTL seconds, evicting the least recently
+    used users beyond USER_CACHE_SIZE
+    """
+    config = current_app.config
+    with _lock:
+        _users[user.id] = (user, time.monotonic() + config['USER_CACHE_TTL'])
+        _users.move_to_end(user.id)
+        while len(_users) > config['USER_CACHE_SIZE']:
+            _users.popitem(last=False)
+
+
+def invalidate_user(user_id):
+    with _lock:
+        _users.pop(user_id, None)
+
+
+def clear_user_cache():
+    with _lock:
+        _users.clear()
@@ -0,0 +1,243 @@
+"""
+Concurrency benchmark: seeds a synthetic dataset into a temporary SQLite database, serves it
+with `event_hub_app.serve` in each mode (multi-worker threaded WSGI, ASGI) and drives every
+server with the same concurrent clients, reporting throughput and p50/p95/p99 latency. The
+page cache is off, every request reaches the database.
+
+Run from the repository root:
+
+    python -m event_hub_app.benchmarks.concurrency --concurrency 32 --requests 2000
+    python -m event_hub_app.benchmarks.concurrency --modes wsgi asgi --workers 2 --threads 8 --output bench.json
+
+A mode whose server or driver is not installed is reported as skipped.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from .seed import seed_dataset, BENCH_PASSWORD
+from .request_paths import percentile
+from .startup import REPOSITORY_ROOT
+
+MODES = ('wsgi', 'asgi')
+
+
+def request_paths(dataset):
+    """
+    This function will map each benchmarked path to a function returning the url of the i-th
+    request: the read-only API the ASGI mode answers asynchronously and a page both modes render
+    with the Flask app. Lists start at a different cursor on every request, so no two requests
+    read the same page
+    """
+    event_ids = dataset['event_ids']
+    cursors = dataset['event_cursors']
+    filters = ('upcoming', 'archived', 'all')
+    return {
+        'api_events': lambda i: f'/api/v1/events?when={filters[i % len(filters)]}&cursor={cursors[i % len(cursors)]}',
+        'api_event_detail': lambda i: f'/api/v1/events/{event_ids[i % len(event_ids)]}',
+        'api_registrations': lambda i: f'/api/v1/me/registrations?cursor={cursors[i % len(cursors)]}',
+        'all_events': lambda i: f'/all_events?cursor={cursors[i % len(cursors)]}',
+    }
+
+
+def mode_unavailable(mode, database_url):
+    """
+    This function will tell why a mode cannot be served here, None when it can
+    """
+    from importlib.util import find_spec
+
+    if mode == 'asgi':
+        from ..auth.async_db import require_async_packages
+        if find_spec('uvicorn') is None:
+            return 'needs uvicorn'
+        try:
+            require_async_packages(database_url)
+        except RuntimeError as e:
+            return str(e)
+    return None
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def start_server(mode, port, args, env, log_file):
+    """
+    This function will start the server of a mode, logging to log_file (a pipe nobody reads
+    would block it once full), and wait until it answers
+    """
+    command = [sys.executable, '-m', 'event_hub_app.serve', '--mode', mode, '--bind', f'127.0.0.1:{port}',
+               '--workers', str(args.workers), '--threads', str(args.threads)]
+    if mode == 'wsgi':
+        command += ['--server', args.wsgi_server]
+    with open(log_file, 'w') as log:
+        server = subprocess.Popen(command, cwd=REPOSITORY_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            with open(log_file) as log:
+                raise RuntimeError(f"the {mode} server exited: {log.read()[-2000:]}")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/')
+            connection.getresponse().read()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"the {mode} server did not answer within 60 seconds")
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def login(port, email):
+    """
+    This function will log in and return the session cookie
+    """
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    connection.request('POST', '/login', urlencode({'email': email, 'password': BENCH_PASSWORD}),
+                       {'Content-Type': 'application/x-www-form-urlencoded'})
+    response = connection.getresponse()
+    response.read()
+    for header in response.headers.get_all('Set-Cookie') or ():
+        if header.startswith('session='):
+            return header.split(';', 1)[0]
+    raise RuntimeError(f"login failed with status {response.status}")
+
+
+def drive(port, cookie, build_url, requests, concurrency):
+    """
+    This function will send `requests` GETs of one path from `concurrency` clients, each on its
+    own keep-alive connection, and return the latencies (ms), status counts and wall time
+    """
+    def client(offset):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        latencies, statuses = [], {}
+        for i in range(offset, requests, concurrency):
+            started = time.perf_counter()
+            connection.request('GET', build_url(i), headers={'Cookie': cookie})
+            response = connection.getresponse()
+            response.read()
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+        connection.close()
+        return latencies, statuses
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(client, range(concurrency)))
+    wall_seconds = time.perf_counter() - started
+
+    latencies = [latency for client_latencies, _ in results for latency in client_latencies]
+    statuses = {}
+    for _, client_statuses in results:
+        for status, count in client_statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+    return latencies, statuses, wall_seconds
+
+
+def run_mode(mode, port, dataset, args, env, log_file):
+    server = start_server(mode, port, args, env, log_file)
+    try:
+        cookie = login(port, dataset['bench_email'])
+        paths = request_paths(dataset)
+        results = {}
+        for name in args.paths or list(paths):
+            drive(port, cookie, paths[name], args.warmup, args.concurrency)
+            latencies, statuses, wall_seconds = drive(port, cookie, paths[name], args.requests, args.concurrency)
+            results[name] = {
+                'requests': args.requests,
+                'throughput_rps': round(args.requests / wall_seconds, 1),
+                'p50_ms': round(percentile(latencies, 0.50), 2),
+                'p95_ms': round(percentile(latencies, 0.95), 2),
+                'p99_ms': round(percentile(latencies, 0.99), 2),
+                'max_ms': round(max(latencies), 2),
+                'status_codes': statuses,
+            }
+        return results
+    finally:
+        stop_server(server)
+
+
+def run_benchmark(args):
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = 'sqlite:///' + os.path.join(directory, 'bench.sqlite')
+        os.environ.update(EVENT_HUB_CONFIG='testing', INSTRUMENTATION_ENABLED='0', DATABASE_URL=database_url,
+                          CACHE_BACKEND='null', CACHE_DIR=os.path.join(directory, 'cache'))
+        # imported only now so the app binds to the benchmark database
+        from ..auth import db
+        from ..app import app
+
+        with app.app_context():
+            db.create_all()
+            dataset = seed_dataset(db, users=args.users, events=args.events, registrations=args.registrations,
+                                   feedbacks=args.feedbacks, bench_registrations=min(200, args.events // 4),
+                                   seed=args.seed)
+            db.engine.dispose()
+
+        env = dict(os.environ, PYTHONUNBUFFERED='1')
+        modes = {}
+        for mode in args.modes:
+            reason = mode_unavailable(mode, database_url)
+            if reason:
+                modes[mode] = {'skipped': reason}
+            else:
+                log_file = os.path.join(directory, f'{mode}.log')
+                modes[mode] = run_mode(mode, free_port(), dataset, args, env, log_file)
+
+    return {
+        'meta': {
+            'dataset': {'users': args.users, 'events': args.events, 'registrations': args.registrations,
+                        'feedbacks': args.feedbacks, 'seed': args.seed},
+            'workers': args.workers,
+            'threads': args.threads,
+            'concurrency': args.concurrency,
+            'cpus': os.cpu_count(),
+        },
+        'modes': modes,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='*', choices=MODES, default=list(MODES))
+    parser.add_argument('--wsgi-server', default='auto', help='gunicorn, waitress, werkzeug or auto')
+    parser.add_argument('--workers', type=int, default=2, help='server processes')
+    parser.add_argument('--threads', type=int, default=8, help='threads per server worker')
+    parser.add_argument('--concurrency', type=int, default=32, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=1000, help='timed requests per path')
+    parser.add_argument('--warmup', type=int, default=64, help='untimed requests per path')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--registrations', type=int, default=20000)
+    parser.add_argument('--feedbacks', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--paths', nargs='*', help='subset of paths to run')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    report = json.dumps(run_benchmark(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(report)
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
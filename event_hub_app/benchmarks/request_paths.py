@@ -0,0 +1,201 @@
+"""
+Request path benchmark: seeds a synthetic dataset into a temporary SQLite database and
+drives the core views through the Flask test client, reporting p50/p99 latency, SQL
+statements per request and peak Python memory per request. The page cache is off unless
+--cache selects a backend, most paths repeat their URLs and would only time cache hits.
+
+Run from the repository root:
+
+    python -m event_hub_app.benchmarks.request_paths --events 5000 --output bench.json
+    python -m event_hub_app.benchmarks.request_paths --compare before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from sqlalchemy import event
+from .seed import seed_dataset, BENCH_PASSWORD
+
+
+def percentile(values, fraction):
+    """
+    This function will get the nearest-rank percentile of the values
+    """
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def request_paths(dataset):
+    """
+    This function will map each benchmarked path to a function returning (method, url, data)
+    for the i-th request. Writes use a different event on every request
+    """
+    event_ids = dataset['event_ids']
+    upcoming = dataset['unregistered_upcoming_ids']
+    rated = dataset['feedback_event_ids']
+    return {
+        'all_events': lambda i: ('GET', '/all_events', None),
+        'event_details': lambda i: ('GET', f'/event_details/{event_ids[i % len(event_ids)]}', None),
+        'register_event': lambda i: ('POST', f'/register/{upcoming[i]}', None),
+        'submit_feedback': lambda i: ('POST', f'/events/feedback/{rated[i]}', {'rating': 1 + i % 5,
+                                                                                'comment': 'bench'}),
+        'archived_events': lambda i: ('GET', '/archived_events', None),
+        'dashboard': lambda i: ('GET', '/dashboard', None),
+        'search': lambda i: ('GET', f'/events/search?q={1000 + i % 1000}', None),
+    }
+
+
+def run_path(client, engine, build_request, requests, warmup):
+    """
+    This function will time `requests` calls of one path after `warmup` untimed calls
+    """
+    statements = []
+    counter = [0]
+
+    def count(*args):
+        counter[0] += 1
+
+    for i in range(warmup):
+        method, url, data = build_request(i)
+        client.open(url, method=method, data=data)
+
+    event.listen(engine, 'before_cursor_execute', count)
+    latencies = []
+    status_codes = {}
+    try:
+        for i in range(warmup, warmup + requests):
+            method, url, data = build_request(i)
+            counter[0] = 0
+            started = time.perf_counter()
+            response = client.open(url, method=method, data=data)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statements.append(counter[0])
+            status_codes[response.status_code] = status_codes.get(response.status_code, 0) + 1
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+
+    # memory is measured in a separate call, tracemalloc would distort the timings
+    method, url, data = build_request(warmup + requests)
+    tracemalloc.start()
+    client.open(url, method=method, data=data)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'requests': requests,
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'statements_per_request': round(sum(statements) / len(statements), 2),
+        'max_statements': max(statements),
+        'peak_memory_kib': round(peak_memory / 1024, 1),
+        'status_codes': status_codes,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(args):
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['EVENT_HUB_CONFIG'] = 'testing'
+        os.environ['INSTRUMENTATION_ENABLED'] = '1' if args.instrumented else '0'
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directory, 'bench.sqlite')
+        os.environ['CACHE_BACKEND'] = args.cache
+        os.environ['CACHE_DIR'] = os.path.join(directory, 'cache')
+        # imported only now so the app binds to the benchmark database
+        from ..auth import db
+        from ..app import app
+        app.config['DASHBOARD_IMAGE_DIR'] = os.path.join(directory, 'dashboard')
+
+        writes = args.requests + args.warmup + 1
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            dataset = seed_dataset(db, users=args.users, events=args.events, registrations=args.registrations,
+                                   feedbacks=args.feedbacks, bench_registrations=writes, seed=args.seed)
+            seed_seconds = time.perf_counter() - started
+            engine = db.engine
+
+        if min(len(dataset['unregistered_upcoming_ids']), len(dataset['feedback_event_ids'])) < writes:
+            sys.exit('dataset too small for the number of write requests, add events or lower --requests')
+
+        client = app.test_client()
+        client.post('/login', data={'email': dataset['bench_email'], 'password': BENCH_PASSWORD})
+
+        paths = request_paths(dataset)
+        selected = args.paths or list(paths)
+        results = {name: run_path(client, engine, paths[name], args.requests, args.warmup) for name in selected}
+
+    return {
+        'meta': {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'dataset': {'users': args.users, 'events': args.events, 'registrations': args.registrations,
+                        'feedbacks': args.feedbacks, 'seed': args.seed},
+            'seed_seconds': round(seed_seconds, 2),
+            'instrumented': args.instrumented,
+            'cache': args.cache,
+        },
+        'paths': results,
+    }
+
+
+def compare(before_file, after_file):
+    """
+    This function will print the change of every metric between two benchmark outputs
+    """
+    with open(before_file) as before_json, open(after_file) as after_json:
+        before, after = json.load(before_json), json.load(after_json)
+    print(f"{before['meta']['revision']} -> {after['meta']['revision']}")
+    for name, metrics in after['paths'].items():
+        if name not in before['paths']:
+            continue
+        for metric in ('p50_ms', 'p99_ms', 'statements_per_request', 'peak_memory_kib'):
+            old, new = before['paths'][name][metric], metrics[metric]
+            change = f"{(new - old) / old * 100:+.1f}%" if old else 'n/a'
+            print(f"{name:16} {metric:24} {old:>10} -> {new:>10} ({change})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--registrations', type=int, default=20000)
+    parser.add_argument('--feedbacks', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=100, help='timed requests per path')
+    parser.add_argument('--warmup', type=int, default=5, help='untimed requests per path')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--paths', nargs='*', help='subset of paths to run')
+    parser.add_argument('--instrumented', action='store_true', help='run with INSTRUMENTATION_ENABLED on')
+    parser.add_argument('--cache', default='null', choices=('null', 'memory', 'filesystem'),
+                        help='page cache backend, off by default so every request reaches the database')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two JSON reports')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = json.dumps(run_benchmark(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(report)
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Synthetic dataset for benchmarks: users, events, registrations and feedback inserted
+with bulk statements so large datasets seed in seconds.
+"""
+import random
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+
+BENCH_PASSWORD = 'bench-password'
+BATCH_SIZE = 5000
+
+
+def _batched(rows, size=BATCH_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def seed_dataset(db, users=1000, events=2000, registrations=20000, feedbacks=5000, bench_registrations=200,
+                 seed=0):
+    """
+    This function will fill the (empty) database and return the ids and page cursors the
+    benchmark drives.
+    The first user is the benchmark user; it gets `bench_registrations` registrations on past
+    events without feedback so feedback submissions always take the insert path
+    """
+    from ..auth.model import User, Event, Feedback, event_participant
+    from ..auth.event_counters import reconcile_counters
+    from ..auth.data_version import bump_data_version
+    from ..auth.pagination import encode_cursor
+    from ..auth.security import hash_password
+
+    rng = random.Random(seed)
+    now = datetime.now()
+    hashed_password = hash_password(BENCH_PASSWORD)
+
+    user_rows = [{'id': str(uuid.uuid4()), 'username': f'bench{i}', 'email': f'bench{i}@bench.example.com',
+                  'phone_number': '0000000000', 'hashed_password': hashed_password} for i in range(users)]
+    user_ids = [row['id'] for row in user_rows]
+    for rows in _batched(user_rows):
+        db.session.execute(insert(User), rows)
+
+    event_rows = []
+    for i in range(events):
+        date_time = now + timedelta(hours=rng.randint(-24 * 365, 24 * 365))
+        duration = rng.choice([30, 60, 90, 120, 240])
+        event_rows.append({'id': str(uuid.uuid4()), 'name': f'bench event {i}',
+                           'description': 'benchmark event ' * rng.randint(5, 50), 'date_time': date_time,
+                           'duration': duration, 'end_time': Event.end_time_for(date_time, duration),
+                           'location': f'hall {i % 20}', 'organizer_id': rng.choice(user_ids)})
+    event_ids = [row['id'] for row in event_rows]
+    past_event_ids = [row['id'] for row in event_rows if row['end_time'] <= now]
+    upcoming_event_ids = [row['id'] for row in event_rows if row['date_time'] > now]
+    for rows in _batched(event_rows):
+        db.session.execute(insert(Event), rows)
+
+    bench_user = user_ids[0]
+    bench_past = set(rng.sample(past_event_ids, min(bench_registrations, len(past_event_ids))))
+    pairs = {(event_id, bench_user) for event_id in bench_past}
+    registrations = min(registrations, len(event_ids) * (len(user_ids) - 1))
+    while len(pairs) < registrations + len(bench_past):
+        pairs.add((rng.choice(event_ids), rng.choice(user_ids[1:])))
+    for rows in _batched([{'event_id': event_id, 'participant_id': user_id} for event_id, user_id in pairs]):
+        db.session.execute(insert(event_participant), rows)
+
+    rated_pairs = rng.sample(sorted(pair for pair in pairs if pair[1] != bench_user),
+                             min(feedbacks, len(pairs) - len(bench_past)))
+    feedback_rows = [{'event_id': event_id, 'user_id': user_id, 'rating': rng.randint(1, 5), 'comment': 'bench'}
+                     for event_id, user_id in rated_pairs]
+    for rows in _batched(feedback_rows):
+        db.session.execute(insert(Feedback), rows)
+
+    reconcile_counters()
+    bump_data_version(db.session.connection())
+    db.session.commit()
+
+    return {
+        'bench_email': user_rows[0]['email'],
+        'event_ids': event_ids,
+        'event_cursors': [encode_cursor(row['date_time'], row['id'])
+                          for row in sorted(event_rows, key=lambda row: (row['date_time'], row['id']))],
+        'unregistered_upcoming_ids': [event_id for event_id in upcoming_event_ids
+                                      if (event_id, bench_user) not in pairs],
+        'feedback_event_ids': sorted(bench_past),
+    }
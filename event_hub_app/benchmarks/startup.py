@@ -0,0 +1,98 @@
+"""
+Startup benchmark: boots the app in fresh interpreters, the way every worker process does,
+and reports the time to import and create it, the resident memory of the booted process
+and which heavy analytics packages were loaded on the way.
+
+Run from the repository root:
+
+    python -m event_hub_app.benchmarks.startup --runs 5
+    python -m event_hub_app.benchmarks.startup --target event_hub_app.app:app --importtime
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ('pandas', 'numpy', 'matplotlib', 'scipy', 'pyarrow')
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# runs in the child: boot the app, then report timings and memory as one JSON line
+PROBE = """
+import importlib, json, resource, sys, time
+started = time.perf_counter()
+module_name, _, attribute = sys.argv[1].partition(':')
+target = getattr(importlib.import_module(module_name), attribute or 'app')
+app = target() if callable(target) and not hasattr(target, 'wsgi_app') else target
+booted = time.perf_counter() - started
+rss_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss_kib //= 1024
+print(json.dumps({'boot_ms': booted * 1000, 'max_rss_kib': rss_kib, 'routes': len(list(app.url_map.iter_rules())),
+                  'heavy_modules': sorted(name for name in json.loads(sys.argv[2]) if name in sys.modules)}))
+"""
+
+
+def boot_once(target, importtime=False):
+    """
+    This function will boot the app in a new interpreter and return the probe's report, with
+    the slowest imports when importtime is set
+    """
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + \
+        ['-c', PROBE, target, json.dumps(HEAVY_MODULES)]
+    env = dict(os.environ, EVENT_HUB_CONFIG=os.environ.get('EVENT_HUB_CONFIG', 'testing'))
+    env.setdefault('DATABASE_URL', 'sqlite://')
+    result = subprocess.run(command, capture_output=True, text=True, env=env, cwd=REPOSITORY_ROOT, check=True)
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    if importtime:
+        report['slowest_imports'] = slowest_imports(result.stderr)
+    return report
+
+
+def slowest_imports(importtime_output, count=10):
+    """
+    This function will get the top-level packages with the largest cumulative import time (ms)
+    from the -X importtime output
+    """
+    totals = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        if not cumulative.isdigit():
+            continue
+        package = name.split('.')[0]
+        # nested imports are listed before their parent, keep the outermost (largest) figure
+        totals[package] = max(totals.get(package, 0), int(cumulative) / 1000)
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True)[:count])
+
+
+def run_benchmark(target, runs, importtime):
+    reports = [boot_once(target) for _ in range(runs)]
+    summary = {
+        'target': target,
+        'runs': runs,
+        'boot_ms_median': round(statistics.median(report['boot_ms'] for report in reports), 1),
+        'boot_ms_min': round(min(report['boot_ms'] for report in reports), 1),
+        'max_rss_mib_median': round(statistics.median(report['max_rss_kib'] for report in reports) / 1024, 1),
+        'routes': reports[0]['routes'],
+        'heavy_modules_loaded': reports[0]['heavy_modules'],
+    }
+    if importtime:
+        summary['slowest_imports_ms'] = boot_once(target, importtime=True)['slowest_imports']
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', default='event_hub_app.app:app',
+                        help='module:attribute of the app, or of a factory to call')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters booted')
+    parser.add_argument('--importtime', action='store_true', help='also list the slowest imports')
+    args = parser.parse_args(argv)
+    print(json.dumps(run_benchmark(args.target, args.runs, args.importtime), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+import os
+import tempfile
+import pytest
+
+# select the testing config and a scratch database before any test imports the app
+os.environ['EVENT_HUB_CONFIG'] = 'testing'
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.sqlite')
+
+
+@pytest.fixture
+def database(tmp_path):
+    from .app import app
+    from .auth import db
+
+    app.config['DASHBOARD_IMAGE_DIR'] = str(tmp_path / 'dashboard')
+    app.extensions['event_hub_cache'].clear()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield db
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
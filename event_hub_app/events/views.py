@@ -0,0 +1,213 @@
+from datetime import date, datetime, timedelta
+from flask import Blueprint, render_template, request, flash, make_response, send_from_directory, abort, \
+    current_app
+from flask_login import login_required, current_user
+from ..auth import db
+from ..auth.model import Event
+from ..auth.data_version import get_data_version
+from ..auth.dashboard_cache import get_dashboard_image, image_directory
+from ..auth.participation import is_registered, is_waitlisted
+from ..auth.analytics_store import analytics_window, registration_trend, rating_distribution, top_events
+from ..auth.pagination import EVENT_LISTING_COLUMNS, get_page_size, paginate_events
+from ..auth.page_cache import cached_page, cached_event_page, cached_event, cached_event_fragment
+from ..auth.search import search_events
+from ..auth.feedback import FEEDBACK_SORTS, feedback_page, rating_summary
+from ..auth.calendar_feed import FEED_COLUMNS, events_in_range, registered_events, find_overlaps, feed_window, \
+    feed_response, parse_local_date_time
+from ..auth.api import json_response, make_etag
+from ..auth.recommendations import recommended_events
+
+bp = Blueprint('events', __name__)
+
+
+@bp.route('/events', methods=['GET'])
+@login_required
+def events():
+    """
+        This function render to list of categorize events
+    """
+    return cached_page('events', 'events.html')
+
+
+@bp.route('/all_events', methods=['GET', 'POST'])
+@login_required
+def all_events():
+    """
+    This function will get one page of events, keyset paginated on (date_time, id)
+    """
+    query = db.session.query(*EVENT_LISTING_COLUMNS)
+    all_events, next_cursor = cached_event_page('all', query, request.args.get('cursor'), get_page_size())
+    return render_template('all_events.html', events=all_events, title="EVENTS LIST", next_cursor=next_cursor)
+
+
+@bp.route('/events/search', methods=['GET'])
+@login_required
+def search():
+    """
+    This function will search events by words (prefix matches) in name, description and location,
+    optionally restricted to a location and a date range, best matches first
+    """
+    terms = request.args.get('q', '')
+    location = request.args.get('location', '')
+    date_from = request.args.get('date_from', type=date.fromisoformat)
+    date_to = request.args.get('date_to', type=date.fromisoformat)
+    results, next_cursor = search_events(terms, location, date_from, date_to, request.args.get('cursor'))
+    next_args = dict(request.args, cursor=next_cursor) if next_cursor else None
+    return render_template('search_events.html', events=results, next_args=next_args, terms=terms,
+                           location=location, date_from=date_from, date_to=date_to)
+
+
+@bp.route('/events/range', methods=['GET'])
+@login_required
+def events_range():
+    """
+    This function will get the events overlapping the window ?start=&end= (ISO 8601, local time
+    unless an offset is given), flagging the ones the user registered for and those of them
+    whose times overlap
+    """
+    try:
+        start = parse_local_date_time(request.args['start'])
+        end = parse_local_date_time(request.args['end'])
+    except (KeyError, ValueError):
+        return json_response({'error': 'Bad Request', 'message': 'start and end must be ISO 8601 date times'}, 400)
+    max_days = current_app.config['CALENDAR_MAX_RANGE_DAYS']
+    if not start < end <= start + timedelta(days=max_days):
+        return json_response({'error': 'Bad Request',
+                              'message': f'end must be after start and at most {max_days} days later'}, 400)
+
+    rows = events_in_range(start, end)
+    registered = registered_events(current_user.id, start=start, end=end)
+    overlaps = find_overlaps(registered)
+    registered_ids = {row.id for row in registered}
+    conflicting_ids = {event_id for pair in overlaps for event_id in pair}
+    return json_response({
+        'start': start,
+        'end': end,
+        'events': [{'id': row.id, 'name': row.name, 'date_time': row.date_time, 'end_time': row.end_time,
+                    'duration': row.duration, 'location': row.location, 'registered': row.id in registered_ids,
+                    'conflict': row.id in conflicting_ids} for row in rows],
+        'overlaps': overlaps,
+    })
+
+
+@bp.route('/calendar/events.ics', methods=['GET'])
+def calendar_feed():
+    """
+    This function will get the iCalendar feed of all the events of the feed window
+    """
+    start, end = feed_window(datetime.now())
+    return feed_response('Event Hub', events_in_range(start, end, FEED_COLUMNS))
+
+
+@bp.route('/event_details/<event_id>')
+@login_required
+def event_details(event_id):
+    """
+    This function get the event based and show status of registration
+    based on time/already registered/organizer
+    """
+    event = cached_event(event_id)
+    if event is None:
+        abort(404)
+
+    # check if participant is organiser
+    organiser = False
+    if current_user.id == event['organizer_id']:
+        organiser = True
+
+    # check if user is already registered, or waiting for a seat
+    registered = is_registered(current_user.id, event_id)
+    waitlisted = not registered and is_waitlisted(current_user.id, event_id)
+
+    # check for the scheduled time
+    event_closed = False
+    current_date = datetime.now()
+    if current_date >= event['date_time']:
+        event_closed = True
+
+    return render_template('event_details.html', event=event, event_closed=event_closed,
+                           registered=registered, waitlisted=waitlisted, organiser=organiser,
+                           recommendations=recommended_events(current_user.id, exclude_event_id=event_id))
+
+
+@bp.route('/archived_events', methods=['GET'])
+def archived_events():
+    """
+    This function will get one page of events that are completed
+    """
+    current_date = datetime.now()
+    query = db.session.query(*EVENT_LISTING_COLUMNS).filter(Event.archived(current_date))
+    archived_events_list, next_cursor = paginate_events(query, request.args.get('cursor'))
+
+    return render_template('all_events.html', events=archived_events_list, title="ARCHIVED EVENTS ",
+                           next_cursor=next_cursor)
+
+
+@bp.route('/event_details/<event_id>/event-feedbacks')
+def get_event_feedbacks(event_id):
+    """
+    This function will get one page of the feedbacks of an event with the reviewers' names,
+    sorted by recency or rating, and the rating summary
+    """
+    event = cached_event(event_id)
+    if event is None:
+        abort(404)
+    sort = request.args.get('sort', 'recent')
+    if sort not in FEEDBACK_SORTS:
+        sort = 'recent'
+    cursor = request.args.get('cursor')
+    page_size = get_page_size()
+    try:
+        def render():
+            event_feedbacks, next_cursor = feedback_page(event_id, sort, cursor, page_size)
+            summary = rating_summary(event['rating_sum'], event['rating_count'], event_id)
+            return render_template('event_feedbacks.html', event=event, event_feedbacks=event_feedbacks,
+                                   summary=summary, sort=sort, sorts=FEEDBACK_SORTS, next_cursor=next_cursor)
+        return cached_event_fragment(f'feedbacks:{sort}:{cursor}:{page_size}', event_id, render)
+    except Exception as e:
+        flash(f"error occurred when getting the feedback details{e}")
+
+
+@bp.route('/dashboard')
+def dashboard():
+    """
+    This function will render the html template to display the graphs. The graph is rendered
+    once per data version; unchanged data is answered with 304 from the ETag, which also covers
+    the user the navigation is rendered for
+    """
+    graph_file = get_dashboard_image(get_data_version())
+    etag = make_etag(graph_file, current_user.get_id())
+    if etag in request.if_none_match:
+        response = make_response('', 304)
+    else:
+        response = make_response(render_template('analytics_dashboard.html', graph_file=graph_file))
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    response.cache_control.private = True
+    response.vary.add('Cookie')
+    return response
+
+
+@bp.route('/dashboard/trends')
+def dashboard_trends():
+    """
+    This function will show registration trends, the rating distribution and the top events of a
+    window, read from the precomputed analytics tables
+    """
+    days = analytics_window()
+    limit = current_app.config['ANALYTICS_TOP_K']
+    return render_template('analytics_trends.html', title="EVENT TRENDS", days=days,
+                           windows=current_app.config['ANALYTICS_WINDOWS'], trend=registration_trend(days),
+                           distribution=rating_distribution(days),
+                           top_by_participation=top_events('participation', days, limit),
+                           top_by_rating=top_events('rating', days, limit))
+
+
+@bp.route('/dashboard/graphs/<file_name>')
+def dashboard_graph(file_name):
+    """
+    This function will serve a rendered graph, the content hash in the name makes it immutable
+    """
+    response = send_from_directory(image_directory(), file_name, max_age=365 * 24 * 3600)
+    response.cache_control.immutable = True
+    return response
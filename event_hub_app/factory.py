@@ -0,0 +1,35 @@
+import os
+from flask import Flask
+from .auth import db, migrate, login_manager
+from .auth.config import get_config, basedir
+from .auth.database import configure_database, init_database
+from .auth.instrumentation import init_instrumentation
+from .auth.cache import init_cache
+from .auth import views as auth_views
+from .auth.api import api
+from .auth.commands import commands
+from .events import views as events_views
+from .participant import views as participant_views
+from .organizer import views as organizer_views
+
+
+def create_app(config_name=None):
+    """
+    This function will build the app: configuration, extensions, then one blueprint per feature
+    area. pandas and matplotlib are not imported on the way, the dashboard graph and the reports
+    load them on first use
+    """
+    app = Flask(__name__, root_path=basedir)
+    app.config.from_object(get_config(config_name))
+    configure_database(app)
+
+    db.init_app(app)
+    init_database(app, db)
+    init_instrumentation(app, db)
+    init_cache(app)
+    migrate.init_app(app, db, directory=os.path.join(os.path.dirname(basedir), 'migrations'), render_as_batch=True)
+    login_manager.init_app(app)
+
+    for blueprint in (auth_views.bp, events_views.bp, participant_views.bp, organizer_views.bp, api, commands):
+        app.register_blueprint(blueprint)
+    return app
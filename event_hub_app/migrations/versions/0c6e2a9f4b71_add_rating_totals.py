@@ -0,0 +1,34 @@
+"""all-time rating totals instead of the index on analytics_daily_ratings.rating
+
+Revision ID: 0c6e2a9f4b71
+Revises: 7a3c9e5d2b84
+Create Date: 2026-10-20 09:41:26.530814
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c6e2a9f4b71'
+down_revision = '7a3c9e5d2b84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('analytics_rating_totals',
+    sa.Column('rating', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('rating')
+    )
+    op.execute(
+        "INSERT INTO analytics_rating_totals (rating, count) "
+        "SELECT rating, SUM(count) FROM analytics_daily_ratings GROUP BY rating"
+    )
+    op.drop_index('ix_analytics_daily_ratings_rating', table_name='analytics_daily_ratings')
+
+
+def downgrade():
+    op.create_index('ix_analytics_daily_ratings_rating', 'analytics_daily_ratings', ['rating', 'count'], unique=False)
+    op.drop_table('analytics_rating_totals')
@@ -0,0 +1,55 @@
+"""add events_fts full-text index kept in sync by triggers
+
+Revision ID: 1f7c4d2e8a93
+Revises: e93b5f2a7c61
+Create Date: 2026-10-18 16:41:52.204719
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '1f7c4d2e8a93'
+down_revision = 'e93b5f2a7c61'
+branch_labels = None
+depends_on = None
+
+TRIGGERS = ('events_fts_insert', 'events_fts_delete', 'events_fts_update')
+
+
+def upgrade():
+    # FTS5 is sqlite only, other databases search with LIKE
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE events_fts USING fts5("
+        "name, description, location, content='events', content_rowid='rowid', "
+        "prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+    )
+    op.execute("INSERT INTO events_fts(events_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 3.0)')")
+    op.execute(
+        "CREATE TRIGGER events_fts_insert AFTER INSERT ON events BEGIN "
+        "INSERT INTO events_fts(rowid, name, description, location) "
+        "VALUES (new.rowid, new.name, new.description, new.location); END"
+    )
+    op.execute(
+        "CREATE TRIGGER events_fts_delete AFTER DELETE ON events BEGIN "
+        "INSERT INTO events_fts(events_fts, rowid, name, description, location) "
+        "VALUES ('delete', old.rowid, old.name, old.description, old.location); END"
+    )
+    op.execute(
+        "CREATE TRIGGER events_fts_update AFTER UPDATE OF name, description, location ON events BEGIN "
+        "INSERT INTO events_fts(events_fts, rowid, name, description, location) "
+        "VALUES ('delete', old.rowid, old.name, old.description, old.location); "
+        "INSERT INTO events_fts(rowid, name, description, location) "
+        "VALUES (new.rowid, new.name, new.description, new.location); END"
+    )
+    op.execute("INSERT INTO events_fts(events_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for trigger in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS events_fts")
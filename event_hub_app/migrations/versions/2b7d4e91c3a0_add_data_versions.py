@@ -0,0 +1,29 @@
+"""add data_versions
+
+Revision ID: 2b7d4e91c3a0
+Revises: 6c579b8b0a8f
+Create Date: 2026-10-18 10:02:11.381907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b7d4e91c3a0'
+down_revision = '6c579b8b0a8f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    data_versions = op.create_table('data_versions',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(data_versions, [{'name': 'dashboard', 'version': 1}])
+
+
+def downgrade():
+    op.drop_table('data_versions')
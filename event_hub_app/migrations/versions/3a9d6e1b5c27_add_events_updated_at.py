@@ -0,0 +1,32 @@
+"""add events.updated_at
+
+Revision ID: 3a9d6e1b5c27
+Revises: 1f7c4d2e8a93
+Create Date: 2026-10-18 17:35:26.540913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a9d6e1b5c27'
+down_revision = '1f7c4d2e8a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # a plain ADD COLUMN, so sqlite keeps the events table (and its rowids and search triggers)
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE events SET updated_at = CURRENT_TIMESTAMP")
+
+
+def downgrade():
+    # batch mode would rebuild the table on sqlite and lose the search triggers, DROP COLUMN keeps it
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("ALTER TABLE events DROP COLUMN updated_at")
+    else:
+        op.drop_column('events', 'updated_at')
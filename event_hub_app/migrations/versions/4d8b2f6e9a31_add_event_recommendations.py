@@ -0,0 +1,35 @@
+"""add event_recommendations, top events per user precomputed by a batch job
+
+Revision ID: 4d8b2f6e9a31
+Revises: f2c8d5a1e4b6
+Create Date: 2026-10-18 23:40:27.512934
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d8b2f6e9a31'
+down_revision = 'f2c8d5a1e4b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('event_recommendations',
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.String(length=36), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'rank')
+    )
+    op.create_index('ix_event_recommendations_event_id', 'event_recommendations', ['event_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_event_recommendations_event_id', table_name='event_recommendations')
+    op.drop_table('event_recommendations')
@@ -0,0 +1,26 @@
+"""index events for keyset pagination
+
+Revision ID: 5e0a9c7d1f42
+Revises: 2b7d4e91c3a0
+Create Date: 2026-10-18 10:31:48.102254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e0a9c7d1f42'
+down_revision = '2b7d4e91c3a0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.create_index('ix_events_date_time_id', ['date_time', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_index('ix_events_date_time_id')
@@ -0,0 +1,28 @@
+"""add feedback indexes for the paginated feedback page
+
+Revision ID: 6b2e8f4a1d90
+Revises: 3a9d6e1b5c27
+Create Date: 2026-10-18 18:22:40.917356
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b2e8f4a1d90'
+down_revision = '3a9d6e1b5c27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('feedbacks', schema=None) as batch_op:
+        batch_op.create_index('ix_feedbacks_event_id_id', ['event_id', 'id'], unique=False)
+        batch_op.create_index('ix_feedbacks_event_id_rating', ['event_id', 'rating', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('feedbacks', schema=None) as batch_op:
+        batch_op.drop_index('ix_feedbacks_event_id_rating')
+        batch_op.drop_index('ix_feedbacks_event_id_id')
@@ -0,0 +1,24 @@
+"""index analytics_daily_ratings by rating for the all-time distribution
+
+Revision ID: 7a3c9e5d2b84
+Revises: 4d8b2f6e9a31
+Create Date: 2026-10-19 10:12:43.208517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a3c9e5d2b84'
+down_revision = '4d8b2f6e9a31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_analytics_daily_ratings_rating', 'analytics_daily_ratings', ['rating', 'count'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_analytics_daily_ratings_rating', table_name='analytics_daily_ratings')
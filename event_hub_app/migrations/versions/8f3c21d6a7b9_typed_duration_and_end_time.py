@@ -0,0 +1,39 @@
+"""typed duration and indexed end_time
+
+Revision ID: 8f3c21d6a7b9
+Revises: 5e0a9c7d1f42
+Create Date: 2026-10-18 11:04:37.550812
+
+Run `flask backfill-end-time` after upgrading to fill end_time for existing events.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f3c21d6a7b9'
+down_revision = '5e0a9c7d1f42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.alter_column('duration',
+               existing_type=sa.String(length=20),
+               type_=sa.Integer(),
+               existing_nullable=False,
+               postgresql_using='duration::integer')
+        batch_op.add_column(sa.Column('end_time', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_events_end_time'), ['end_time'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_events_end_time'))
+        batch_op.drop_column('end_time')
+        batch_op.alter_column('duration',
+               existing_type=sa.Integer(),
+               type_=sa.String(length=20),
+               existing_nullable=False)
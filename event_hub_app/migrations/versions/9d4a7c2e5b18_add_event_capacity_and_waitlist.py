@@ -0,0 +1,50 @@
+"""add events.capacity and the event waitlist
+
+Revision ID: 9d4a7c2e5b18
+Revises: 6b2e8f4a1d90
+Create Date: 2026-10-18 19:04:12.381527
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4a7c2e5b18'
+down_revision = '6b2e8f4a1d90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # a plain ADD COLUMN, so sqlite keeps the events table (and its rowids and search triggers)
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('capacity', sa.Integer(), nullable=True))
+
+    op.create_table('event_waitlist',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('event_id', 'user_id', name='uq_event_waitlist_event_user')
+    )
+    with op.batch_alter_table('event_waitlist', schema=None) as batch_op:
+        batch_op.create_index('ix_event_waitlist_event_id_id', ['event_id', 'id'], unique=False)
+        batch_op.create_index('ix_event_waitlist_user_id', ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('event_waitlist', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_waitlist_user_id')
+        batch_op.drop_index('ix_event_waitlist_event_id_id')
+
+    op.drop_table('event_waitlist')
+
+    # batch mode would rebuild the table on sqlite and lose the search triggers, DROP COLUMN keeps it
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("ALTER TABLE events DROP COLUMN capacity")
+    else:
+        op.drop_column('events', 'capacity')
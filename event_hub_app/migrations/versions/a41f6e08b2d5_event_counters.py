@@ -0,0 +1,39 @@
+"""denormalized participant and rating counters on events
+
+Revision ID: a41f6e08b2d5
+Revises: 8f3c21d6a7b9
+Create Date: 2026-10-18 11:52:20.774103
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41f6e08b2d5'
+down_revision = '8f3c21d6a7b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('participant_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+
+    # same computation as `flask reconcile-counters`
+    op.execute("""
+        UPDATE events SET
+            participant_count = (SELECT count(*) FROM event_participant
+                                 WHERE event_participant.event_id = events.id),
+            rating_sum = (SELECT coalesce(sum(rating), 0) FROM feedbacks WHERE feedbacks.event_id = events.id),
+            rating_count = (SELECT count(rating) FROM feedbacks WHERE feedbacks.event_id = events.id)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_column('rating_count')
+        batch_op.drop_column('rating_sum')
+        batch_op.drop_column('participant_count')
@@ -0,0 +1,45 @@
+"""add the notification job queue
+
+Revision ID: b5e1f3a8c642
+Revises: 9d4a7c2e5b18
+Create Date: 2026-10-18 19:48:51.204733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e1f3a8c642'
+down_revision = '9d4a7c2e5b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=32), nullable=False),
+    sa.Column('event_id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=True),
+    sa.Column('run_at', sa.DateTime(), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('claim_token', sa.String(length=32), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('notification_jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_notification_jobs_event_id_status', ['event_id', 'status', 'kind', 'user_id'], unique=False)
+        batch_op.create_index('ix_notification_jobs_status_run_at', ['status', 'run_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notification_jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_jobs_status_run_at')
+        batch_op.drop_index('ix_notification_jobs_event_id_status')
+
+    op.drop_table('notification_jobs')
@@ -0,0 +1,52 @@
+"""indexes for hot query shapes and one feedback per user and event
+
+Revision ID: c7e2b9f4d013
+Revises: a41f6e08b2d5
+Create Date: 2026-10-18 12:40:05.219634
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2b9f4d013'
+down_revision = 'a41f6e08b2d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # keep the first feedback of each user for an event, then recount the ratings
+    op.execute("""
+        DELETE FROM feedbacks WHERE id NOT IN (
+            SELECT min(id) FROM feedbacks GROUP BY event_id, user_id
+        )
+    """)
+    op.execute("""
+        UPDATE events SET
+            rating_sum = (SELECT coalesce(sum(rating), 0) FROM feedbacks WHERE feedbacks.event_id = events.id),
+            rating_count = (SELECT count(rating) FROM feedbacks WHERE feedbacks.event_id = events.id)
+    """)
+
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_events_name'), ['name'], unique=False)
+        batch_op.create_index('ix_events_organizer_id_date_time', ['organizer_id', 'date_time', 'id'], unique=False)
+
+    with op.batch_alter_table('feedbacks', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_feedbacks_event_user', ['event_id', 'user_id'])
+
+    with op.batch_alter_table('event_participant', schema=None) as batch_op:
+        batch_op.create_index('ix_event_participant_participant_id', ['participant_id', 'event_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('event_participant', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_participant_participant_id')
+
+    with op.batch_alter_table('feedbacks', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_feedbacks_event_user', type_='unique')
+
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_index('ix_events_organizer_id_date_time')
+        batch_op.drop_index(batch_op.f('ix_events_name'))
@@ -0,0 +1,32 @@
+"""widen users.hashed_password for scrypt hashes
+
+Revision ID: d58a0c3e9b17
+Revises: c7e2b9f4d013
+Create Date: 2026-10-18 14:12:48.630451
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd58a0c3e9b17'
+down_revision = 'c7e2b9f4d013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.alter_column('hashed_password',
+               existing_type=sa.String(length=128),
+               type_=sa.String(length=256),
+               existing_nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.alter_column('hashed_password',
+               existing_type=sa.String(length=256),
+               type_=sa.String(length=128),
+               existing_nullable=False)
@@ -0,0 +1,77 @@
+"""add analytics store tables and registration/feedback timestamps
+
+Revision ID: e93b5f2a7c61
+Revises: d58a0c3e9b17
+Create Date: 2026-10-18 15:20:07.118532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e93b5f2a7c61'
+down_revision = 'd58a0c3e9b17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event_participant', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('registered_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('feedbacks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+
+    op.create_table('analytics_daily_registrations',
+    sa.Column('event_id', sa.String(length=36), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('registrations', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ),
+    sa.PrimaryKeyConstraint('event_id', 'day')
+    )
+    with op.batch_alter_table('analytics_daily_registrations', schema=None) as batch_op:
+        batch_op.create_index('ix_analytics_daily_registrations_day', ['day', 'event_id'], unique=False)
+
+    op.create_table('analytics_daily_ratings',
+    sa.Column('event_id', sa.String(length=36), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('rating', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ),
+    sa.PrimaryKeyConstraint('event_id', 'day', 'rating')
+    )
+    with op.batch_alter_table('analytics_daily_ratings', schema=None) as batch_op:
+        batch_op.create_index('ix_analytics_daily_ratings_day', ['day', 'event_id'], unique=False)
+
+    # existing registrations and feedback have no timestamp, they are counted on the event's day
+    is_sqlite = op.get_bind().dialect.name == 'sqlite'
+    day = "date({})" if is_sqlite else "CAST({} AS DATE)"
+    event_day = day.format("e.date_time")
+    op.execute(
+        "INSERT INTO analytics_daily_registrations (event_id, day, registrations) "
+        f"SELECT ep.event_id, {event_day}, COUNT(*) FROM event_participant ep "
+        f"JOIN events e ON e.id = ep.event_id GROUP BY ep.event_id, {event_day}"
+    )
+    op.execute(
+        "INSERT INTO analytics_daily_ratings (event_id, day, rating, count) "
+        f"SELECT f.event_id, {event_day}, f.rating, COUNT(*) FROM feedbacks f "
+        "JOIN events e ON e.id = f.event_id WHERE f.rating BETWEEN 1 AND 5 "
+        f"GROUP BY f.event_id, {event_day}, f.rating"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('analytics_daily_ratings', schema=None) as batch_op:
+        batch_op.drop_index('ix_analytics_daily_ratings_day')
+
+    op.drop_table('analytics_daily_ratings')
+    with op.batch_alter_table('analytics_daily_registrations', schema=None) as batch_op:
+        batch_op.drop_index('ix_analytics_daily_registrations_day')
+
+    op.drop_table('analytics_daily_registrations')
+    with op.batch_alter_table('feedbacks', schema=None) as batch_op:
+        batch_op.drop_column('created_at')
+
+    with op.batch_alter_table('event_participant', schema=None) as batch_op:
+        batch_op.drop_column('registered_at')
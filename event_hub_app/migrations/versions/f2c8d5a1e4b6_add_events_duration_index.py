@@ -0,0 +1,25 @@
+"""index events.duration for the calendar range queries
+
+Revision ID: f2c8d5a1e4b6
+Revises: b5e1f3a8c642
+Create Date: 2026-10-18 21:05:12.448120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c8d5a1e4b6'
+down_revision = 'b5e1f3a8c642'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # plain CREATE INDEX, a batch operation would recreate events and drop its FTS triggers
+    op.create_index('ix_events_duration', 'events', ['duration'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_events_duration', table_name='events')
@@ -0,0 +1,29 @@
+from flask_wtf import FlaskForm
+from wtforms import StringField, IntegerField, SubmitField, TextAreaField, DateTimeField
+from wtforms.validators import DataRequired, NumberRange, Optional
+
+
+class EventOrganizerForm(FlaskForm):
+    try:
+        name = StringField('Event Name', validators=[DataRequired()])
+        description = TextAreaField('Description', validators=[DataRequired()])
+        date_time = DateTimeField('Date and Time', format='%Y-%m-%d %H:%M', validators=[DataRequired()],
+                                  description='Format: YYYY-MM-DD HH:MM')
+        duration = IntegerField('Duration in Minutes', validators=[DataRequired(), NumberRange(min=1)])
+        location = StringField('Location')
+        capacity = IntegerField('Capacity (empty for unlimited)', validators=[Optional(), NumberRange(min=1)])
+        submit = SubmitField('Organize Event')
+    except Exception as e:
+        print(f"An error occurred when creating event organizer form {e}")
+
+
+class UpdateEventForm(FlaskForm):
+    try:
+        name = StringField('Name', validators=[DataRequired()])
+        description = TextAreaField('Description', validators=[DataRequired()])
+        date_time = DateTimeField('Date and Time', validators=[DataRequired()])
+        duration = IntegerField('Duration in Minutes', validators=[DataRequired(), NumberRange(min=1)])
+        location = StringField('Location')
+        capacity = IntegerField('Capacity (empty for unlimited)', validators=[Optional(), NumberRange(min=1)])
+    except Exception as e:
+        print(f"An error occurred when creating event organizer form {e}")
@@ -0,0 +1,153 @@
+import io
+from flask import Blueprint, render_template, redirect, request, url_for, flash, jsonify, Response, \
+    stream_with_context, abort, current_app
+from flask_login import login_required, current_user
+from sqlalchemy import delete
+from ..auth import db
+from ..auth.model import Event, Feedback, WaitlistEntry, event_participant
+from ..auth.notifications import notify_event_updated, notify_event_deleted
+from ..auth.participation import promote_waitlist
+from ..auth.analytics_store import analytics_window, delete_event_analytics, organizer_summary
+from ..auth.recommendations import delete_event_recommendations
+from ..auth.pagination import ORGANIZED_EVENT_COLUMNS, paginate_events
+from ..auth.bulk import FORMATS, IMPORTERS, format_from_filename, iter_records, export_attendees
+from .forms import EventOrganizerForm, UpdateEventForm
+
+bp = Blueprint('organizer', __name__)
+
+
+@bp.route('/organize', methods=['GET', 'POST'])
+@login_required
+def organize_event():
+    """
+        This function will get the data from organize form and store to event data base
+    """
+    form = EventOrganizerForm()
+    if form.validate_on_submit():
+        try:
+            if Event.query.filter_by(name=form.name.data).first():
+                return render_template('organizer.html', form=form,
+                                       error="Event with this name already exists!")
+            # save it to event database
+            event = Event(
+                name=form.name.data,
+                description=form.description.data,
+                date_time=form.date_time.data,
+                event_duration=form.duration.data,
+                location=form.location.data,
+                organizer_id=current_user.id,
+                capacity=form.capacity.data
+            )
+            db.session.add(event)
+            db.session.commit()
+            flash('Event organized successfully!', 'success')
+            return redirect(url_for('organizer.user_organized_events'))
+        except Exception as e:
+            flash(f"error generated while  organise data saving to Event DB {e}")
+    return render_template('organizer.html', form=form)
+
+
+@bp.route('/events/organized_events', methods=['GET'])
+@login_required
+def user_organized_events():
+    """
+    This function will get the user organized events and display event details
+    """
+    query = db.session.query(*ORGANIZED_EVENT_COLUMNS).filter(Event.organizer_id == current_user.id)
+    organized_events, next_cursor = paginate_events(query, request.args.get('cursor'))
+    return render_template('organized_events.html', events=organized_events, next_cursor=next_cursor)
+
+
+@bp.route('/event/update/<event_id>', methods=['GET', 'POST'])
+def update_event(event_id):
+    """
+        This function will update the event details
+    """
+    event = Event.query.get(event_id)
+    form = UpdateEventForm(obj=event)
+    if form.validate_on_submit():
+        try:
+            event.name = form.name.data
+            event.description = form.description.data
+            event.date_time = form.date_time.data
+            event.duration = form.duration.data
+            event.location = form.location.data
+            event.capacity = form.capacity.data
+            notify_event_updated(event)
+            db.session.flush()
+            # a larger capacity (or none) seats the waitlist
+            promote_waitlist(event.id)
+            db.session.commit()
+            flash('Event details updated successfully!')
+            return redirect(url_for('organizer.user_organized_events'))
+        except Exception as e:
+            flash(f"Error occurred when saving updated event details to database {e}")
+    return render_template('update_event.html', form=form, event=event)
+
+
+@bp.route('/event/delete/<event_id>', methods=['POST'])
+def delete_event(event_id):
+    """
+    This function will delete the even from DB
+    """
+    event = Event.query.get(event_id)
+    if event:
+        notify_event_deleted(event)
+        # registrations and feedback go with the event, and so do its counters
+        db.session.execute(delete(event_participant).where(event_participant.c.event_id == event.id))
+        db.session.execute(delete(Feedback).where(Feedback.event_id == event.id))
+        db.session.execute(delete(WaitlistEntry).where(WaitlistEntry.event_id == event.id))
+        delete_event_analytics(event.id)
+        delete_event_recommendations(event.id)
+        db.session.delete(event)
+        db.session.commit()
+        flash('Event deleted successfully', 'success')
+        return redirect(url_for('organizer.user_organized_events'))
+    else:
+        flash('Event not found', 'error')
+    return redirect(url_for('organizer.user_organized_events'))
+
+
+@bp.route('/dashboard/organizer')
+@login_required
+def organizer_dashboard():
+    """
+    This function will show the summary of the current user's organized events
+    """
+    days = analytics_window()
+    summary = organizer_summary(current_user.id, days, current_app.config['ANALYTICS_TOP_K'])
+    return render_template('analytics_trends.html', title="MY EVENTS", days=days,
+                           windows=current_app.config['ANALYTICS_WINDOWS'], summary=summary, **summary)
+
+
+@bp.route('/bulk/import/<kind>', methods=['POST'])
+@login_required
+def bulk_import(kind):
+    """
+    This function will import an uploaded csv/json/ndjson file of events, registrations or feedback.
+    Events are organized by the current user and registrations/feedback only go to the user's events
+    """
+    upload = request.files.get('file')
+    if kind not in IMPORTERS or upload is None:
+        return jsonify(error="POST a 'file' to /bulk/import/events, registrations or feedback"), 400
+    file_format = request.form.get('format') or format_from_filename(upload.filename or '')
+    if file_format not in FORMATS:
+        return jsonify(error=f"unsupported format {file_format!r}"), 400
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    summary = IMPORTERS[kind](iter_records(stream, file_format), organizer_id=current_user.id)
+    # an unreadable file stops the import, the summary tells what was committed before
+    return jsonify(summary.to_dict()), 400 if summary.read_error else 200
+
+
+@bp.route('/event/<event_id>/attendees.csv')
+@login_required
+def export_event_attendees(event_id):
+    """
+    This function will stream the attendee list of an organizer's event as CSV
+    """
+    event = Event.query.get(event_id)
+    if event is None or event.organizer_id != current_user.id:
+        abort(404)
+    response = Response(stream_with_context(export_attendees(event_id)), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename=attendees-{event_id}.csv'
+    return response
@@ -0,0 +1,151 @@
+from datetime import datetime
+from flask import Blueprint, render_template, redirect, url_for, flash, abort
+from flask_login import login_required, current_user
+from ..auth import db
+from ..auth.model import Event, Feedback
+from ..auth.forms import EventFeedbackForm
+from ..auth.participation import register_participant, registration_closed, cancel_registration, \
+    participant_events_query, REGISTERED, WAITLISTED, ALREADY_WAITLISTED, CANCELLED, LEFT_WAITLIST
+from ..auth.event_counters import add_rating
+from ..auth.analytics_store import record_ratings
+from ..auth.page_cache import cached_event
+from ..auth.calendar_feed import FEED_COLUMNS, calendar_token, user_for_calendar_token, registered_events, \
+    feed_window, feed_response
+
+bp = Blueprint('participant', __name__)
+
+
+@bp.route('/register/<event_id>', methods=['POST'])
+@login_required
+def register_event(event_id):
+    """
+    This function will add the participant to event DB when user registered,
+    or to the event's waitlist when it is full
+    """
+    event = cached_event(event_id)
+    if event is None:
+        abort(404)
+    if registration_closed(event['organizer_id'], event['date_time'], current_user.id):
+        flash('Registration is closed for this event.')
+        return redirect(url_for('events.event_details', event_id=event_id))
+
+    outcome = register_participant(current_user.id, event_id)
+    db.session.commit()
+
+    if outcome == REGISTERED:
+        flash('Successfully registered for the event!')
+    elif outcome == WAITLISTED:
+        flash('The event is full, you are on the waitlist and will be registered when a seat frees up.')
+        return redirect(url_for('events.event_details', event_id=event_id))
+    elif outcome == ALREADY_WAITLISTED:
+        flash('You are already on the waitlist for this event!')
+        return redirect(url_for('events.event_details', event_id=event_id))
+    else:
+        flash('You are already registered for this event!')
+    return redirect(url_for('participant.user_registered_events'))
+
+
+@bp.route('/register/<event_id>/cancel', methods=['POST'])
+@login_required
+def cancel_event_registration(event_id):
+    """
+    This function will cancel the user's registration (the first waitlisted user gets the seat)
+    or take the user off the waitlist
+    """
+    outcome = cancel_registration(current_user.id, event_id)
+    db.session.commit()
+
+    if outcome == CANCELLED:
+        flash('Your registration was cancelled.')
+    elif outcome == LEFT_WAITLIST:
+        flash('You left the waitlist.')
+    else:
+        flash('You are not registered for this event.')
+    return redirect(url_for('events.event_details', event_id=event_id))
+
+
+@bp.route('/events/events_registered', methods=['GET'])
+@login_required
+def user_registered_events():
+    """
+    This function will get the user specific registered events
+    """
+    user = current_user  # Assuming the current user is authenticated
+    current_date = datetime.now()
+    registered_events_list = participant_events_query(user.id).filter(Event.upcoming(current_date)).all()
+
+    return render_template('events_participated.html', events=registered_events_list, title="REGISTERED EVENTS",
+                           calendar_url=url_for('participant.user_calendar_feed', token=calendar_token(user.id),
+                                                _external=True))
+
+
+@bp.route('/calendar/<token>.ics', methods=['GET'])
+def user_calendar_feed(token):
+    """
+    This function will get the iCalendar feed of the user's registrations. Calendar clients
+    cannot log in, the feed URL carries a token signed for the user instead
+    """
+    user_id = user_for_calendar_token(token)
+    if user_id is None:
+        abort(404)
+    start, end = feed_window(datetime.now())
+    return feed_response('My Event Hub registrations', registered_events(user_id, FEED_COLUMNS, start, end))
+
+
+@bp.route('/events/events_participated', methods=['GET'])
+@login_required
+def user_participated_events():
+    """
+    This function will get the user participated events , the event user
+    registered and participated(event time completed)
+    """
+    user = current_user
+
+    # check event time is completed
+    current_date = datetime.now()
+    participated_events_list = participant_events_query(user.id).filter(Event.archived(current_date)).all()
+
+    return render_template('events_participated.html', events=participated_events_list, title="PARTICIPATED EVENTS",
+                           feedback_button=True)
+
+
+@bp.route('/events/<event_id>/feedback', methods=['GET', 'POST'])
+def show_feedback_form(event_id):
+    event = Event.query.get(event_id)
+    form = EventFeedbackForm()
+    return render_template('feedback_form.html', event=event, form=form)
+
+
+@bp.route('/events/feedback/<event_id>', methods=['GET', 'POST'])
+def submit_feedback(event_id):
+    """
+    This function submit the feedback for an event  only when feedback is not given
+    """
+    event = Event.query.get(event_id)
+    form = EventFeedbackForm()
+    if form.validate_on_submit():
+
+        # Check if the user has already provided feedback for the event
+        existing_feedback = Feedback.query.filter_by(event_id=event.id, user_id=current_user.id).first()
+        if existing_feedback:
+            flash('You have already submitted feedback for this event.')
+            return render_template('feedback_form.html', form=form, event=event, error_message=True)
+
+        # Save the rating and comment to the database
+        try:
+            feedback = Feedback(
+                event_id=event.id,
+                user_id=current_user.id,
+                rating=form.rating.data,
+                comment=form.comment.data
+            )
+            db.session.add(feedback)
+            add_rating(event.id, feedback.rating)
+            record_ratings({(event.id, feedback.rating): 1})
+            db.session.commit()
+            message = "Feedback is  Submitted"
+            flash('Feedback submitted successfully!')
+            return redirect(url_for('participant.user_participated_events', message=message))
+        except Exception as e:
+            flash(f"error occurred when submitting the feedback data to DB {e}")
+    return render_template('feedback_form.html', form=form, event=event)
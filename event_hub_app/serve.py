@@ -0,0 +1,129 @@
+"""
+Production entry point: serves the app with several worker processes and threads instead of
+the single-threaded development server of `python app.py` (or `flask --app event_hub_app.app run`).
+
+    python -m event_hub_app.serve                       # SERVER_* settings of the config
+    python -m event_hub_app.serve --workers 4 --threads 16 --bind 0.0.0.0:8000
+    python -m event_hub_app.serve --mode asgi --workers 4
+
+WSGI mode runs gunicorn (gthread workers), waitress (threads of one process) when gunicorn is
+not installed or not supported (Windows), and otherwise werkzeug's threaded server. ASGI mode
+runs uvicorn on event_hub_app.asgi, see there for what it serves asynchronously.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+from .auth.config import get_config
+
+ASGI_TARGET = 'event_hub_app.asgi:application'
+WSGI_SERVERS = ('gunicorn', 'waitress', 'werkzeug')
+
+
+def parse_bind(bind):
+    host, _, port = bind.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def available_wsgi_server(preferred='auto'):
+    """
+    This function will get the WSGI server to run: the preferred one, or with auto the first
+    installed of gunicorn (not on Windows), waitress and werkzeug
+    """
+    if preferred != 'auto':
+        if preferred not in WSGI_SERVERS:
+            raise ValueError(f"unknown WSGI server {preferred!r}, use one of {', '.join(WSGI_SERVERS)}")
+        return preferred
+    if sys.platform != 'win32' and importlib.util.find_spec('gunicorn'):
+        return 'gunicorn'
+    if importlib.util.find_spec('waitress'):
+        return 'waitress'
+    return 'werkzeug'
+
+
+def load_app():
+    from .app import app
+    return app
+
+
+def run_gunicorn(bind, workers, threads, timeout):
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', bind)
+            self.cfg.set('workers', workers)
+            self.cfg.set('threads', threads)
+            self.cfg.set('worker_class', 'gthread' if threads > 1 else 'sync')
+            self.cfg.set('timeout', timeout)
+
+        def load(self):
+            # every worker builds its own app, so no connection is shared across a fork
+            return load_app()
+
+    Application().run()
+
+
+def run_waitress(bind, workers, threads, timeout):
+    import waitress
+
+    if workers > 1:
+        print("waitress runs one process, serving with its threads only", file=sys.stderr)
+    waitress.serve(load_app(), listen=bind, threads=threads, channel_timeout=timeout)
+
+
+def run_werkzeug(bind, workers, threads, timeout):
+    from werkzeug.serving import run_simple
+
+    host, port = parse_bind(bind)
+    print("neither gunicorn nor waitress is installed, falling back to werkzeug's threaded server",
+          file=sys.stderr)
+    run_simple(host, port, load_app(), threaded=True)
+
+
+def run_uvicorn(bind, workers, threads, timeout):
+    try:
+        import uvicorn
+    except ImportError:
+        raise RuntimeError("the ASGI mode needs uvicorn (pip install uvicorn)")
+    from .auth.async_db import require_async_packages
+    from .auth.database import normalize_database_url
+
+    require_async_packages(normalize_database_url(get_config().SQLALCHEMY_DATABASE_URI))
+    host, port = parse_bind(bind)
+    options = {'host': host, 'port': port, 'timeout_keep_alive': timeout, 'log_level': 'warning'}
+    if workers > 1:
+        # worker processes import the app afresh, the variable sizes their pool of synchronous views
+        os.environ['SERVER_THREADS'] = str(threads)
+        uvicorn.run(ASGI_TARGET, workers=workers, **options)
+    else:
+        from .auth.async_api import AsyncEventHub
+        uvicorn.run(AsyncEventHub(load_app(), threads), **options)
+
+
+RUNNERS = {
+    'gunicorn': run_gunicorn,
+    'waitress': run_waitress,
+    'werkzeug': run_werkzeug,
+    'uvicorn': run_uvicorn,
+}
+
+
+def main(argv=None):
+    config = get_config()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=('wsgi', 'asgi'), default=config.SERVER_MODE)
+    parser.add_argument('--server', choices=('auto',) + WSGI_SERVERS, default=config.SERVER_WSGI,
+                        help='WSGI server of the wsgi mode')
+    parser.add_argument('--bind', default=config.SERVER_BIND, help='host:port')
+    parser.add_argument('--workers', type=int, default=config.SERVER_WORKERS, help='processes')
+    parser.add_argument('--threads', type=int, default=config.SERVER_THREADS, help='threads per worker running the synchronous views')
+    parser.add_argument('--timeout', type=int, default=config.SERVER_TIMEOUT, help='seconds')
+    args = parser.parse_args(argv)
+
+    server = 'uvicorn' if args.mode == 'asgi' else available_wsgi_server(args.server)
+    RUNNERS[server](args.bind, args.workers, args.threads, args.timeout)
+
+
+if __name__ == '__main__':
+    main()
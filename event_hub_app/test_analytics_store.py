@@ -0,0 +1,95 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import event, select
+from .app import app
+from .auth.model import Event, DailyRegistrations, DailyRatings, RatingTotals
+from .auth.analytics_store import registration_trend, rating_distribution, top_events, rebuild_store, \
+    record_registrations, record_ratings, delete_event_analytics
+from .auth.participation import register_participant
+from .test_login import create_user
+
+
+def create_event(db, name, organizer_id, date_time):
+    with app.app_context():
+        new_event = Event(name=name, description='d', date_time=date_time, event_duration=60, location='x',
+                          organizer_id=organizer_id)
+        db.session.add(new_event)
+        db.session.commit()
+        return new_event.id
+
+
+def store_rows(db):
+    return (sorted(db.session.execute(select(DailyRegistrations.event_id, DailyRegistrations.registrations)).all()),
+            sorted(db.session.execute(select(DailyRatings.event_id, DailyRatings.rating, DailyRatings.count)).all()),
+            sorted(db.session.execute(select(RatingTotals.rating, RatingTotals.count)).all()))
+
+
+def test_writes_feed_the_store_and_dashboards_skip_source_tables(database):
+    organizer_id = create_user(database, 'host@example.com')
+    past = create_event(database, 'Past', organizer_id, datetime.now() - timedelta(days=2))
+    future = create_event(database, 'Future', organizer_id, datetime.now() + timedelta(days=2))
+    for email in ('a@example.com', 'b@example.com'):
+        user_id = create_user(database, email)
+        # registration for the past event closed when it started
+        with app.app_context():
+            register_participant(user_id, past)
+            database.session.commit()
+        client = app.test_client()
+        client.post('/login', data={'email': email, 'password': '1234'})
+        client.post(f'/register/{future}')
+        client.post(f'/events/feedback/{past}', data={'rating': 5 if email.startswith('a') else 3, 'comment': 'ok'})
+
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = database.engine
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            assert registration_trend(7)[-1] == (date.today(), 4)
+            assert rating_distribution(7) == {1: 0, 2: 0, 3: 1, 4: 0, 5: 1}
+            assert [row.value for row in top_events('rating', 7)] == [4.0]
+            assert {row.name: row.value for row in top_events('participation', 30)} == {'Past': 2, 'Future': 2}
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+        assert not any('feedbacks' in statement or 'event_participant' in statement for statement in statements)
+
+        incremental = store_rows(database)
+        rebuild_store()
+        database.session.commit()
+        assert store_rows(database) == incremental
+
+    client = app.test_client()
+    client.post('/login', data={'email': 'host@example.com', 'password': '1234'})
+    response = client.get('/dashboard/organizer?days=7')
+    assert response.status_code == 200
+    assert b'Average rating:</strong> 4.00' in response.data
+
+
+def test_trend_keeps_registrations_counted_on_later_days(database):
+    organizer_id = create_user(database, 'host@example.com')
+    future = create_event(database, 'Future', organizer_id, datetime.now() + timedelta(days=5))
+    with app.app_context():
+        # a backfill without registration times counts them on the event's day
+        record_registrations({future: 3}, datetime.now() + timedelta(days=5))
+        database.session.commit()
+        trend = registration_trend(0)
+        assert trend[-1] == (date.today() + timedelta(days=5), 3)
+        assert sum(count for _, count in trend) == top_events('participation')[0].value == 3
+
+
+def test_all_time_distribution_reads_the_totals(database):
+    organizer_id = create_user(database, 'host@example.com')
+    kept = create_event(database, 'Kept', organizer_id, datetime.now() - timedelta(days=2))
+    deleted = create_event(database, 'Deleted', organizer_id, datetime.now() - timedelta(days=1))
+    with app.app_context():
+        record_ratings({(kept, 5): 2, (deleted, 5): 1, (deleted, 1): 1})
+        database.session.commit()
+        assert rating_distribution() == {1: 1, 2: 0, 3: 0, 4: 0, 5: 3}
+        assert rating_distribution(event_id=kept) == {1: 0, 2: 0, 3: 0, 4: 0, 5: 2}
+
+        # a deleted event's ratings leave the totals with its histogram rows
+        delete_event_analytics(deleted)
+        database.session.commit()
+        assert rating_distribution() == rating_distribution(7) == {1: 0, 2: 0, 3: 0, 4: 0, 5: 2}
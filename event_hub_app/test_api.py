@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+from .app import app
+from .test_login import create_user
+from .test_analytics_store import create_event
+
+
+def test_events_api_fields_pagination_and_conditional_get(database):
+    organizer_id = create_user(database, 'host@example.com')
+    create_user(database, 'guest@example.com')
+    event_ids = [create_event(database, f'Event {i}', organizer_id, datetime.now() + timedelta(days=i + 1))
+                 for i in range(3)]
+    client = app.test_client()
+    assert client.get('/api/v1/events').status_code == 401
+    client.post('/login', data={'email': 'guest@example.com', 'password': '1234'})
+
+    response = client.get('/api/v1/events?fields=name,participant_count&page_size=2')
+    body = response.get_json()
+    assert body['data'] == [{'name': 'Event 0', 'participant_count': 0}, {'name': 'Event 1', 'participant_count': 0}]
+    next_page = client.get(f"/api/v1/events?fields=name&page_size=2&cursor={body['next_cursor']}").get_json()
+    assert next_page == {'data': [{'name': 'Event 2'}], 'next_cursor': None}
+    assert client.get('/api/v1/events?fields=password').status_code == 400
+
+    detail = client.get(f'/api/v1/events/{event_ids[0]}')
+    assert detail.get_json()['data']['name'] == 'Event 0' and detail.last_modified is not None
+    assert client.get(f'/api/v1/events/{event_ids[0]}', headers={'If-None-Match': detail.headers['ETag']}) \
+        .status_code == 304
+    assert client.get(f'/api/v1/events/{event_ids[0]}',
+                      headers={'If-Modified-Since': detail.headers['Last-Modified']}).status_code == 304
+    listing = client.get('/api/v1/events?page_size=2')
+    assert client.get('/api/v1/events?page_size=2', headers={'If-None-Match': listing.headers['ETag']}) \
+        .status_code == 304
+
+    # registering updates the event's counters and so its updated_at
+    assert client.post(f'/api/v1/events/{event_ids[0]}/registrations').status_code == 201
+    changed = client.get(f'/api/v1/events/{event_ids[0]}', headers={'If-None-Match': detail.headers['ETag']})
+    assert changed.status_code == 200 and changed.get_json()['data']['participant_count'] == 1
+    assert client.get('/api/v1/events?page_size=2', headers={'If-None-Match': listing.headers['ETag']}) \
+        .status_code == 200
+    assert [event['name'] for event in client.get('/api/v1/me/registrations').get_json()['data']] == ['Event 0']
+
+    stats = client.get('/api/v1/stats?days=7')
+    assert stats.get_json()['data']['top_by_participation'][0]['name'] == 'Event 0'
+    assert client.get('/api/v1/stats?days=7', headers={'If-None-Match': stats.headers['ETag']}).status_code == 304
+    assert client.get('/api/v1/events/missing').get_json()['error'] == 'Not Found'
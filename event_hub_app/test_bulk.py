@@ -0,0 +1,119 @@
+import io
+import json
+from .app import app
+from datetime import datetime, timedelta
+from .auth.model import User, Event, Feedback, NotificationJob, WaitlistEntry
+from .auth.notifications import PROMOTED, REGISTERED, REMINDER, WAITLISTED
+from .auth.participation import register_participant
+from .auth.bulk import iter_records, import_events, import_registrations, import_feedback
+from .test_login import create_user
+from .test_analytics_store import create_event
+from .test_registration import set_capacity
+
+
+def test_json_array_is_streamed_across_chunks():
+    records = [{'name': f'event {i}', 'comment': 'x' * 50} for i in range(20)]
+    stream = io.StringIO(json.dumps(records))
+    parsed = list(iter_records(stream, 'json'))
+    assert parsed == records
+
+
+def test_bulk_import_skips_duplicates_and_updates_counters(database):
+    organizer_id = create_user(database, 'organizer@example.com')
+    attendee_id = create_user(database, 'attendee@example.com')
+    events_csv = io.StringIO(
+        "name,description,date_time,duration,location,organizer_email\n"
+        "Keynote,Opening,2024-05-01T09:00,60,Hall A,organizer@example.com\n"
+        "Keynote,Again,2024-05-01T09:00,60,Hall A,organizer@example.com\n"
+        "Workshop,Hands on,2024-05-01T11:00,90,Room 1,organizer@example.com\n"
+        "Broken,Bad date,tomorrow,90,Room 1,organizer@example.com\n"
+    )
+    with app.app_context():
+        summary = import_events(iter_records(events_csv, 'csv'), batch_size=2)
+        assert (summary.inserted, summary.duplicates, len(summary.errors)) == (2, 1, 1)
+        keynote = Event.query.filter_by(name='Keynote').first()
+        assert keynote.organizer_id == organizer_id and keynote.end_time is not None
+
+        registrations = [{'event_id': keynote.id, 'user_email': 'attendee@example.com'}] * 2
+        summary = import_registrations(registrations)
+        assert (summary.inserted, summary.duplicates) == (1, 1)
+
+        feedback = [{'event_id': keynote.id, 'user_id': attendee_id, 'rating': '4', 'comment': 'good'}]
+        assert import_feedback(feedback).inserted == 1
+        assert import_feedback(feedback).duplicates == 1
+
+        database.session.expire_all()
+        keynote = database.session.get(Event, keynote.id)
+        assert keynote.participant_count == 1
+        assert (keynote.rating_sum, keynote.rating_count) == (4, 1)
+        assert Feedback.query.count() == 1
+
+
+def test_attendee_export_is_limited_to_the_organizer(database):
+    create_user(database, 'owner@example.com')
+    create_user(database, 'guest@example.com')
+    client = app.test_client()
+    client.post('/login', data={'email': 'owner@example.com', 'password': '1234'})
+    upload = '{"name": "Meetup", "description": "Monthly", "date_time": "2024-06-01 18:00", "duration": 120}\n'
+    response = client.post('/bulk/import/events', data={'file': (io.BytesIO(upload.encode()), 'events.ndjson')})
+    assert response.get_json()['inserted'] == 1
+
+    with app.app_context():
+        event_id = Event.query.filter_by(name='Meetup').first().id
+        guest_id = User.query.filter_by(email='guest@example.com').first().id
+    registrations = f'event_id,user_id\n{event_id},{guest_id}\n'
+    response = client.post('/bulk/import/registrations',
+                           data={'file': (io.BytesIO(registrations.encode()), 'registrations.csv')})
+    assert response.get_json()['inserted'] == 1
+
+    response = client.get(f'/event/{event_id}/attendees.csv')
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).splitlines()[1].startswith(f'{guest_id},guest,guest@example.com')
+
+    other = app.test_client()
+    other.post('/login', data={'email': 'guest@example.com', 'password': '1234'})
+    assert other.get(f'/event/{event_id}/attendees.csv').status_code == 404
+
+
+def test_registration_import_respects_capacity_and_waitlist(database):
+    organizer_id = create_user(database, 'organizer@example.com')
+    user_ids = [create_user(database, f'user{i}@example.com') for i in range(6)]
+    event_id = create_event(database, 'Small room', organizer_id, datetime.now() + timedelta(days=3))
+    set_capacity(database, event_id, 3)
+    with app.app_context():
+        # one seat is taken from the site and the first importee is already waiting for one
+        register_participant(user_ids[5], event_id)
+        database.session.add(WaitlistEntry(event_id=event_id, user_id=user_ids[0]))
+        database.session.commit()
+
+        summary = import_registrations([{'event_id': event_id, 'user_id': user_id} for user_id in user_ids[:5]],
+                                       batch_size=3)
+        assert (summary.inserted, summary.waitlisted, summary.duplicates) == (2, 3, 0)
+        database.session.expire_all()
+        assert database.session.get(Event, event_id).participant_count == 3
+        waiting = [entry.user_id for entry in WaitlistEntry.query.order_by(WaitlistEntry.id)]
+        assert waiting == user_ids[2:5]
+
+        # importees are notified and reminded like users registering from the site, the one who
+        # was waiting like a user promoted from the waitlist
+        def notified(kind):
+            return sorted(job.user_id for job in NotificationJob.query.filter_by(kind=kind))
+        assert notified(REGISTERED) == sorted([user_ids[5], user_ids[1]])
+        assert notified(PROMOTED) == [user_ids[0]]
+        assert notified(REMINDER) == sorted([user_ids[5]] + user_ids[:2])
+        assert notified(WAITLISTED) == sorted(user_ids[2:5])
+
+
+def test_unreadable_upload_reports_what_was_committed(database):
+    create_user(database, 'owner@example.com')
+    client = app.test_client()
+    client.post('/login', data={'email': 'owner@example.com', 'password': '1234'})
+    lines = [json.dumps({'name': f'Meetup {i}', 'description': 'Monthly', 'date_time': '2024-06-01 18:00',
+                         'duration': 60}) for i in range(3)] + ['{"name": "cut off']
+    response = client.post('/bulk/import/events',
+                           data={'file': (io.BytesIO('\n'.join(lines).encode()), 'events.ndjson')})
+    assert response.status_code == 400
+    summary = response.get_json()
+    assert summary['inserted'] == 3 and summary['read_error']['record'] == 4
+    with app.app_context():
+        assert Event.query.count() == 3
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from .app import app
+from .auth.model import Feedback, User
+from .auth.cache import MISSING, MemoryCache, FileSystemCache, get_cache_stats, reset_cache_stats
+from .test_login import create_user
+from .test_analytics_store import create_event
+
+
+def test_backends_expire_and_evict(tmp_path):
+    memory = MemoryCache(max_entries=2)
+    memory.set('a', 1, None)
+    memory.set('b', None, None)
+    memory.get_many(['a'])
+    memory.set('c', 3, None)
+    assert memory.get_many(['a', 'b', 'c']) == [1, MISSING, 3]
+    memory.set('d', 4, -1)
+    assert memory.get_many(['d']) == [MISSING]
+
+    files = FileSystemCache(str(tmp_path), max_entries=10)
+    files.set('key', {'rows': [1, 2]}, 60)
+    files.set('old', 'value', -1)
+    assert files.get_many(['key', 'old', 'missing']) == [{'rows': [1, 2]}, MISSING, MISSING]
+
+
+def test_pages_are_served_from_cache_until_a_write_commits(database):
+    reset_cache_stats()
+    organizer_id = create_user(database, 'host@example.com')
+    create_user(database, 'guest@example.com')
+    event_id = create_event(database, 'Cached event', organizer_id, datetime.now() + timedelta(days=1))
+    guest = app.test_client()
+    guest.post('/login', data={'email': 'guest@example.com', 'password': '1234'})
+
+    assert b'Registered:</strong> 0' in guest.get(f'/event_details/{event_id}').data
+    assert b'Registered:</strong> 0' in guest.get(f'/event_details/{event_id}').data
+    assert get_cache_stats()['event'].hits == 1
+
+    guest.post(f'/register/{event_id}')
+    assert b'Registered:</strong> 1' in guest.get(f'/event_details/{event_id}').data
+
+    assert b'Cached event' in guest.get('/all_events').data
+    host = app.test_client()
+    host.post('/login', data={'email': 'host@example.com', 'password': '1234'})
+    host.post(f'/event/update/{event_id}', data={'name': 'Renamed event', 'description': 'd',
+                                                 'date_time': '2099-01-01 10:00:00', 'duration': 60, 'location': 'x'})
+    assert b'Renamed event' in guest.get('/all_events').data
+
+    listing = get_cache_stats()['listing']
+    assert (listing.hits, listing.misses) == (0, 2)
+    assert b'eventhub_cache_hits_total{namespace="event"}' in guest.get('/metrics').data
+
+
+def test_dashboard_validators_are_per_user(database):
+    create_user(database, 'guest@example.com')
+    anonymous = app.test_client().get('/dashboard')
+    assert anonymous.status_code == 200
+    assert 'private' in anonymous.headers['Cache-Control'] and 'Cookie' in anonymous.headers['Vary']
+
+    guest = app.test_client()
+    guest.post('/login', data={'email': 'guest@example.com', 'password': '1234'})
+    # the anonymous copy does not validate a logged-in user's page, its navigation differs
+    response = guest.get('/dashboard', headers={'If-None-Match': anonymous.headers['ETag']})
+    assert response.status_code == 200
+    assert guest.get('/dashboard', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+
+def test_renamed_users_leave_the_event_pages(database):
+    organizer_id = create_user(database, 'host@example.com')
+    reviewer_id = create_user(database, 'reviewer@example.com')
+    event_id = create_event(database, 'Reviewed event', organizer_id, datetime.now() - timedelta(days=1))
+    with app.app_context():
+        database.session.add(Feedback(event_id, reviewer_id, 4, 'nice'))
+        database.session.commit()
+    client = app.test_client()
+    client.post('/login', data={'email': 'reviewer@example.com', 'password': '1234'})
+    feedback_url = f'/event_details/{event_id}/event-feedbacks'
+    assert b'User: reviewer' in client.get(feedback_url).data
+    assert b'Organizer:</strong> host' in client.get(f'/event_details/{event_id}').data
+
+    with app.app_context():
+        database.session.get(User, reviewer_id).username = 'renamed reviewer'
+        database.session.get(User, organizer_id).username = 'renamed host'
+        database.session.commit()
+    assert b'renamed reviewer' in client.get(feedback_url).data
+    assert b'renamed host' in client.get(f'/event_details/{event_id}').data
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+from .app import app
+from .auth.model import Event
+from .auth.participation import register_participant
+from .auth.calendar_feed import calendar_token, find_overlaps, fold
+from .test_login import create_user
+from .test_analytics_store import create_event
+
+
+def login(email):
+    client = app.test_client()
+    client.post('/login', data={'email': email, 'password': '1234'})
+    return client
+
+
+def set_duration(db, event_id, duration):
+    with app.app_context():
+        db.session.get(Event, event_id).duration = duration
+        db.session.commit()
+
+
+def test_range_returns_overlapping_events_and_registration_conflicts(database):
+    user_id = create_user(database, 'attendee@example.com')
+    day = datetime(2099, 3, 10)
+    # a three-day conference starting before the window still overlaps it
+    conference = create_event(database, 'Conference', user_id, day - timedelta(days=2))
+    set_duration(database, conference, 3 * 24 * 60)
+    morning = create_event(database, 'Morning talk', user_id, day + timedelta(hours=9))
+    brunch = create_event(database, 'Brunch', user_id, day + timedelta(hours=9, minutes=30))
+    evening = create_event(database, 'Evening talk', user_id, day + timedelta(hours=18))
+    create_event(database, 'Before', user_id, day - timedelta(days=5))
+    create_event(database, 'After', user_id, day + timedelta(days=1, hours=1))
+    with app.app_context():
+        for event_id in (morning, brunch, evening):
+            register_participant(user_id, event_id)
+        database.session.commit()
+
+    client = login('attendee@example.com')
+    response = client.get('/events/range?start=2099-03-10T00:00&end=2099-03-11T00:00').get_json()
+    assert [event['name'] for event in response['events']] == ['Conference', 'Morning talk', 'Brunch', 'Evening talk']
+    assert {event['name']: (event['registered'], event['conflict']) for event in response['events']} == {
+        'Conference': (False, False), 'Morning talk': (True, True), 'Brunch': (True, True),
+        'Evening talk': (True, False)}
+    assert response['overlaps'] == [[morning, brunch]]
+
+    # bounds with an offset are converted to the local time events are stored in
+    utc_start = datetime(2099, 3, 10, tzinfo=timezone.utc)
+    response = client.get('/events/range?start=2099-03-10T00:00%2B00:00&end=2099-03-11T00:00').get_json()
+    assert response['start'] == utc_start.astimezone().replace(tzinfo=None).isoformat()
+    assert response['end'] == '2099-03-11T00:00:00'
+
+    assert client.get('/events/range?start=2099-03-10T00:00&end=yesterday').status_code == 400
+    assert client.get('/events/range?start=2099-03-10T00:00&end=2100-03-10T00:00').status_code == 400
+
+
+def test_find_overlaps_pairs_every_overlapping_event():
+    class Row:
+        def __init__(self, id, start, end):
+            self.id, self.date_time, self.end_time = id, datetime(2099, 1, 1, start), datetime(2099, 1, 1, end)
+
+    rows = [Row('a', 9, 12), Row('b', 10, 11), Row('c', 11, 13), Row('d', 13, 14)]
+    assert find_overlaps(rows) == [('a', 'b'), ('a', 'c')]
+
+
+def test_feed_escapes_folds_and_revalidates(database):
+    organizer_id = create_user(database, 'host@example.com')
+    event_id = create_event(database, 'Tea, cake; and \\ more', organizer_id, datetime.now() + timedelta(days=3))
+    with app.app_context():
+        database.session.get(Event, event_id).description = 'line one\nline two ' + 'x' * 100
+        database.session.commit()
+
+    client = app.test_client()
+    response = client.get('/calendar/events.ics')
+    assert response.mimetype == 'text/calendar'
+    body = response.get_data(as_text=True)
+    assert body.startswith('BEGIN:VCALENDAR\r\n') and body.endswith('END:VCALENDAR\r\n')
+    assert 'SUMMARY:Tea\\, cake\\; and \\\\ more\r\n' in body
+    assert 'DESCRIPTION:line one\\nline two xxx' in body and '\r\n xxx' in body
+    assert all(len(line.encode()) <= 75 for line in body.split('\r\n'))
+    assert f'UID:{event_id}@eventhub' in body
+
+    etag = response.headers['ETag']
+    assert client.get('/calendar/events.ics', headers={'If-None-Match': etag}).status_code == 304
+    with app.app_context():
+        database.session.get(Event, event_id).location = 'Garden'
+        database.session.commit()
+    changed = client.get('/calendar/events.ics', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and 'LOCATION:Garden' in changed.get_data(as_text=True)
+
+
+def test_user_feed_lists_registrations_behind_a_signed_token(database):
+    organizer_id = create_user(database, 'host@example.com')
+    user_id = create_user(database, 'attendee@example.com')
+    registered = create_event(database, 'Registered', organizer_id, datetime.now() + timedelta(days=2))
+    create_event(database, 'Other', organizer_id, datetime.now() + timedelta(days=2))
+    with app.app_context():
+        register_participant(user_id, registered)
+        database.session.commit()
+        token = calendar_token(user_id)
+
+    assert token.encode() in login('attendee@example.com').get('/events/events_registered').data
+    response = app.test_client().get(f'/calendar/{token}.ics')
+    body = response.get_data(as_text=True)
+    assert 'SUMMARY:Registered' in body and 'SUMMARY:Other' not in body
+
+    # unregistering changes the feed, its only validator is the ETag
+    assert 'Last-Modified' not in response.headers
+    login('attendee@example.com').post(f'/register/{registered}/cancel')
+    refreshed = app.test_client().get(f'/calendar/{token}.ics',
+                                      headers={'If-None-Match': response.headers['ETag']})
+    assert refreshed.status_code == 200 and 'SUMMARY:Registered' not in refreshed.get_data(as_text=True)
+    assert app.test_client().get(f'/calendar/{token[:-2]}xx.ics').status_code == 404
+
+
+def test_fold_keeps_multibyte_characters_whole():
+    folded = fold('SUMMARY:' + 'é' * 60)
+    assert all(len(line.encode()) <= 75 for line in folded.split('\r\n'))
+    assert folded.replace('\r\n ', '') == 'SUMMARY:' + 'é' * 60
@@ -0,0 +1,46 @@
+from sqlalchemy import create_engine, text
+from .app import app
+from .factory import create_app
+from .auth import db
+from .auth.database import engine_options, normalize_database_url, register_sqlite_pragmas
+from .tools.query_plan_audit import audit
+
+
+def test_sqlite_pragmas_applied(database):
+    with app.app_context():
+        with db.engine.connect() as connection:
+            assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert connection.execute(text('PRAGMA synchronous')).scalar() == 1
+            assert connection.execute(text('PRAGMA busy_timeout')).scalar() == app.config['SQLITE_BUSY_TIMEOUT_MS']
+
+
+def test_pragmas_are_hooked_per_engine():
+    engines = {}
+    for timeout in (1234, 4321):
+        engines[timeout] = create_engine('sqlite://')
+        register_sqlite_pragmas(engines[timeout], dict(app.config, SQLITE_BUSY_TIMEOUT_MS=timeout))
+    for timeout, engine in engines.items():
+        with engine.connect() as connection:
+            assert connection.execute(text('PRAGMA busy_timeout')).scalar() == timeout
+
+    # building more apps adds no listener to the engines of the others
+    listeners = []
+    for _ in range(3):
+        other = create_app('testing')
+        with other.app_context():
+            listeners.append(len(db.engine.pool.dispatch.connect))
+    assert len(set(listeners)) == 1
+
+
+def test_server_database_gets_pool_options():
+    config = dict(app.config, SQLALCHEMY_DATABASE_URI=normalize_database_url('postgres://user@localhost/events'))
+    options = engine_options(config)
+    assert config['SQLALCHEMY_DATABASE_URI'].startswith('postgresql://')
+    assert options['pool_size'] == app.config['DB_POOL_SIZE']
+    assert options['pool_pre_ping'] == True
+
+
+def test_view_queries_use_indexes(database):
+    explained = audit(app, database)
+    assert explained
+    assert [statement for statement in explained if statement.full_scans] == []
@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+from .app import app
+from .auth.bulk import import_registrations, import_feedback
+from .auth.feedback import feedback_page
+from .test_login import create_user
+from .test_analytics_store import create_event
+
+
+def test_feedback_pages_sort_and_summary(database):
+    organizer_id = create_user(database, 'host@example.com')
+    event_id = create_event(database, 'Reviewed', organizer_id, datetime.now() - timedelta(days=1))
+    reviewers = [create_user(database, f'reviewer{i}@example.com') for i in range(5)]
+    with app.app_context():
+        import_registrations([{'event_id': event_id, 'user_id': user_id} for user_id in reviewers])
+        import_feedback([{'event_id': event_id, 'user_id': user_id, 'rating': rating, 'comment': f'c{rating}'}
+                         for user_id, rating in zip(reviewers, [3, 5, 1, 5, 4])])
+
+        seen, cursor = [], None
+        while True:
+            rows, cursor = feedback_page(event_id, 'rating', cursor, page_size=2)
+            seen += [(row.rating, row.username) for row in rows]
+            if cursor is None:
+                break
+        assert seen == [(5, 'reviewer3'), (5, 'reviewer1'), (4, 'reviewer4'), (3, 'reviewer0'), (1, 'reviewer2')]
+        recent, _ = feedback_page(event_id, 'recent', page_size=2)
+        assert [row.username for row in recent] == ['reviewer4', 'reviewer3']
+
+    client = app.test_client()
+    client.post('/login', data={'email': 'host@example.com', 'password': '1234'})
+    page = client.get(f'/event_details/{event_id}/event-feedbacks?sort=rating&page_size=2').get_data(as_text=True)
+    assert 'Average rating:</strong> 3.60 (5 ratings)' in page
+    assert '<tr><td>5</td><td>2</td></tr>' in page
+    assert 'User: reviewer3' in page and 'reviewer4' not in page and 'Next page' in page
+    assert client.get('/event_details/missing/event-feedbacks').status_code == 404
@@ -1,6 +1,6 @@
 from .auth.forms import LoginForm, EventFeedbackForm
 from .auth.model import User
-from .auth import app
+from .app import app
 
 app.config['WTF_CSRF_ENABLED'] = False
 
@@ -0,0 +1,29 @@
+from .app import app
+from .factory import create_app
+from .auth.instrumentation import get_endpoint_stats, reset_endpoint_stats
+
+
+def test_server_timing_header_and_metrics(database):
+    reset_endpoint_stats()
+    client = app.test_client()
+    response = client.get('/register')
+    assert response.headers['Server-Timing'].startswith('db;dur=')
+
+    client.post('/register', data={'email': 'metrics@example.com', 'username': 'metrics', 'phone_number': '1',
+                                   'password': '1234', 'confirm_password': '1234'})
+    stats = get_endpoint_stats()['auth.register']
+    assert stats.requests == 2
+    assert stats.statements >= 2
+
+    metrics = client.get('/metrics').text
+    assert 'eventhub_requests_total{endpoint="auth.register"} 2' in metrics
+    assert 'eventhub_sql_statements_total{endpoint="auth.register"}' in metrics
+
+
+def test_request_answered_before_timing_started_keeps_its_response():
+    other = create_app('testing')
+    # a handler registered ahead of the instrumentation's answers the request itself
+    other.before_request_funcs[None].insert(0, lambda: ('maintenance', 503))
+    response = other.test_client().get('/register')
+    assert (response.status_code, response.text) == (503, 'maintenance')
+    assert 'Server-Timing' not in response.headers
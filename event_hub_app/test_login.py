@@ -0,0 +1,82 @@
+import threading
+import time
+import pytest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from .app import app
+from .auth.model import User
+from .auth import security
+from .auth.security import needs_rehash, hash_password, PasswordHashingBusy
+from .auth.user_cache import clear_user_cache, get_cached_user
+
+
+def create_user(db, email, hashed_password=None):
+    with app.app_context():
+        user = User(username=email.split('@')[0], password='1234', email=email, phone_number='1234567890')
+        if hashed_password:
+            user.hashed_password = hashed_password
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def test_warm_session_loads_user_without_query(database):
+    clear_user_cache()
+    user_id = create_user(database, 'cached@example.com')
+    client = app.test_client()
+    client.post('/login', data={'email': 'cached@example.com', 'password': '1234'})
+    client.get('/welcome')
+
+    user_queries = []
+
+    def listener(conn, cursor, statement, *args):
+        if 'FROM users' in statement:
+            user_queries.append(statement)
+
+    with app.app_context():
+        engine = database.engine
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        response = client.get('/welcome')
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    assert response.status_code == 200
+    assert user_queries == []
+
+    with app.app_context():
+        user = database.session.get(User, user_id)
+        user.phone_number = '0987654321'
+        database.session.commit()
+    assert get_cached_user(user_id) is None
+
+
+def test_outdated_hash_is_upgraded_on_login(database):
+    create_user(database, 'legacy@example.com', generate_password_hash('1234', 'pbkdf2:sha256:500'))
+    client = app.test_client()
+    response = client.post('/login', data={'email': 'legacy@example.com', 'password': '1234'})
+    assert response.status_code == 302
+    with app.app_context():
+        user = User.query.filter_by(email='legacy@example.com').first()
+        assert user.hashed_password.startswith(app.config['PASSWORD_HASH_METHOD'] + '$')
+        assert user.check_password('1234')
+
+
+def test_short_method_settings_match_their_stored_form(monkeypatch):
+    with app.app_context():
+        for method, salt_length in (('scrypt', 16), ('pbkdf2:sha256', 16)):
+            monkeypatch.setitem(app.config, 'PASSWORD_HASH_METHOD', method)
+            monkeypatch.setitem(app.config, 'PASSWORD_SALT_LENGTH', salt_length)
+            assert not needs_rehash(generate_password_hash('1234', method, salt_length))
+        assert needs_rehash(generate_password_hash('1234', 'pbkdf2:sha256:1000', 16))
+
+
+def test_full_hashing_queue_fails_without_waiting(monkeypatch):
+    with app.app_context():
+        security._hashing_pool()
+        full = threading.BoundedSemaphore(1)
+        full.acquire()
+        monkeypatch.setattr(security, '_slots', full)
+        started = time.perf_counter()
+        with pytest.raises(PasswordHashingBusy):
+            hash_password('1234')
+        assert time.perf_counter() - started < 1
@@ -0,0 +1,85 @@
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from .app import app
+from .auth.model import Event, NotificationJob
+from .auth.notifications import FileSink, process_due_jobs, REMINDER, FAILED
+from .test_login import create_user
+from .test_analytics_store import create_event
+
+
+class BrokenSink:
+    def send(self, messages):
+        raise ConnectionRefusedError("smtp is down")
+
+
+def deliver(db, sink, now=None):
+    with app.app_context():
+        return process_due_jobs(sink, batch_size=100, now=now)
+
+
+def outbox(sink):
+    with open(sink.path, encoding='utf-8') as lines:
+        return [(message['to'], message['kind']) for message in map(json.loads, lines)]
+
+
+def test_writes_queue_notifications_for_the_worker(database, tmp_path):
+    organizer_id = create_user(database, 'host@example.com')
+    start = datetime.now().replace(microsecond=0) + timedelta(days=3)
+    event_id = create_event(database, 'Meetup', organizer_id, start)
+    with app.app_context():
+        database.session.get(Event, event_id).capacity = 1
+        database.session.commit()
+    clients = {}
+    for name in ('first', 'second'):
+        create_user(database, f'{name}@example.com')
+        clients[name] = app.test_client()
+        clients[name].post('/login', data={'email': f'{name}@example.com', 'password': '1234'})
+        clients[name].post(f'/register/{event_id}')
+    host = app.test_client()
+    host.post('/login', data={'email': 'host@example.com', 'password': '1234'})
+    update = {'name': 'Meetup', 'description': 'd', 'duration': 60, 'location': 'x', 'capacity': 1,
+              'date_time': start.strftime('%Y-%m-%d %H:%M:%S')}
+    host.post(f'/event/update/{event_id}', data=update)  # nothing changed, nobody is told
+    clients['first'].post(f'/register/{event_id}/cancel')
+
+    sink = FileSink(str(tmp_path))
+    assert deliver(database, sink) == (3, 0)  # the second user's reminder is not due yet
+    assert outbox(sink) == [('first@example.com', 'registered'), ('second@example.com', 'waitlisted'),
+                            ('second@example.com', 'promoted')]
+
+    # the second user's reminder follows the new start time and is due a day before it
+    later = start + timedelta(hours=1)
+    host.post(f'/event/update/{event_id}', data=dict(update, date_time=later.strftime('%Y-%m-%d %H:%M:%S')))
+    with app.app_context():
+        reminder = database.session.execute(select(NotificationJob.run_at)
+                                            .where(NotificationJob.kind == REMINDER)).scalar_one()
+    assert reminder == later - timedelta(days=1)
+    deliver(database, sink, now=reminder)
+    assert sorted(outbox(sink)[3:]) == [('second@example.com', 'event_updated'), ('second@example.com', 'reminder')]
+
+    host.post(f'/event/delete/{event_id}')
+    deliver(database, sink)
+    assert outbox(sink)[5:] == [('second@example.com', 'event_deleted')]
+
+
+def test_failed_deliveries_back_off_then_fail(database, tmp_path):
+    organizer_id = create_user(database, 'host@example.com')
+    event_id = create_event(database, 'Meetup', organizer_id, datetime.now() + timedelta(hours=2))
+    create_user(database, 'guest@example.com')
+    guest = app.test_client()
+    guest.post('/login', data={'email': 'guest@example.com', 'password': '1234'})
+    guest.post(f'/register/{event_id}')
+
+    now = datetime.now()
+    assert deliver(database, BrokenSink(), now) == (0, 2)
+    with app.app_context():
+        jobs = database.session.execute(select(NotificationJob)).scalars().all()
+        assert {(job.attempts, job.run_at - now) for job in jobs} == {(1, timedelta(seconds=30))}
+        assert jobs[0].last_error == 'ConnectionRefusedError: smtp is down'
+    for attempt in range(4):
+        now += timedelta(hours=1)
+        deliver(database, BrokenSink(), now)
+    with app.app_context():
+        assert {job.status for job in database.session.execute(select(NotificationJob)).scalars()} == {FAILED}
+    assert deliver(database, FileSink(str(tmp_path)), now + timedelta(days=1)) == (0, 0)
@@ -0,0 +1,113 @@
+import sqlite3
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from .app import app
+from .auth import recommendations
+from .auth.model import EventRecommendation, Feedback
+from .auth.participation import register_participant
+from .auth.recommendations import rebuild_recommendations, recommended_events
+from .test_login import create_user
+from .test_analytics_store import create_event
+
+
+def login(email):
+    client = app.test_client()
+    client.post('/login', data={'email': email, 'password': '1234'})
+    return client
+
+
+def create_history(db):
+    """
+    This function will create two past events the user rated, each co-attended with one
+    upcoming event, plus an upcoming event the user registered for and one the user organizes
+    """
+    user_id = create_user(db, 'me@example.com')
+    organizer_id = create_user(db, 'organizer@example.com')
+    fans = [create_user(db, f'fan{i}@example.com') for i in range(2)]
+    now = datetime.now()
+    events = {name: create_event(db, name, organizer_id, now + timedelta(days=offset))
+              for name, offset in (('Loved', -20), ('Disliked', -10), ('Jazz night', 5), ('Quiz', 6),
+                                   ('Registered', 7))}
+    events['Own'] = create_event(db, 'Own', user_id, now + timedelta(days=8))
+    with app.app_context():
+        for fan, names in ((fans[0], ('Loved', 'Jazz night', 'Registered', 'Own')), (fans[1], ('Disliked', 'Quiz'))):
+            for name in names:
+                register_participant(fan, events[name])
+        for name in ('Loved', 'Disliked', 'Registered'):
+            register_participant(user_id, events[name])
+        db.session.add(Feedback(events['Loved'], user_id, 5, 'great'))
+        db.session.add(Feedback(events['Disliked'], user_id, 1, 'meh'))
+        db.session.commit()
+    return user_id, organizer_id, events
+
+
+def recommended_names(user_id):
+    return [event.name for event in recommended_events(user_id)]
+
+
+def test_recommendations_follow_co_attendance_and_ratings(database, monkeypatch):
+    user_id, _, events = create_history(database)
+    with app.app_context():
+        summary = rebuild_recommendations()
+        database.session.commit()
+        # the event co-attended with the one rated 5 comes first; registered and own events are left out
+        assert recommended_names(user_id) == ['Jazz night', 'Quiz']
+        assert summary['recommendations'] == database.session.query(EventRecommendation).count()
+        stored = database.session.execute(select(EventRecommendation.event_id, EventRecommendation.score)
+                                          .where(EventRecommendation.user_id == user_id)
+                                          .order_by(EventRecommendation.rank)).all()
+
+        # the numpy path gives the same scores however the users are chunked and written
+        monkeypatch.setattr(recommendations, 'PAIRS_PER_CHUNK', 1)
+        monkeypatch.setattr(recommendations, 'INSERT_BATCH', 1)
+        rebuild_recommendations()
+        rechunked = database.session.execute(select(EventRecommendation.event_id, EventRecommendation.score)
+                                             .where(EventRecommendation.user_id == user_id)
+                                             .order_by(EventRecommendation.rank)).all()
+        assert [event_id for event_id, _ in rechunked] == [event_id for event_id, _ in stored]
+        assert [round(score, 9) for _, score in rechunked] == [round(score, 9) for _, score in stored]
+
+        # registering since the last run hides the event at once
+        register_participant(user_id, events['Jazz night'])
+        database.session.commit()
+        assert recommended_names(user_id) == ['Quiz']
+
+
+def test_recommendations_are_shown_and_deleted_with_their_event(database):
+    user_id, _, events = create_history(database)
+    with app.app_context():
+        rebuild_recommendations()
+        database.session.commit()
+
+    client = login('me@example.com')
+    assert b'Events you may like' in client.get('/welcome').data
+    page = client.get(f"/event_details/{events['Jazz night']}").data.decode()
+    assert page.count('Jazz night') == 1 and 'Quiz' in page
+
+    organizer = login('organizer@example.com')
+    organizer.post(f"/event/delete/{events['Quiz']}")
+    with app.app_context():
+        assert database.session.query(EventRecommendation).filter_by(event_id=events['Quiz']).count() == 0
+        assert recommended_names(user_id) == ['Jazz night']
+
+
+def test_writes_go_through_during_a_rebuild(database, monkeypatch):
+    user_id, _, _ = create_history(database)
+    with app.app_context():
+        path = database.engine.url.database
+    score_users = recommendations.score_users
+    writes = []
+
+    def score_and_write(*args):
+        for scored in score_users(*args):
+            # a request writing meanwhile does not wait for the rebuild
+            with sqlite3.connect(path, timeout=0) as connection:
+                connection.execute('BEGIN IMMEDIATE')
+                connection.execute('UPDATE users SET username = ? WHERE id = ?', ('renamed', user_id))
+            writes.append(user_id)
+            yield scored
+
+    monkeypatch.setattr(recommendations, 'score_users', score_and_write)
+    with app.app_context():
+        rebuild_recommendations()
+        assert writes and recommended_names(user_id) == ['Jazz night', 'Quiz']
@@ -0,0 +1,109 @@
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select
+from .app import app
+from .auth.model import Event, User, WaitlistEntry, event_participant
+from .auth.participation import register_participant, cancel_registration, REGISTERED, WAITLISTED
+from .test_login import create_user
+from .test_analytics_store import create_event
+
+
+def create_users(db, count):
+    with app.app_context():
+        rows = [{'id': f'user-{i}', 'username': f'user{i}', 'email': f'user{i}@example.com',
+                 'phone_number': '0', 'hashed_password': 'x'} for i in range(count)]
+        db.session.execute(insert(User), rows)
+        db.session.commit()
+        return [row['id'] for row in rows]
+
+
+def set_capacity(db, event_id, capacity):
+    with app.app_context():
+        db.session.get(Event, event_id).capacity = capacity
+        db.session.commit()
+
+
+def seats(db, event_id):
+    with app.app_context():
+        registered = db.session.execute(select(func.count()).select_from(event_participant)
+                                        .where(event_participant.c.event_id == event_id)).scalar()
+        waiting = db.session.execute(select(WaitlistEntry.user_id).where(WaitlistEntry.event_id == event_id)
+                                     .order_by(WaitlistEntry.id)).scalars().all()
+        return db.session.get(Event, event_id).participant_count, registered, waiting
+
+
+def test_concurrent_registrations_never_overbook(database):
+    organizer_id = create_user(database, 'host@example.com')
+    event_id = create_event(database, 'Popular', organizer_id, datetime.now() + timedelta(days=1))
+    set_capacity(database, event_id, 25)
+    # every user tries twice, so duplicates race each other as well as the last seats
+    user_ids = create_users(database, 150) * 2
+    start = threading.Barrier(len(user_ids))
+    outcomes, errors = [], []
+
+    def register(user_id):
+        start.wait()
+        try:
+            with app.app_context():
+                outcome = register_participant(user_id, event_id)
+                database.session.commit()
+                outcomes.append(outcome)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=register, args=(user_id,)) for user_id in user_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert outcomes.count(REGISTERED) == 25 and outcomes.count(WAITLISTED) == 125
+    participant_count, registered, waiting = seats(database, event_id)
+    assert participant_count == registered == 25
+    assert len(waiting) == len(set(waiting)) == 125
+
+
+def test_cancellation_promotes_the_waitlist(database):
+    organizer_id = create_user(database, 'host@example.com')
+    event_id = create_event(database, 'Small', organizer_id, datetime.now() + timedelta(days=1))
+    set_capacity(database, event_id, 1)
+    first, second, third = create_users(database, 3)
+    with app.app_context():
+        assert [register_participant(user_id, event_id) for user_id in (first, second, third)] == \
+            [REGISTERED, WAITLISTED, WAITLISTED]
+        database.session.commit()
+        cancel_registration(first, event_id)
+        database.session.commit()
+    assert seats(database, event_id) == (1, 1, [third])
+
+    create_user(database, 'guest@example.com')
+    guest = app.test_client()
+    guest.post('/login', data={'email': 'guest@example.com', 'password': '1234'})
+    assert b'Join the waitlist' in guest.get(f'/event_details/{event_id}').data
+    guest.post(f'/register/{event_id}')
+    assert b'On the waitlist' in guest.get(f'/event_details/{event_id}').data
+
+    host = app.test_client()
+    host.post('/login', data={'email': 'host@example.com', 'password': '1234'})
+    host.post(f'/event/update/{event_id}', data={'name': 'Small', 'description': 'd', 'date_time': '2099-01-01 10:00:00',
+                                                 'duration': 60, 'location': 'x', 'capacity': 3})
+    assert seats(database, event_id)[:2] == (3, 3)
+    guest.post(f'/register/{event_id}/cancel')
+    assert b'Registered:</strong> 2' in guest.get(f'/event_details/{event_id}').data
+
+
+def test_pages_refuse_registrations_the_api_refuses(database):
+    organizer_id = create_user(database, 'host@example.com')
+    create_user(database, 'guest@example.com')
+    own = create_event(database, 'Own', organizer_id, datetime.now() + timedelta(days=1))
+    started = create_event(database, 'Started', organizer_id, datetime.now() - timedelta(hours=1))
+    host, guest = app.test_client(), app.test_client()
+    host.post('/login', data={'email': 'host@example.com', 'password': '1234'})
+    guest.post('/login', data={'email': 'guest@example.com', 'password': '1234'})
+
+    for client, event_id in ((host, own), (guest, started)):
+        assert client.post(f'/api/v1/events/{event_id}/registrations').status_code == 409
+        response = client.post(f'/register/{event_id}')
+        assert response.location.endswith(f'/event_details/{event_id}')
+        assert seats(database, event_id) == (0, 0, [])
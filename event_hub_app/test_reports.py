@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+import pytest
+from .app import app
+from .auth.bulk import import_registrations, import_feedback
+from .auth.reports import load_frames, save_snapshot, load_snapshot, event_statistics, organizer_statistics
+from .test_login import create_user
+from .test_analytics_store import create_event
+
+
+@pytest.fixture
+def frames(database):
+    organizer_id = create_user(database, 'host@example.com')
+    past = create_event(database, 'Past', organizer_id, datetime.now() - timedelta(days=3))
+    future = create_event(database, 'Future', organizer_id, datetime.now() + timedelta(days=3))
+    user_ids = [create_user(database, f'guest{i}@example.com') for i in range(4)]
+    with app.app_context():
+        import_registrations([{'event_id': past, 'user_id': user_id} for user_id in user_ids] +
+                             [{'event_id': future, 'user_id': user_ids[0]}])
+        import_feedback([{'event_id': past, 'user_id': user_ids[0], 'rating': 5},
+                         {'event_id': past, 'user_id': user_ids[1], 'rating': 4}])
+        with database.engine.connect() as connection:
+            yield load_frames(connection), past, future
+
+
+def test_event_and_organizer_statistics(frames):
+    frames, past, future = frames
+    assert str(frames['feedbacks']['rating'].dtype) == 'int8'
+    assert str(frames['participants']['event_id'].dtype) == 'category'
+
+    with app.app_context():
+        stats = event_statistics(frames, prior_weight=2)
+        organizers = organizer_statistics(stats, prior_weight=2)
+    assert stats.loc[past, 'participants'] == 4
+    assert stats.loc[past, 'rating_median'] == 4.5
+    # two virtual votes at the overall mean of 4.5 leave a 4.5 average unchanged
+    assert stats.loc[past, 'bayesian_rating'] == pytest.approx(4.5)
+    assert stats.loc[future, 'bayesian_rating'] == pytest.approx(4.5)
+    assert stats.loc[past, 'estimated_no_shows'] == 2 and stats.loc[past, 'no_show_rate'] == 0.5
+    assert stats.loc[future, 'estimated_no_shows'] == 0
+    assert organizers['events'].iloc[0] == 2 and organizers['no_show_rate'].iloc[0] == 0.5
+
+
+def test_snapshot_round_trip(frames, tmp_path):
+    frames, past, future = frames
+    save_snapshot(frames, str(tmp_path), 'pickle')
+    loaded = load_snapshot(str(tmp_path), 'pickle')
+    for name, frame in frames.items():
+        assert loaded[name].equals(frame)
+        assert (loaded[name].dtypes == frame.dtypes).all()
+    assert load_snapshot(str(tmp_path), 'feather') is None
@@ -0,0 +1,54 @@
+from datetime import date, datetime
+from .app import app
+from .auth.model import Event
+from .auth.search import search_events, match_expression
+from .test_login import create_user
+
+
+def add_events(db, organizer_id, *rows):
+    with app.app_context():
+        db.session.add_all(Event(name, description, date_time, 60, location, organizer_id)
+                           for name, description, date_time, location in rows)
+        db.session.commit()
+
+
+def names(rows):
+    return [row.name for row in rows]
+
+
+def test_match_expression_keeps_only_words():
+    assert match_expression('py" OR *', 'São Paulo') == '"py"* AND "OR"* AND location : ("São"* "Paulo"*)'
+
+
+def test_search_ranks_filters_and_stays_in_sync(database):
+    organizer_id = create_user(database, 'host@example.com')
+    add_events(database, organizer_id,
+               ('Python meetup', 'Talks about packaging', datetime(2024, 5, 1, 18), 'Berlin'),
+               ('Data night', 'Python and pandas', datetime(2024, 6, 1, 18), 'Paris'),
+               ('Rust meetup', 'Ownership deep dive', datetime(2024, 7, 1, 18), 'Berlin'))
+    with app.test_request_context():
+        rows, next_cursor = search_events('pyth')
+        assert names(rows) == ['Python meetup', 'Data night'] and next_cursor is None
+
+        first, cursor = search_events('meet', page_size=1)
+        second, last_cursor = search_events('meet', cursor=cursor, page_size=1)
+        assert len(first) == len(second) == 1 and last_cursor is None
+        assert {first[0].name, second[0].name} == {'Python meetup', 'Rust meetup'}
+
+        assert names(search_events('meetup', location='ber', date_from=date(2024, 6, 15))[0]) == ['Rust meetup']
+        assert names(search_events('', location='paris')[0]) == ['Data night']
+
+        rust = Event.query.filter_by(name='Rust meetup').first()
+        rust.description = 'Python bindings with PyO3'
+        rust.participant_count = 10
+        database.session.commit()
+        assert 'Rust meetup' in names(search_events('pyo3')[0])
+
+        database.session.delete(rust)
+        database.session.commit()
+        assert search_events('rust')[0] == []
+
+    client = app.test_client()
+    client.post('/login', data={'email': 'host@example.com', 'password': '1234'})
+    response = client.get('/events/search?q=data&date_to=2024-06-01')
+    assert response.status_code == 200 and b'Data night' in response.data
@@ -0,0 +1,113 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import delete, event
+from .app import app
+from .auth.model import User
+from .auth.participation import register_participant
+from .serve import available_wsgi_server, parse_bind
+from .test_login import create_user
+from .test_analytics_store import create_event
+
+
+def asgi_get(application, path, headers=(), messages=None):
+    """
+    This function will send one GET through the ASGI app and get (status, headers, body)
+    """
+    path, _, query = path.partition('?')
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+             'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+             'root_path': '', 'server': ('localhost', 80), 'client': ('127.0.0.1', 5000),
+             'headers': [(name.lower().encode(), value.encode()) for name, value in headers]}
+    messages = [] if messages is None else messages
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        await application(scope, receive, send)
+        await application.dispose()
+
+    asyncio.run(run())
+    start = messages[0]
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    return start['status'], {name.decode(): value.decode() for name, value in start['headers']}, body
+
+
+def test_asgi_answers_the_read_api_on_the_async_driver(database):
+    for package in ('aiosqlite', 'greenlet', 'a2wsgi'):
+        pytest.importorskip(package)
+    from .auth.async_api import AsyncEventHub
+
+    user_id = create_user(database, 'attendee@example.com')
+    event_ids = [create_event(database, f'Event {i}', user_id, datetime.now() + timedelta(days=i + 1))
+                 for i in range(3)]
+    with app.app_context():
+        register_participant(user_id, event_ids[1])
+        database.session.commit()
+    client = app.test_client()
+    client.post('/login', data={'email': 'attendee@example.com', 'password': '1234'})
+    cookie = [('Cookie', f"session={client.get_cookie('session').value}")]
+
+    application = AsyncEventHub(app)
+    sync_statements = []
+    teardowns = []
+    app.teardown_request_funcs.setdefault(None, []).append(teardowns.append)
+
+    def record(conn, cursor, statement, *args):
+        sync_statements.append(statement)
+
+    with app.app_context():
+        engine = database.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        for path in ('/api/v1/events?page_size=2&fields=name,capacity', f'/api/v1/events/{event_ids[0]}',
+                     '/api/v1/me/registrations', '/api/v1/events/missing'):
+            status, headers, body = asgi_get(application, path, cookie)
+            expected = client.get(path)
+            assert (status, body) == (expected.status_code, expected.data)
+            assert headers.get('etag') == expected.headers.get('ETag')
+            if status == 200:
+                assert asgi_get(application, path, cookie + [('If-None-Match', headers['etag'])])[0] == 304
+        # only the test client's requests went through the synchronous engine, the async queries
+        # are instrumented all the same
+        async_only = len(sync_statements)
+        teardowns.clear()
+        _, headers, _ = asgi_get(application, '/api/v1/events', cookie)
+        assert len(sync_statements) == async_only
+        assert teardowns == [None]
+        assert 'desc="1 queries"' in headers['server-timing']
+
+        # the session of a deleted user is handed to the Flask app, whose hooks run once
+        create_user(database, 'deleted@example.com')
+        client.post('/login', data={'email': 'deleted@example.com', 'password': '1234'})
+        deleted_cookie = [('Cookie', f"session={client.get_cookie('session').value}")]
+        with app.app_context():
+            database.session.execute(delete(User).where(User.email == 'deleted@example.com'))
+            database.session.commit()
+        teardowns.clear()
+        assert asgi_get(application, '/api/v1/events', deleted_cookie)[0] == 401
+        assert teardowns == [None]
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+        app.teardown_request_funcs[None].remove(teardowns.append)
+
+    # pages and anonymous requests are served by the Flask app, streamed responses in chunks
+    assert asgi_get(application, '/welcome', cookie)[0] == 200
+    assert asgi_get(application, '/api/v1/events')[0] == 401
+    messages = []
+    status, _, body = asgi_get(application, f'/event/{event_ids[1]}/attendees.csv', cookie, messages)
+    assert status == 200 and body.decode().splitlines()[1].startswith(user_id)
+    assert messages[1].get('more_body') and not messages[-1].get('more_body')
+
+
+def test_serving_options():
+    assert parse_bind('0.0.0.0:8000') == ('0.0.0.0', 8000)
+    assert parse_bind(':9000') == ('127.0.0.1', 9000)
+    assert available_wsgi_server('waitress') == 'waitress'
+    assert available_wsgi_server('auto') in ('gunicorn', 'waitress', 'werkzeug')
+    with pytest.raises(ValueError):
+        available_wsgi_server('tornado')
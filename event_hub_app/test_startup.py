@@ -0,0 +1,7 @@
+from .benchmarks.startup import boot_once
+
+
+def test_booting_the_app_leaves_analytics_libraries_unloaded():
+    report = boot_once('event_hub_app.app:app')
+    assert report['heavy_modules'] == []
+    assert report['routes'] > 30
@@ -0,0 +1,213 @@
+"""
+Query plan audit: drives every view through the Flask test client against a scratch
+SQLite database, runs EXPLAIN QUERY PLAN over each SQL statement the views issue and
+fails if any of them scans a table, walking a whole index counts as a scan too. A scan passes
+when the statement has a LIMIT and the scanned index gives its order, so it stops after the
+page, or when it is listed in ALLOWED_SCANS with the reason it is acceptable.
+
+Run from the repository root:
+
+    python -m event_hub_app.tools.query_plan_audit
+"""
+import os
+import re
+import sys
+import tempfile
+from collections import namedtuple
+from datetime import datetime, timedelta
+from flask import has_request_context, request
+from sqlalchemy import event
+
+ExplainedStatement = namedtuple('ExplainedStatement', 'endpoint statement plan full_scans')
+
+PLANNED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE')
+# (endpoint, start of the plan line) of the scans accepted, with why
+ALLOWED_SCANS = {
+    ('events.search', 'SCAN events_fts VIRTUAL TABLE INDEX'):
+        'sqlite reports every virtual table lookup as a scan, the MATCH is answered by the FTS index',
+    ('events.dashboard_trends', 'SCAN analytics_daily_registrations USING INDEX ix_analytics_daily_registrations_day'):
+        'the all-time trend has one point per day since the first registration, read once in day order',
+    ('events.dashboard_trends', 'SCAN events USING INDEX sqlite_autoindex_events_1'):
+        'the all-time top events rank every event, by its store rows found with one key lookup each',
+}
+LIMIT = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+PASSWORD = 'audit-password'
+
+
+def seed(db):
+    """
+    This function will create the organizer, participant, events, registration and feedback
+    rows the views need to walk through all their branches
+    """
+    from ..auth.model import User, Event, EventRecommendation, Feedback
+    from ..auth.participation import register_participant
+    from ..auth.event_counters import add_rating
+    from ..auth.calendar_feed import calendar_token
+
+    organizer = User(username='organizer', password=PASSWORD, email='organizer@audit.example.com', phone_number='0')
+    participant = User(username='participant', password=PASSWORD, email='participant@audit.example.com',
+                       phone_number='0')
+    db.session.add_all([organizer, participant])
+    db.session.commit()
+
+    now = datetime.now()
+    past_event = Event('past event', 'audit', now - timedelta(days=2), 60, 'hall', organizer.id)
+    upcoming_event = Event('upcoming event', 'audit', now + timedelta(days=2), 60, 'hall', organizer.id)
+    spare_event = Event('spare event', 'audit', now + timedelta(days=3), 60, 'hall', organizer.id)
+    db.session.add_all([past_event, upcoming_event, spare_event])
+    db.session.commit()
+
+    register_participant(participant.id, past_event.id)
+    db.session.add(Feedback(past_event.id, organizer.id, 4, 'audit'))
+    add_rating(past_event.id, 4)
+    db.session.add_all([EventRecommendation(user_id=participant.id, rank=rank, event_id=event.id, score=1 / rank,
+                                            computed_at=now)
+                        for rank, event in enumerate((upcoming_event, spare_event), 1)])
+    db.session.commit()
+    return {'past': past_event.id, 'upcoming': upcoming_event.id, 'spare': spare_event.id,
+            'calendar_token': calendar_token(participant.id)}
+
+
+def view_requests(events):
+    """
+    This function will list the (user, method, url, form data) requests covering each view
+    """
+    return [
+        (None, 'GET', '/', None),
+        (None, 'GET', '/register', None),
+        (None, 'POST', '/register', {'email': 'new@audit.example.com', 'username': 'new', 'phone_number': '0',
+                                     'password': PASSWORD, 'confirm_password': PASSWORD}),
+        ('participant', 'GET', '/welcome', None),
+        ('participant', 'GET', '/events', None),
+        ('participant', 'GET', '/all_events', None),
+        ('participant', 'GET', '/archived_events', None),
+        ('participant', 'GET', '/events/search?q=upcom&location=hall&date_from=2000-01-01', None),
+        ('participant', 'GET', f"/event_details/{events['upcoming']}", None),
+        ('participant', 'POST', f"/register/{events['upcoming']}", None),
+        ('participant', 'GET', '/events/events_registered', None),
+        ('participant', 'GET', f"/calendar/{events['calendar_token']}.ics", None),
+        ('participant', 'GET', '/events/range?start=2000-01-01T00:00&end=2000-03-01T00:00', None),
+        (None, 'GET', '/calendar/events.ics', None),
+        ('participant', 'POST', f"/register/{events['upcoming']}/cancel", None),
+        ('participant', 'GET', '/events/events_participated', None),
+        ('participant', 'POST', f"/events/{events['past']}/feedback", None),
+        ('participant', 'POST', f"/events/feedback/{events['past']}", {'rating': 5, 'comment': 'audit'}),
+        ('participant', 'GET', f"/event_details/{events['past']}/event-feedbacks", None),
+        ('participant', 'GET', '/dashboard', None),
+        ('participant', 'GET', '/api/v1/events?when=upcoming&fields=name,average_rating', None),
+        ('participant', 'GET', f"/api/v1/events/{events['past']}", None),
+        ('participant', 'GET', f"/api/v1/events/{events['past']}/feedback", None),
+        ('participant', 'GET', '/api/v1/me/registrations', None),
+        ('participant', 'GET', '/api/v1/stats?days=30', None),
+        ('participant', 'GET', '/dashboard/trends?days=30', None),
+        ('participant', 'GET', '/dashboard/trends?days=0', None),
+        ('organizer', 'GET', '/organize', None),
+        ('organizer', 'POST', '/organize', {'name': 'organized event', 'description': 'audit',
+                                            'date_time': '2099-01-01 10:00', 'duration': 60,
+                                            'location': 'hall', 'capacity': 10}),
+        ('organizer', 'GET', '/events/organized_events', None),
+        ('organizer', 'GET', '/dashboard/organizer?days=7', None),
+        ('organizer', 'GET', '/dashboard/organizer?days=0', None),
+        ('organizer', 'GET', f"/event/{events['past']}/attendees.csv", None),
+        ('organizer', 'GET', f"/event/update/{events['upcoming']}", None),
+        ('organizer', 'POST', f"/event/update/{events['upcoming']}",
+         {'name': 'upcoming event', 'description': 'audit', 'date_time': '2099-01-02 10:00:00', 'duration': 90,
+          'location': 'hall'}),
+        ('organizer', 'POST', f"/event/delete/{events['spare']}", None),
+        ('participant', 'GET', '/logout', None),
+    ]
+
+
+def capture_statements(app, db, requests):
+    """
+    This function will run the requests and collect (endpoint, statement, parameters) for every
+    statement executed while handling a request
+    """
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            if executemany:
+                parameters = parameters[0]
+            captured.append((request.endpoint, statement, parameters))
+
+    clients = {None: app.test_client()}
+    for user in ('participant', 'organizer'):
+        clients[user] = app.test_client()
+        clients[user].post('/login', data={'email': f'{user}@audit.example.com', 'password': PASSWORD})
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        for user, method, url, data in requests:
+            clients[user].open(url, method=method, data=data)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return captured
+
+
+def full_scans(endpoint, statement, plan):
+    """
+    This function will get the plan lines that scan a table or a whole index, except a LIMIT
+    read in index order and the ALLOWED_SCANS
+    """
+    if LIMIT.search(statement) and not any(detail.startswith('USE TEMP B-TREE') for detail in plan):
+        return []
+    return [detail for detail in plan
+            if detail.startswith('SCAN ') and not detail.startswith(('SCAN CONSTANT ROW', 'SCAN ('))
+            and not any(endpoint == allowed_endpoint and detail.startswith(allowed)
+                        for allowed_endpoint, allowed in ALLOWED_SCANS)]
+
+
+def explain(app, db, captured):
+    """
+    This function will EXPLAIN QUERY PLAN each distinct captured statement
+    """
+    explained = []
+    seen = set()
+    with app.app_context(), db.engine.connect() as connection:
+        for endpoint, statement, parameters in captured:
+            if (endpoint, statement) in seen or not statement.lstrip().upper().startswith(PLANNED_STATEMENTS):
+                continue
+            seen.add((endpoint, statement))
+            rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+            plan = [row[-1] for row in rows]
+            explained.append(ExplainedStatement(endpoint, statement, plan, full_scans(endpoint, statement, plan)))
+    return explained
+
+
+def audit(app, db):
+    """
+    This function will seed the (empty) configured database, drive the views and return the
+    explained statements of every view
+    """
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        events = seed(db)
+    return explain(app, db, capture_statements(app, db, view_requests(events)))
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directory, 'audit.sqlite')
+        # imported only now so the app binds to the scratch database
+        from ..auth import db
+        from ..app import app
+        app.config['DASHBOARD_IMAGE_DIR'] = os.path.join(directory, 'dashboard')
+
+        explained = audit(app, db)
+
+    failures = [statement for statement in explained if statement.full_scans]
+    for statement in explained:
+        status = 'FULL SCAN' if statement.full_scans else 'ok'
+        print(f"[{status}] {statement.endpoint}: {' '.join(statement.statement.split())}")
+        for detail in statement.plan:
+            print(f"    {detail}")
+    print(f"{len(explained)} statements audited, {len(failures)} with full table scans")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())